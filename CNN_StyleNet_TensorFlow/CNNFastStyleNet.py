@@ -0,0 +1,476 @@
+# -*- coding:utf-8 -*-
+# Anaconda 4.3.0 環境 (TensorFlow インストール済み)
+
+"""
+    更新情報
+    [26/10/19] : 新規作成
+    [17/xx/xx] :
+               :
+"""
+# I/O 関連
+import os
+
+import scipy.misc
+
+import numpy as np
+
+# TensorFlow ライブラリ
+import tensorflow as tf
+from tensorflow.python.framework import ops
+
+# 自作クラス
+from CNNStyleNet import CNNStyleNet                 # 親クラス
+
+import NNOptimizer                                  # ニューラルネットワークの最適化アルゴリズム Optimizer を表すクラス
+
+
+class CNNFastStyleNet( CNNStyleNet ):
+    """
+    画像変換ネットワークによる高速な CNN-StyleNet / NeuralStyle（Fast Style Transfer）を表すクラス.
+    CNNStyleNet の内容画像層、スタイル画像層、全変動の損失関数を目的関数として、
+    １つのスタイル画像に対する画像変換ネットワークを学習しておき、
+    新しい内容画像は画像変換ネットワークの１回の順伝播処理でスタイル変換する。
+    ------------------------------------------------------------------------------------------------
+    [public] public アクセス可能なインスタスンス変数には, 便宜上変数名の最後にアンダースコア _ を付ける.
+        _image_size : tuple ( int, int )
+            トレーニングに用いる内容画像の高さ、幅（読み込み時にこのサイズに拡大縮小する）
+        _batch_size : int
+            ミニバッチ学習でのバッチサイズ
+        _n_filters : list <int>
+            画像変換ネットワークの各ダウンサンプリング段の特徴マップ数
+        _n_residual_blocks : int
+            画像変換ネットワークの残差ブロック数
+
+        _transform_weights : dict <str, (Variable, Variable, Variable, Variable)>
+            画像変換ネットワークの層名をキーとした ( filter, bias, instance norm の scale, shift ) の Variable の組
+        _features_content_op : Operator
+            トレーニング用の内容画像に対する内容層の特徴量
+        _image_input_holder : placeholder
+            任意サイズの画像をスタイル変換するための placeholder
+        _y_predict_op : Operator
+            _image_input_holder に供給された画像をスタイル変換した画像（正規化を戻したもの）
+
+        _model_saver : tf.train.Saver
+            画像変換ネットワークの Variable を保存、読み込むための Saver
+
+    [protedted] protedted な使用法を想定
+
+
+    [private] 変数名の前にダブルアンダースコア __ を付ける（Pythonルール）
+
+
+    """
+    def __init__(
+            self,
+            image_style_path,
+            vgg_mat_file,
+            session = tf.Session( config = tf.ConfigProto(log_device_placement=True) ),
+            image_size = ( 256, 256 ),
+            epochs = 2,
+            batch_size = 4,
+            eval_step = 50,
+            weight_image_content = 5.0,
+            weight_image_style = 500.0,
+            weight_regularization = 100,
+            n_strides = 1,
+            n_pool_wndsize = 2,
+            n_pool_strides = 2,
+            features_cache_dir = None,
+            n_filters = [ 32, 64, 128 ],
+            n_residual_blocks = 5
+        ):
+        """
+        コンストラクタ（厳密にはイニシャライザ）
+        スタイル画像は、トレーニング用の内容画像のサイズ image_size に合わせて読み込む。
+        """
+        super().__init__(
+            image_content_path = np.zeros( tuple( image_size ) + (3,), dtype = np.uint8 ),   # トレーニング用の内容画像のサイズのみを指定
+            image_style_path = image_style_path,
+            vgg_mat_file = vgg_mat_file,
+            session = session,
+            epochs = epochs,
+            eval_step = eval_step,
+            weight_image_content = weight_image_content,
+            weight_image_style = weight_image_style,
+            weight_regularization = weight_regularization,
+            n_strides = n_strides,
+            n_pool_wndsize = n_pool_wndsize,
+            n_pool_strides = n_pool_strides,
+            features_cache_dir = features_cache_dir
+        )
+
+        self._image_size = tuple( image_size )
+        self._batch_size = batch_size
+        self._n_filters = n_filters
+        self._n_residual_blocks = n_residual_blocks
+
+        self._transform_weights = {}
+        self._features_content_op = None
+        self._y_predict_op = None
+        self._model_saver = None
+
+        # placeholder の初期化
+        # トレーニング用の内容画像（正規化済み）のミニバッチ
+        self._image_content_holder = \
+            tf.placeholder(
+                tf.float32,
+                shape = (None,) + self._image_size + (3,),
+                name = "image_content_holder"
+            )
+
+        # スタイル変換する任意サイズの画像（正規化済み）
+        self._image_input_holder = \
+            tf.placeholder(
+                tf.float32,
+                shape = ( None, None, None, 3 ),
+                name = "image_input_holder"
+            )
+
+        return
+
+    def print( self, str ):
+        print( "---------------------------" )
+        print( self )
+        super().print( str )
+
+        print( "_image_size : ", self._image_size )
+        print( "_batch_size : ", self._batch_size )
+        print( "_n_filters : ", self._n_filters )
+        print( "_n_residual_blocks : ", self._n_residual_blocks )
+
+        print( "_transform_weights : ", self._transform_weights )
+        print( "_image_input_holder : ", self._image_input_holder )
+        print( "_y_predict_op : ", self._y_predict_op )
+
+        return
+
+
+    def init_transform_weights( self ):
+        """
+        画像変換ネットワークの各層の Variable を生成する。
+        Variable はトレーニング用と推論用の画像変換ネットワークで共有する。
+
+        [Output]
+            self._transform_weights : dict <str, (Variable, Variable, Variable, Variable)>
+                層名をキーとした ( filter, bias, instance norm の scale, shift ) の Variable の組
+        """
+        n_filter1, n_filter2, n_filter3 = self._n_filters
+
+        # 層名, filter のサイズ, 入力チャンネル数, 出力チャンネル数
+        layers = [ ( "conv1", 9, 3, n_filter1 ), ( "conv2", 3, n_filter1, n_filter2 ), ( "conv3", 3, n_filter2, n_filter3 ) ]
+        for i in range( self._n_residual_blocks ):
+            layers.append( ( "res{}_1".format( i + 1 ), 3, n_filter3, n_filter3 ) )
+            layers.append( ( "res{}_2".format( i + 1 ), 3, n_filter3, n_filter3 ) )
+
+        layers += [ ( "deconv1", 3, n_filter3, n_filter2 ), ( "deconv2", 3, n_filter2, n_filter1 ), ( "conv4", 9, n_filter1, 3 ) ]
+
+        self._transform_weights = {}
+        for ( layer, filter_size, n_in, n_out ) in layers:
+            # ゼロで初期化すると、うまく重みの更新が出来ないので、正規分布に基づく乱数で初期化
+            weights_var = tf.Variable(
+                              tf.truncated_normal( shape = [ filter_size, filter_size, n_in, n_out ], stddev = 0.1 ),
+                              name = layer + "_weights"
+                          )
+            bias_var = tf.Variable( tf.zeros( shape = [ n_out ] ), name = layer + "_bias" )
+            scale_var = tf.Variable( tf.ones( shape = [ n_out ] ), name = layer + "_scale" )
+            shift_var = tf.Variable( tf.zeros( shape = [ n_out ] ), name = layer + "_shift" )
+
+            self._transform_weights[ layer ] = ( weights_var, bias_var, scale_var, shift_var )
+
+        return self._transform_weights
+
+
+    def transform_conv_layer( self, input_tsr, layer, strides = 1, upsampling = False, relu = True ):
+        """
+        画像変換ネットワークの畳み込み層（＋ instance normalization ＋ Relu）を構築する。
+
+        [Input]
+            input_tsr : Tensor
+                入力 Tensor [batch, height, width, channels]
+            layer : str
+                _transform_weights の層名
+            strides : int
+                畳み込み処理でストライドさせる pixel 数（2 の場合は 1/2 にダウンサンプリング）
+            upsampling : bool
+                True の場合は、畳み込み処理の前に最近傍補間で 2 倍にアップサンプリングする
+            relu : bool
+                True の場合は、instance normalization と Relu を適用する
+
+        [Output]
+            output_tsr : Tensor
+        """
+        weights_var, bias_var, scale_var, shift_var = self._transform_weights[ layer ]
+
+        if ( upsampling == True ):
+            input_tsr = tf.image.resize_nearest_neighbor( input_tsr, tf.shape( input_tsr )[1:3] * 2 )
+
+        output_tsr = \
+            tf.nn.conv2d(
+                input = input_tsr,
+                filter = weights_var,
+                strides = [ 1, strides, strides, 1 ],
+                padding = "SAME"
+            )
+        output_tsr = tf.nn.bias_add( output_tsr, bias_var )
+
+        if ( relu == True ):
+            # instance normalization : 画像毎、チャンネル毎に正規化
+            mean, variance = tf.nn.moments( output_tsr, axes = [1,2], keep_dims = True )
+            output_tsr = scale_var * ( output_tsr - mean ) / tf.sqrt( variance + 1e-3 ) + shift_var
+            output_tsr = tf.nn.relu( output_tsr )
+
+        return output_tsr
+
+
+    def transform_network( self, input_tsr ):
+        """
+        画像変換ネットワークを構築する。
+        ダウンサンプリング → 残差ブロック → アップサンプリングで構成される全畳み込みネットワークであり、任意サイズの画像を入力可能。
+
+        [Input]
+            input_tsr : Tensor
+                正規化済みの入力画像 [batch, height, width, channels]
+
+        [Output]
+            output_tsr : Tensor
+                正規化済みの出力画像 [batch, height, width, channels]
+        """
+        output_tsr = self.transform_conv_layer( input_tsr, "conv1" )
+        output_tsr = self.transform_conv_layer( output_tsr, "conv2", strides = 2 )
+        output_tsr = self.transform_conv_layer( output_tsr, "conv3", strides = 2 )
+
+        for i in range( self._n_residual_blocks ):
+            residual_tsr = self.transform_conv_layer( output_tsr, "res{}_1".format( i + 1 ) )
+            residual_tsr = self.transform_conv_layer( residual_tsr, "res{}_2".format( i + 1 ) )
+            output_tsr = output_tsr + residual_tsr
+
+        output_tsr = self.transform_conv_layer( output_tsr, "deconv1", upsampling = True )
+        output_tsr = self.transform_conv_layer( output_tsr, "deconv2", upsampling = True )
+        output_tsr = self.transform_conv_layer( output_tsr, "conv4", relu = False )
+
+        # ダウンサンプリングで切り上げられた分を入力画像のサイズに切り出し、
+        # tanh で [0, 255] の画素値の範囲に収めた上で正規化する
+        input_shape = tf.shape( input_tsr )
+        output_tsr = output_tsr[ :, : input_shape[1], : input_shape[2], : ]
+        output_tsr = 127.5 * tf.tanh( output_tsr ) + 127.5 - self._norm_mean_matrix.astype( np.float32 )
+
+        return output_tsr
+
+
+    def model( self ):
+        """
+        モデルの定義を行い、
+        最終的なモデルの出力のオペレーター self._y_out_op を設定する。
+        [Output]
+            self._y_out_op : Operator
+                トレーニング用の内容画像をスタイル変換した画像（正規化済み）
+        """
+        #------------------------------------------------------
+        # 学習済み StyleNet 用 CNN モデルのパラメータを読み込む
+        #------------------------------------------------------
+        self.load_vgg_weights()
+
+        #------------------------------------
+        # スタイル画像層の構築
+        #------------------------------------
+        self.extract_features_style()
+
+        #------------------------------------
+        # 画像変換ネットワークの構築
+        #------------------------------------
+        self.init_transform_weights()
+
+        # トレーニング用
+        self._y_out_op = self.transform_network( self._image_content_holder )
+
+        # 内容層の特徴量は、トレーニング用の内容画像から計算グラフ内で算出する
+        network_content = self.vgg_network( self._image_content_holder )
+        self._features_content_op = tf.stop_gradient( network_content[ self._content_layer ] )
+
+        # スタイル変換した画像に対する VGG
+        self._vgg_network = self.vgg_network( self._y_out_op )
+
+        # 推論用（Variable はトレーニング用と共有）
+        self._y_predict_op = self.transform_network( self._image_input_holder ) + self._norm_mean_matrix.astype( np.float32 )
+
+        return self._y_out_op
+
+
+    def loss( self ):
+        """
+        損失関数の定義を行う。
+        CNNStyleNet の内容画像層、スタイル画像層、全変動の損失関数を、画像変換ネットワークの出力に対して適用する。
+
+        [Output]
+            self._loss_op : Operator
+                損失関数を表すオペレーター
+        """
+        self._loss_content_op = self.loss_content( self._vgg_network, self._features_content_op )
+        self._loss_style_op = self.loss_style( self._vgg_network )
+        self._loss_total_var_op = self.loss_total_var( self._y_out_op )
+
+        self._loss_op = self._loss_content_op + self._loss_style_op + self._loss_total_var_op
+
+        return self._loss_op
+
+
+    def optimizer( self, nnOptimizer ):
+        """
+        モデルの最適化アルゴリズムの設定を行う。
+        画像変換ネットワークの Variable のみを最適化対象とする。
+        fit(...) でミニバッチ毎に train_step を session.run(...) するので、
+        tf.train.Optimizer を持つ Optimizer（GradientDecent, Momentum, Adagrad, Adam 等）のみ指定可能
+        最適化処理全体を１回で実行する LBFGS（ScipyOptimizerInterface）は指定できない。
+
+        [Input]
+            nnOptimizer : NNOptimizer のクラスのオブジェクト
+        [Output]
+            optimizer の train_step
+        """
+        if ( isinstance( nnOptimizer._optimizer, tf.train.Optimizer ) == False ):
+            raise ValueError(
+                "unsupported optimizer : %s / CNNFastStyleNet supports optimizers with tf.train.Optimizer "
+                "(GradientDecent, GradientDecentDecay, Momentum, NesterovMomentum, Adagrad, Adadelta, Adam)" % type( nnOptimizer ).__name__
+            )
+
+        self._optimizer = nnOptimizer._optimizer
+
+        var_list = [ var for layer_vars in self._transform_weights.values() for var in layer_vars ]
+        self._train_step = self._optimizer.minimize( self._loss_op, var_list = var_list )
+
+        return self._train_step
+
+
+    def load_images( self, image_paths ):
+        """
+        トレーニング用の内容画像を読み込み、_image_size に拡大縮小して正規化する。
+
+        [Input]
+            image_paths : list <str>
+                内容画像ファイルのパスの list
+
+        [Output]
+            images : ndarray
+                正規化済みの内容画像 [ len(image_paths), height, width, channels ]
+        """
+        images = []
+        for path in image_paths:
+            image = scipy.misc.imread( path, mode = "RGB" )
+            image = scipy.misc.imresize( image, self._image_size )
+            images.append( image )
+
+        images = np.array( images, dtype = np.float32 ) - self._norm_mean_matrix
+
+        return images
+
+
+    def fit( self, image_paths ):
+        """
+        指定されたトレーニング用の内容画像で、画像変換ネットワークのトレーニングを行う。
+
+        [Input]
+            image_paths : list <str>
+                トレーニング用の内容画像ファイルのパスの list
+        """
+        # Variable の初期化オペレーター
+        self._init_var_op = tf.global_variables_initializer()
+
+        # Session の run（初期化オペレーター）
+        self._session.run( self._init_var_op )
+
+        n_batches = len( image_paths ) // self._batch_size
+        step = 0
+
+        for epoch in range( self._epochs ):
+            # ミニバッチ学習処理
+            index_permutation = np.random.permutation( len( image_paths ) )
+
+            for i in range( n_batches ):
+                index_batch = index_permutation[ i * self._batch_size : (i + 1) * self._batch_size ]
+                images_batch = self.load_images( [ image_paths[j] for j in index_batch ] )
+
+                # トレーニングステップと損失関数値の算出を１回の session.run(...) で行う
+                _, loss, loss_content, loss_style, loss_total_var = \
+                    self._session.run(
+                        [ self._train_step, self._loss_op, self._loss_content_op, self._loss_style_op, self._loss_total_var_op ],
+                        feed_dict = { self._image_content_holder : images_batch }
+                    )
+
+                step += 1
+
+                # 評価処理ステップの場合
+                if ( step % self._eval_step == 0 ):
+                    self._losses_train.append( loss )
+                    self._losses_content_train.append( loss_content )
+                    self._losses_style_train.append( loss_style )
+                    self._losses_total_var_train.append( loss_total_var )
+
+                    print( "epoch %d / step %d / loss = %0.1f / loss_content = %0.1f / loss_style = %0.1f / loss_total_var = %0.1f" %
+                          ( epoch, step, loss, loss_content, loss_style, loss_total_var ) )
+
+        return self._y_out_op
+
+
+    def predict( self, image ):
+        """
+        学習済みの画像変換ネットワークの１回の順伝播処理で、画像をスタイル変換する。
+
+        [Input]
+            image : ndarray
+                任意サイズの画像 [height, width, channels] or [n_images, height, width, channels]
+
+        [Output]
+            image_output : ndarray
+                スタイル変換した画像（入力と同じ shape, [0, 255] の範囲）
+        """
+        images = np.reshape( image, (-1,) + image.shape[-3:] ).astype( np.float32 ) - self._norm_mean_matrix
+
+        images_output = self._session.run( self._y_predict_op, feed_dict = { self._image_input_holder : images } )
+        images_output = np.clip( images_output, 0, 255 )
+
+        return np.reshape( images_output, image.shape )
+
+
+    def save_model( self, dir = "./model_session", file_name = "model_variables", global_step = None ):
+        """
+        学習済みの画像変換ネットワークの Variable を保存する。
+        """
+        # 保存用ディレクトリの作成
+        if ( os.path.isdir( dir ) == False ):
+            os.makedirs( dir )
+
+        # tf.train.Saver() オブジェクト未作成ならオブジェクトを作成
+        if ( self._model_saver == None ):
+            var_list = [ var for layer_vars in self._transform_weights.values() for var in layer_vars ]
+            self._model_saver = tf.train.Saver( var_list = var_list )
+
+        # 保存
+        self._model_saver.save(
+            self._session,
+            os.path.join( dir, file_name ),
+            global_step = global_step
+        )
+
+        print( "save model data at : %s" % os.path.join( dir, file_name ) )
+
+        return
+
+
+    def load_model( self, dir = "./model_session", file_name = "model_variables" ):
+        """
+        保存しておいた学習済みの画像変換ネットワークの Variable を読み込む。
+        """
+        check_point = tf.train.get_checkpoint_state( dir )
+        if ( (os.path.isdir( dir ) == False ) | ( check_point == None ) ):
+            print( "error : file is not founded at : %s" % os.path.join( dir, file_name ) )
+
+        else:
+            # tf.train.Saver() オブジェクト未作成ならオブジェクトを作成
+            if ( self._model_saver == None ):
+                var_list = [ var for layer_vars in self._transform_weights.values() for var in layer_vars ]
+                self._model_saver = tf.train.Saver( var_list = var_list )
+
+            self._model_saver.restore( self._session, os.path.join( dir, file_name ) )
+            print( "load model data from : %s" % os.path.join( dir, file_name ) )
+
+        return
@@ -5,11 +5,24 @@
     更新情報
     [17/11/21] : 新規作成
     [17/12/01] : TensorBoard に計算グラフを表示するためのファイルを書き込むための関数 write_tensorboard_graph(...) 追加
+    [26/10/19] : VGG の重みを一度だけ計算グラフに埋め込み、内容画像、スタイル画像、トレーニング対象の画像で共有するように変更
+               : 損失関数に必要な層（最も深い内容層・スタイル層）までのみ構築するように変更
+               : mat ファイルを層毎の npy ファイルに変換する関数 convert_model_info(...) と
+                 memory map で読み込む関数 load_model_info_npy(...) 追加
+               : 内容層の特徴量、スタイル層のグラム行列をファイルにキャッシュする機能を追加
+               : VGG の重みを tf.constant で計算グラフに埋め込まずに、placeholder 経由で初期化する学習対象外の Variable に変更
+               : 同じサイズの複数の内容画像を１つの計算グラフ、Session でまとめて画像生成するバッチ処理に対応
+               : 最適化アルゴリズムに L-BFGS を指定した場合の画像生成処理 run_lbfgs() 追加
+               : 内容画像を縮小して画像生成する image_scale と、トレーニング対象の画像の初期値 image_init を指定可能に変更
+               : 内容画像を画像の配列で指定可能に変更し、算出済みのスタイル層のグラム行列 features_style を指定可能に変更
+               : 損失関数を loss_content(...), loss_style(...), loss_total_var(...) に分割し、他のモデルから利用可能に変更
+               : run() の評価処理で、トレーニングステップと全損失関数値、途中生成画像を１回の session.run(...) で取得するように変更
     [17/xx/xx] : 
                : 
 """
 # I/O 関連
 import os
+import hashlib
 
 import scipy.misc
 import scipy.io
@@ -41,6 +54,7 @@ from NNOptimizer import Momentum
 from NNOptimizer import NesterovMomentum
 from NNOptimizer import Adagrad
 from NNOptimizer import Adadelta
+from NNOptimizer import LBFGS
 
 
 class CNNStyleNet( object ):
@@ -66,11 +80,14 @@ class CNNStyleNet( object ):
             モデルの最適化アルゴリズム
         _train_step : 
             トレーニングステップ
+        _image_updated_op : Operator
+            トレーニングステップ実行後の _image_var の値を読み出すオペレーター
         _y_out_op : Operator
             モデルの出力のオペレーター
 
         _image_var : Variable
           トレーニング対象の画像データ（Variable）
+          shape = [ _n_images, height, width, channels ]
           
         _weights : list <Variable>
             モデルの各層の重みの Variable からなる list
@@ -82,15 +99,31 @@ class CNNStyleNet( object ):
         _eval_step : int
             学習処理時に評価指数の算出処理＆途中生成画像の出力を行う step 間隔
 
-        _image_content_path : str
+        _image_content_path : str or list <str> or ndarray
             内容画像ファイルのパス
+            list で指定した場合は、同じサイズの複数の内容画像をバッチ処理でまとめて画像生成する
+            ndarray で指定した場合は、読み込み済みの内容画像の配列として扱う
         _image_style_path : str
             スタイル画像ファイルのパス
         _vgg_mat_file : str
             学習済み CNN モデル（VGG）の mat ファイルのパス
+            又は convert_model_info(...) で変換した npy ファイルのディレクトリのパス
 
         _image_content :　ndarray
             内容画像の配列　The array obtained by reading the image.
+            （バッチ処理時は先頭の内容画像）
+        _image_contents :　ndarray
+            全内容画像の配列 [ _n_images, height, width, channels ]
+        _n_images : int
+            まとめて画像生成する内容画像の枚数（バッチサイズ）
+        _images_output : ndarray
+            run() で最終的に生成した画像（正規化を戻したもの） [ _n_images, height, width, channels ]
+        _image_scale : float
+            読み込んだ内容画像の拡大縮小率（1.0 の場合は元のサイズ）
+        _image_init : ndarray
+            トレーニング対象の画像データ（Variable）の初期値とする画像 [ _n_images, height, width, channels ]
+            サイズが内容画像と異なる場合は、内容画像のサイズに拡大縮小して用いる
+            None の場合はランダムノイズで初期化する
         _image_style :　ndarray
             スタイル画像の配列　The array obtained by reading the image.
 
@@ -110,11 +143,18 @@ class CNNStyleNet( object ):
             スタイル層の構成。reluX_1 層の組み合わせ
         _vgg_network : list <Tensor>
             _vgg_layers で定義した各層の中身（Tensor）
+        _vgg_weights : dict <str, (Variable, Variable)>
+            畳み込み層名をキーとした ( filter, bias ) の学習対象外の Variable の組
+            各ネットワークで共有する
 
         _features_content : list <>
             内容層の特徴量
         _features_style : list <>
             画像層の特徴量
+            コンストラクタで指定した場合は、スタイル画像層の構築と順伝播処理を省略し、指定したグラム行列を用いる
+        _features_cache_dir : str
+            内容層の特徴量、スタイル層のグラム行列のキャッシュファイルを保存するディレクトリのパス
+            None の場合はキャッシュしない
 
         _n_conv_strides : int
             CNN の畳み込み処理（特徴マップ生成）でストライドさせる pixel 数
@@ -151,7 +191,11 @@ class CNNStyleNet( object ):
             weight_regularization = 100,
             n_strides = 1,
             n_pool_wndsize = 2,
-            n_pool_strides = 2
+            n_pool_strides = 2,
+            features_cache_dir = None,
+            image_scale = 1.0,
+            image_init = None,
+            features_style = None
         ):
 
         tf.set_random_seed(12)
@@ -166,6 +210,7 @@ class CNNStyleNet( object ):
         self._loss_total_var_op = None
         self._optimizer = None
         self._train_step = None
+        self._image_updated_op = None
         self._y_out_op = None
 
         self._weights = []
@@ -180,9 +225,15 @@ class CNNStyleNet( object ):
         self._vgg_mat_file = vgg_mat_file
 
         self._image_content = None
+        self._image_contents = None
+        self._n_images = 1
+        self._images_output = None
+        self._image_scale = image_scale
+        self._image_init = image_init
         self._image_style = None
         self._features_content = {}
-        self._features_style = {}
+        self._features_style = features_style
+        self._features_cache_dir = features_cache_dir
 
         self._weight_image_content = weight_image_content
         self._weight_image_style = weight_image_style
@@ -225,12 +276,13 @@ class CNNStyleNet( object ):
         self._style_layers = [ "relu1_1", "relu2_1", "relu3_1", "relu4_1", "relu5_1" ]
 
         self._vgg_network = {}
+        self._vgg_weights = {}
 
         # place holder の設定
         self._image_content_holder = \
             tf.placeholder( 
                 "float", 
-                shape = ( (1,) + self._image_content.shape )    # ? : 4 つの次元を持つように画像の行列の形状を reshape 
+                shape = ( (self._n_images,) + self._image_content.shape )    # ? : 4 つの次元を持つように画像の行列の形状を reshape 
             )
 
         self._image_style_holder = \
@@ -240,7 +292,7 @@ class CNNStyleNet( object ):
             )
 
         # トレーニング対象の画像データ（Variable）
-        self._image_var = tf.Variable( tf.random_normal( shape = (1,) + self._image_content.shape ) * 0.256 )
+        self._image_var = tf.Variable( tf.random_normal( shape = (self._n_images,) + self._image_content.shape ) * 0.256 )
 
         self._norm_mean_matrix = None
 
@@ -279,6 +331,8 @@ class CNNStyleNet( object ):
         print( "_vgg_network : \n", self._vgg_network )
 
         print( "_image_content.shape : \n", self._image_content.shape )
+        print( "_n_images : ", self._n_images )
+        print( "_image_scale : ", self._image_scale )
         print( "_image_style.shape : \n", self._image_style.shape )
         
         print( "_image_content_holder : \n", self._image_content_holder )
@@ -286,6 +340,7 @@ class CNNStyleNet( object ):
 
         print( "_features_content :", self._features_content )
         print( "_features_style :", self._features_style )
+        print( "_features_cache_dir :", self._features_cache_dir )
 
         print( "_n_strides : " , self._n_strides )
         print( "_n_pool_wndsize : " , self._n_pool_wndsize )
@@ -320,14 +375,46 @@ class CNNStyleNet( object ):
     def load_image_contant_style( self, image_content_path, image_style_path ):
         """
         内容画像とスタイル画像を読み込む。
+
+        [Input]
+            image_content_path : str or list <str> or ndarray
+                内容画像ファイルのパス
+                list で指定した場合は、全て同じサイズの画像である必要がある
+                ndarray で指定した場合は、読み込み済みの内容画像の配列 [height, width, channels]
+                又は [n_images, height, width, channels] として扱う
+            image_style_path : str
+                スタイル画像ファイルのパス
         """
         self._image_content_path = image_content_path
         self._image_style_path = image_style_path
-        
-        # 指定された path の画像を読み込む
-        # scipy.misc.imread(...) : Read an image from a file as an array.
-        # Returns : The array obtained by reading the image.
-        self._image_content = scipy.misc.imread( image_content_path )
+
+        if ( isinstance( image_content_path, np.ndarray ) ):
+            image_contents = list( np.reshape( image_content_path, (-1,) + image_content_path.shape[-3:] ) )
+            image_content_paths = [ "image_content[{}]".format( i ) for i in range( len( image_contents ) ) ]
+        else:
+            if ( isinstance( image_content_path, str ) ):
+                image_content_paths = [ image_content_path ]
+            else:
+                image_content_paths = list( image_content_path )
+
+            # 指定された path の画像を読み込む
+            # scipy.misc.imread(...) : Read an image from a file as an array.
+            # Returns : The array obtained by reading the image.
+            image_contents = [ scipy.misc.imread( path ) for path in image_content_paths ]
+
+        # 内容画像を _image_scale 倍のサイズに拡大縮小
+        if ( self._image_scale != 1.0 ):
+            image_contents = [ scipy.misc.imresize( image, self._image_scale ) for image in image_contents ]
+
+        for ( path, image ) in zip( image_content_paths, image_contents ):
+            if ( image.shape != image_contents[0].shape ):
+                raise ValueError( 
+                    "all content images must have the same shape : %s %s != %s" % ( path, image.shape, image_contents[0].shape ) 
+                )
+
+        self._image_contents = np.array( image_contents )
+        self._image_content = self._image_contents[0]
+        self._n_images = len( image_contents )
         self._image_style = scipy.misc.imread( image_style_path )
 
         # ２つの画像の合成するので、
@@ -385,304 +472,575 @@ class CNNStyleNet( object ):
         return ( matrix_mean, network_weight )
 
 
-    def model( self ):
+    @staticmethod
+    def convert_model_info( mat_file_path, npy_dir ):
         """
-        モデルの定義を行い、
-        最終的なモデルの出力のオペレーター self._y_out_op を設定する。
-        [Output]
-            self._y_out_op : Operator
-                モデルの出力のオペレーター
+        imagenet-vgg-verydee-19.mat ファイルを、層毎の npy ファイルに変換して保存する。（初回のみ実行）
+        畳み込み層の重みは、StyleNet モデルに対応する TensorFlow の filter の形状に transpose 済みの状態で保存する。
+        保存した npy ファイルは load_model_info_npy(...) で memory map して読み込む。
+
+        [Input]
+            mat_file_path : str
+                imagenet-vgg-verydee-19.mat ファイルの path
+            npy_dir : str
+                変換した npy ファイルを保存するディレクトリの path
+                normalization_mean.npy : 画像を正規化するための正規化行列
+                <層名>_weights.npy : 畳み込み層の filter [height, width, in_channels, out_channels]
+                <層名>_bias.npy : 畳み込み層のバイアス項 [out_channels]
         """
-        #------------------------------------------------------
-        # 学習済み StyleNet 用 CNN モデルのパラメータを読み込む
-        #------------------------------------------------------
-        # 学習済み CNN モデルの重み＋バイアス項を含んだ network_weights と
-        # 画像を正規化するための正規化行列を取り出す。
-        self._norm_mean_matrix, network_weights = self.load_model_info( mat_file_path = self._vgg_mat_file )
-        #print( "norm_mean_matrix :\n", self._norm_mean_matrix )
-        #print( "network_weights :\n", network_weights )
+        vgg_data = scipy.io.loadmat( mat_file_path )
 
-        #------------------------------------
-        # 内容画像層の構築
-        #------------------------------------
-        image_content_tsr = self._image_content_holder  # 入力 Tensor, 一時保存用 Tensor の設定
-        network_content = {}                            # 内容画像層のモデル構造（Tensor型の list）
-        self._features_content = {}                     # 内容画像層の特徴量
+        if ( os.path.isdir( npy_dir ) == False ):
+            os.makedirs( npy_dir )
 
-        # _vgg_layers を構成する layer から layer を取り出し、
-        # 種類に応じて、モデルを具体的に構築していく。
-        for ( i, layer ) in enumerate( self._vgg_layers ):
-            # layer "convx_x" の先頭の文字列が畳み込み層を表す "c" の場合 
+        # 画像を正規化するための正規化行列
+        normalization_matrix = vgg_data[ "normalization" ][0][0][0]
+        matrix_mean = np.mean( normalization_matrix, axis = (0,1) )
+        np.save( os.path.join( npy_dir, "normalization_mean.npy" ), matrix_mean )
+
+        # 畳み込み層の重み、バイアス項を層毎に保存
+        for layer_data in vgg_data[ "layers" ][0]:
+            layer_data = layer_data[0][0]
+            if ( str( layer_data[ "type" ][0] ) != "conv" ):
+                continue
+
+            layer = str( layer_data[ "name" ][0] )
+            weights, bias = layer_data[ "weights" ][0]
+
+            # StyleNet モデルに対応するように reshape
+            weights = np.ascontiguousarray( np.transpose( weights, (1,0,2,3) ), dtype = np.float32 )
+            bias = np.ascontiguousarray( bias.reshape(-1), dtype = np.float32 )
+
+            np.save( os.path.join( npy_dir, layer + "_weights.npy" ), weights )
+            np.save( os.path.join( npy_dir, layer + "_bias.npy" ), bias )
+
+        return
+
+
+    def load_model_info_npy( self, npy_dir ):
+        """
+        convert_model_info(...) で変換した層毎の npy ファイルを memory map で読み込む。
+        内容層・スタイル層の計算に必要な層のみを読み込み、
+        同一ホスト上の複数のジョブ間で npy ファイルのページキャッシュを共有出来る。
+        （build_vgg_weights(...) で Session 内の Variable に初期化する際に、プロセス毎に１つのコピーが作成される）
+
+        [Input]
+            npy_dir : str
+                convert_model_info(...) で変換した npy ファイルのディレクトリの path
+
+        [Output]
+            matrix_mean :
+                画像を正規化するための正規化行列
+                [ 123.68   116.779  103.939]
+
+            network_weight : dict <str, (ndarray, ndarray)>
+                畳み込み層名をキーとした ( filter, bias ) の組（transpose 済み）
+        """
+        matrix_mean = np.load( os.path.join( npy_dir, "normalization_mean.npy" ) )
+
+        network_weight = {}
+        for layer in self._vgg_layers[ : self.n_vgg_layers_used() ]:
             if ( layer[0] == "c" ):
-                # network_weights から weights とバイアス項に対応するデータを抽出
-                weights, bias = network_weights[i][0][0][0][0]
-                #print( "weights :\n", weights )
-                #print( "bias :\n", bias )
-                
-                # StyleNet モデルに対応するように reshape
-                weights = np.transpose( weights, (1,0,2,3) )
-                bias = bias.reshape(-1)
+                network_weight[ layer ] = (
+                    np.load( os.path.join( npy_dir, layer + "_weights.npy" ), mmap_mode = "r" ),
+                    np.load( os.path.join( npy_dir, layer + "_bias.npy" ), mmap_mode = "r" )
+                )
 
-                # 畳み込み層を構築
-                conv_layer_op = \
-                    tf.nn.conv2d(
-                        input = image_content_tsr,
-                        filter = tf.constant( weights ),                       # 畳込み処理で input で指定した Tensor との積和に使用する filter 行列（カーネル）
-                        strides = [ 1, self._n_strides, self._n_strides, 1 ],  # strides[0] = strides[3] = 1. とする必要がある]
-                        padding = "SAME"                                       # ゼロパディングを利用する場合は SAME を指定
-                    )
+        return ( matrix_mean, network_weight )
+
+
+    def n_vgg_layers_used( self ):
+        """
+        内容層、スタイル層の計算に必要な VGG の層数（最も深い内容層・スタイル層までの層数）を返す。
+        それより深い層は損失関数の計算に寄与しないので、構築しない。
+
+        [Output]
+            n_layers : int
+                _vgg_layers の先頭から数えた、構築が必要な層数
+        """
+        n_layers = max( [ self._vgg_layers.index( layer ) for layer in [ self._content_layer ] + self._style_layers ] ) + 1
+
+        return n_layers
+
+
+    def build_vgg_weights( self, network_weights ):
+        """
+        学習済み CNN モデルの重み、バイアス項から、各畳み込み層の学習対象外の Variable を生成して初期化する。
+        重みは vgg_network(...) で生成する全てのネットワーク（内容画像、スタイル画像、トレーニング対象の画像）で共有される。
+        重みを tf.constant(...) で計算グラフ（GraphDef）に埋め込まずに、placeholder 経由で初期化するので、
+        memory map した npy ファイルの配列を計算グラフにコピーしない。
+        （但し、Session 内の Variable のバッファへのコピーはプロセス毎に１つ作成される）
+        Variable は tf.GraphKeys.LOCAL_VARIABLES のコレクションに追加し、
+        tf.global_variables_initializer() による再初期化（placeholder の値が必要）と、tf.train.Saver の保存対象から除外する。
+
+        [Input]
+            network_weights :
+                load_model_info(...) で読み込んだ学習済み CNN モデルの重み、バイアス項等を含んだ MATLAB データ
+                又は load_model_info_npy(...) で読み込んだ畳み込み層名をキーとした ( filter, bias ) の dict
+
+        [Output]
+            self._vgg_weights : dict <str, (Variable, Variable)>
+                畳み込み層名をキーとした ( filter, bias ) の Variable の組
+        """
+        self._vgg_weights = {}
+        self._weights = []
+        self._biases = []
+
+        # 各 Variable の初期化オペレーターと、初期値を供給する placeholder への feed_dict
+        init_ops = []
+        init_feed_dict = {}
+
+        for ( i, layer ) in enumerate( self._vgg_layers[ : self.n_vgg_layers_used() ] ):
+            # layer "convx_x" の先頭の文字列が畳み込み層を表す "c" の場合のみ重みを持つ
+            if ( layer[0] == "c" ):
+                # npy ファイルから読み込んだ重みは transpose 済み
+                if ( isinstance( network_weights, dict ) ):
+                    weights, bias = network_weights[ layer ]
+                else:
+                    # network_weights から weights とバイアス項に対応するデータを抽出
+                    weights, bias = network_weights[i][0][0][0][0]
+
+                    # StyleNet モデルに対応するように reshape
+                    weights = np.transpose( weights, (1,0,2,3) )
+                    bias = bias.reshape(-1)
+
+                weights_holder = tf.placeholder( tf.as_dtype( weights.dtype ), shape = weights.shape )
+                bias_holder = tf.placeholder( tf.as_dtype( bias.dtype ), shape = bias.shape )
+
+                weights_var = tf.Variable( 
+                                  weights_holder, trainable = False, 
+                                  collections = [ tf.GraphKeys.LOCAL_VARIABLES ], name = layer + "_weights" 
+                              )
+                bias_var = tf.Variable( 
+                               bias_holder, trainable = False, 
+                               collections = [ tf.GraphKeys.LOCAL_VARIABLES ], name = layer + "_bias" 
+                           )
+                self._vgg_weights[ layer ] = ( weights_var, bias_var )
+
+                init_ops += [ weights_var.initializer, bias_var.initializer ]
+                init_feed_dict[ weights_holder ] = weights
+                init_feed_dict[ bias_holder ] = bias
 
-                image_content_tsr = tf.nn.bias_add( conv_layer_op, bias )
-                
                 # リストに追加しておく
-                self._weights.append( tf.constant( weights ) )
+                self._weights.append( weights_var )
                 self._biases.append( bias )
 
-            # layer "relux_x" の先頭の文字列が Relu を表す "r" の場合 
-            elif ( layer[0] == "r" ):
-                image_content_tsr = tf.nn.relu( image_content_tsr )
+        # 内容画像層・スタイル画像層の順伝播は model() 内で行うので、この時点で初期化しておく
+        self._session.run( init_ops, feed_dict = init_feed_dict )
 
-            # layer "pool_x" の先頭の文字列がプーリング層を表す "p" の場合 
-            else:
-                image_content_tsr = \
-                    tf.nn.max_pool(
-                        value = image_content_tsr,
-                        ksize = [ 1, self._n_pool_wndsize, self._n_pool_wndsize, 1 ],    # プーリングする範囲（ウィンドウ）のサイズ
-                        strides = [ 1, self._n_pool_strides, self._n_pool_strides, 1 ],  # ストライドサイズ strides[0] = strides[3] = 1. とする必要がある
-                        padding = "SAME"                                                 # ゼロパディングを利用する場合は SAME を指定
-                    )
-            
-            network_content[ layer ] = image_content_tsr
-            #print( "image_content_tsr :\n", image_content_tsr )
-        #
-        #print( "network_content :\n", network_content )
-
-        # 内容画像の行列を正規化
-        content_minus_mean_matrix = self._image_content - self._norm_mean_matrix
-        content_norm_matrix = np.array( [content_minus_mean_matrix] )
-
-        #print( "content_minus_mean_matrix :\n", content_minus_mean_matrix.shape )
-        #print( "content_norm_matrix.shape :\n", content_norm_matrix.shape )
-
-        # 構築した 内容画像層のモデルを session.run(...) し、
-        # 学習済み CNN モデルから、内容層の特徴量（画像の内容、形状）を抽出する。
-        self._features_content[ self._content_layer ] =\
-            self._session.run( 
-                network_content[ self._content_layer ], 
-                feed_dict = { self._image_content_holder : content_norm_matrix } 
-            )
+        return self._vgg_weights
 
-        #------------------------------------
-        # スタイル画像層の構築
-        #------------------------------------
-        image_style_tsr = self._image_style_holder
-        network_style = {}          # スタイル画像層のモデル構造
-        self._features_style = {}   # スタイル画像層の特徴量
+
+    def vgg_network( self, input_tsr ):
+        """
+        build_vgg_weights(...) で生成した共有の重みを用いて、
+        入力 Tensor に対する VGG の各層（最も深い内容層・スタイル層まで）を構築する。
+
+        [Input]
+            input_tsr : Tensor
+                VGG に入力する画像の Tensor [batch, height, width, channels]
+
+        [Output]
+            network : dict <str, Tensor>
+                _vgg_layers で定義した各層名をキーとした各層の中身（Tensor）
+        """
+        network = {}
 
         # _vgg_layers を構成する layer から layer を取り出し、
         # 種類に応じて、モデルを具体的に構築していく。
-        for ( i, layer ) in enumerate( self._vgg_layers ):
+        for layer in self._vgg_layers[ : self.n_vgg_layers_used() ]:
             # layer "convx_x" の先頭の文字列が畳み込み層を表す "c" の場合 
             if ( layer[0] == "c" ):
-                # network_weights から weights とバイアス項に対応するデータを抽出
-                weights, bias = network_weights[i][0][0][0][0]
-
-                # StyleNet モデルに対応するように reshape
-                weights = np.transpose( weights, (1,0,2,3) )
-                bias = bias.reshape(-1)
+                weights_tsr, bias_tsr = self._vgg_weights[ layer ]
 
                 # 畳み込み層を構築
                 conv_layer_op = \
                     tf.nn.conv2d(
-                        input = image_style_tsr,
-                        filter = tf.constant( weights ),                       # 畳込み処理で input で指定した Tensor との積和に使用する filter 行列（カーネル）
+                        input = input_tsr,
+                        filter = weights_tsr,                                  # 畳込み処理で input で指定した Tensor との積和に使用する filter 行列（カーネル）
                         strides = [ 1, self._n_strides, self._n_strides, 1 ],  # strides[0] = strides[3] = 1. とする必要がある]
                         padding = "SAME"                                       # ゼロパディングを利用する場合は SAME を指定
                     )
 
-                image_style_tsr = tf.nn.bias_add( conv_layer_op, bias )
-
-                # リストに追加しておく
-                self._weights.append( tf.constant( weights ) )
-                self._biases.append( bias )
+                input_tsr = tf.nn.bias_add( conv_layer_op, bias_tsr )
 
             # layer "relux_x" の先頭の文字列が Relu を表す "r" の場合 
             elif ( layer[0] == "r" ):
-                image_style_tsr = tf.nn.relu( image_style_tsr )
+                input_tsr = tf.nn.relu( input_tsr )
 
             # layer "pool_x" の先頭の文字列がプーリング層を表す "p" の場合 
             else:
-                image_style_tsr = \
+                input_tsr = \
                     tf.nn.max_pool(
-                        value = image_style_tsr,
+                        value = input_tsr,
                         ksize = [ 1, self._n_pool_wndsize, self._n_pool_wndsize, 1 ],    # プーリングする範囲（ウィンドウ）のサイズ
                         strides = [ 1, self._n_pool_strides, self._n_pool_strides, 1 ],  # ストライドサイズ strides[0] = strides[3] = 1. とする必要がある
                         padding = "SAME"                                                 # ゼロパディングを利用する場合は SAME を指定
                     )
 
-            
-            network_style[ layer ] = image_style_tsr
-            #print( "image_style_tsr :\n", image_style_tsr )
-        #
-        #print( "network_style :\n", network_style )
+            network[ layer ] = input_tsr
+
+        return network
+
+
+    def features_cache_key( self, image, layers ):
+        """
+        特徴量のキャッシュファイルを識別するためのキーを生成する。
+        画像の内容のハッシュ値、層の構成、学習済み CNN モデル（VGG）のファイル、畳み込み・プーリング処理のパラメータから生成する。
+
+        [Input]
+            image : ndarray
+                VGG に入力する画像の配列
+            layers : list <str>
+                特徴量を抽出する層の構成
+
+        [Output]
+            key : str
+                キャッシュファイルを識別するためのキー（SHA-1 のハッシュ値）
+        """
+        # npy ファイルのディレクトリの場合、convert_model_info(...) で npy ファイルを上書きしても
+        # ディレクトリ自体の更新時刻は変わらないので、各 npy ファイルのサイズと更新時刻を用いる
+        if ( os.path.isdir( self._vgg_mat_file ) ):
+            vgg_files = sorted( file for file in os.listdir( self._vgg_mat_file ) if file.endswith( ".npy" ) )
+        else:
+            vgg_files = [ "" ]
+
+        vgg_stats = []
+        for file in vgg_files:
+            file_stat = os.stat( os.path.join( self._vgg_mat_file, file ) if file else self._vgg_mat_file )
+            vgg_stats.append( ( file, file_stat.st_size, file_stat.st_mtime_ns ) )
+
+        hash_obj = hashlib.sha1()
+        hash_obj.update( np.ascontiguousarray( image ).tobytes() )
+        hash_obj.update( str( image.shape ).encode( "utf-8" ) )
+        hash_obj.update( ",".join( layers ).encode( "utf-8" ) )
+        hash_obj.update( 
+            str( ( os.path.abspath( self._vgg_mat_file ), vgg_stats ) ).encode( "utf-8" ) 
+        )
+        hash_obj.update( 
+            str( ( self._n_strides, self._n_pool_wndsize, self._n_pool_strides ) ).encode( "utf-8" ) 
+        )
+
+        return hash_obj.hexdigest()
+
+
+    def load_features_cache( self, prefix, key ):
+        """
+        キャッシュファイルから特徴量を読み込む。
+
+        [Input]
+            prefix : str
+                キャッシュファイル名の接頭辞 "content" or "style"
+            key : str
+                features_cache_key(...) で生成したキー
+
+        [Output]
+            features : dict <str, ndarray>
+                層名をキーとした特徴量。キャッシュが存在しない場合は None
+        """
+        cache_file = os.path.join( self._features_cache_dir, "{}_{}.npz".format( prefix, key ) )
+        if ( os.path.isfile( cache_file ) == False ):
+            return None
+
+        with np.load( cache_file ) as cache_data:
+            features = { layer : cache_data[ layer ] for layer in cache_data.files }
+
+        return features
+
+
+    def save_features_cache( self, prefix, key, features ):
+        """
+        特徴量をキャッシュファイルに保存する。
+
+        [Input]
+            prefix : str
+                キャッシュファイル名の接頭辞 "content" or "style"
+            key : str
+                features_cache_key(...) で生成したキー
+            features : dict <str, ndarray>
+                層名をキーとした特徴量
+        """
+        if ( os.path.isdir( self._features_cache_dir ) == False ):
+            os.makedirs( self._features_cache_dir )
+
+        # 複数のジョブから同時に書き込まれても壊れたファイルを読まないように、一時ファイルに書き込んでから rename する
+        cache_file = os.path.join( self._features_cache_dir, "{}_{}.npz".format( prefix, key ) )
+        temp_file = "{}.{}.tmp.npz".format( cache_file[ : -len(".npz") ], os.getpid() )
+        np.savez( temp_file, **features )
+        os.replace( temp_file, cache_file )
+
+        return
+
+
+    def load_vgg_weights( self ):
+        """
+        学習済み StyleNet 用 CNN モデル（VGG）のパラメータを読み込み、
+        各ネットワークで共有する畳み込み層の重みの Tensor を生成する。
+        """
+        # 学習済み CNN モデルの重み＋バイアス項を含んだ network_weights と
+        # 画像を正規化するための正規化行列を取り出す。
+        # _vgg_mat_file に convert_model_info(...) で変換した npy ファイルのディレクトリが指定された場合は、
+        # mat ファイルを parse せずに、必要な層のみを memory map で読み込む。
+        if ( os.path.isdir( self._vgg_mat_file ) == True ):
+            self._norm_mean_matrix, network_weights = self.load_model_info_npy( npy_dir = self._vgg_mat_file )
+        else:
+            self._norm_mean_matrix, network_weights = self.load_model_info( mat_file_path = self._vgg_mat_file )
+        #print( "norm_mean_matrix :\n", self._norm_mean_matrix )
+        #print( "network_weights :\n", network_weights )
+
+        # 内容画像層、スタイル画像層、トレーニング対象の画像で共有する重みを一度だけ生成
+        self.build_vgg_weights( network_weights )
+
+        return
 
-        # スタイル画像の行列を正規化
-        style_minus_mean_matrix = self._image_style - self._norm_mean_matrix
-        style_norm_matrix = np.array( [style_minus_mean_matrix] )
 
-        #print( "style_minus_mean_matrix :\n", style_minus_mean_matrix.shape )
-        #print( "style_norm_matrix.shape :\n", style_norm_matrix.shape )
+    def extract_features_style( self ):
+        """
+        スタイル画像層を構築し、学習済み CNN モデルからスタイル層の特徴量（グラム行列）を抽出する。
+        特徴量が指定済み、又はキャッシュに保存されている場合は、スタイル画像層の構築と順伝播処理を省略する。
 
-        # 構築した スタイル画像層のモデルを session.run(...) し、
-        # 学習済み CNN モデルから、内容層の特徴量（画像の内容、形状）を抽出する。
-        for layer in self._style_layers:
-            layer_output =\
+        [Output]
+            self._features_style : dict <str, ndarray>
+                スタイル層名をキーとしたグラム行列
+        """
+        # キャッシュに同じスタイル画像・スタイル層・VGG のグラム行列が保存されている場合は、
+        # スタイル画像層の構築と順伝播処理を省略する。
+        style_cache_key = None
+        if ( ( self._features_style == None ) and ( self._features_cache_dir != None ) ):
+            style_cache_key = self.features_cache_key( self._image_style, self._style_layers )
+            self._features_style = self.load_features_cache( "style", style_cache_key )
+
+        if ( self._features_style == None ):
+            network_style = self.vgg_network( self._image_style_holder )    # スタイル画像層のモデル構造
+            self._features_style = {}                                       # スタイル画像層の特徴量
+            #print( "network_style :\n", network_style )
+
+            # スタイル画像の行列を正規化
+            style_minus_mean_matrix = self._image_style - self._norm_mean_matrix
+            style_norm_matrix = np.array( [style_minus_mean_matrix] )
+
+            #print( "style_minus_mean_matrix :\n", style_minus_mean_matrix.shape )
+            #print( "style_norm_matrix.shape :\n", style_norm_matrix.shape )
+
+            # 構築した スタイル画像層のモデルを session.run(...) し、
+            # 学習済み CNN モデルから、スタイル層の特徴量を抽出する。
+            # 全スタイル層を１回の session.run(...) でまとめて取得する。
+            layer_outputs =\
                 self._session.run( 
-                    network_style[ layer ], 
+                    [ network_style[ layer ] for layer in self._style_layers ], 
                     feed_dict = { self._image_style_holder : style_norm_matrix } 
                 )
 
-            # ?
-            layer_output = np.reshape( layer_output, ( -1, layer_output.shape[3] ) )
+            for ( layer, layer_output ) in zip( self._style_layers, layer_outputs ):
+                # ?
+                layer_output = np.reshape( layer_output, ( -1, layer_output.shape[3] ) )
 
-            # ? グラム行列 A^T * A
-            style_gram_matrix = np.matmul( layer_output.T, layer_output ) / layer_output.size
+                # ? グラム行列 A^T * A
+                style_gram_matrix = np.matmul( layer_output.T, layer_output ) / layer_output.size
 
-            # 特徴量のリストに格納
-            self._features_style[ layer ] = style_gram_matrix
+                # 特徴量のリストに格納
+                self._features_style[ layer ] = style_gram_matrix
 
-        #--------------------------------------------------------------------
-        # 内容画像とスタイル画像を組み合わせる処理のモデルを構築
-        # ここで構築したモデル（Variable）が、StyleNet のトレーニング対象となる
-        # この処理は、ランダムノイズを適用した Variable に対する vgg_net
-        #--------------------------------------------------------------------
-        self._image_var = tf.Variable(
-                            tf.random_normal( shape = (1,) + self._image_content.shape ) * 0.256
-                        )
-        noize_image_tsr = self._image_var
+            if ( style_cache_key != None ):
+                self.save_features_cache( "style", style_cache_key, self._features_style )
 
-        # _vgg_layers を構成する layer から layer を取り出し、
-        # 種類に応じて、モデルを具体的に構築していく。
-        for ( i, layer ) in enumerate( self._vgg_layers ):
-            # layer "convx_x" の先頭の文字列が畳み込み層を表す "c" の場合 
-            if ( layer[0] == "c" ):
-                # network_weights から weights とバイアス項に対応するデータを抽出
-                weights, bias = network_weights[i][0][0][0][0]
+        return self._features_style
 
-                # StyleNet モデルに対応するように reshape
-                weights = np.transpose( weights, (1,0,2,3) )
-                bias = bias.reshape(-1)
 
-                # 畳み込み層を構築
-                conv_layer_op = \
-                    tf.nn.conv2d(
-                        input = noize_image_tsr,
-                        filter = tf.constant( weights ),                       # 畳込み処理で input で指定した Tensor との積和に使用する filter 行列（カーネル）
-                        strides = [ 1, self._n_strides, self._n_strides, 1 ],  # strides[0] = strides[3] = 1. とする必要がある]
-                        padding = "SAME"                                       # ゼロパディングを利用する場合は SAME を指定
-                    )
-
-                noize_image_tsr = tf.nn.bias_add( conv_layer_op, bias )
+    def model( self ):
+        """
+        モデルの定義を行い、
+        最終的なモデルの出力のオペレーター self._y_out_op を設定する。
+        [Output]
+            self._y_out_op : Operator
+                モデルの出力のオペレーター
+        """
+        #------------------------------------------------------
+        # 学習済み StyleNet 用 CNN モデルのパラメータを読み込む
+        #------------------------------------------------------
+        self.load_vgg_weights()
 
-                # リストに追加しておく
-                self._weights.append( tf.constant( weights ) )
-                self._biases.append( bias )
+        #------------------------------------
+        # 内容画像層の構築
+        #------------------------------------
+        # キャッシュに同じ内容画像・内容層・VGG の特徴量が保存されている場合は、
+        # 内容画像層の構築と順伝播処理を省略する。
+        content_cache_key = None
+        self._features_content = None
+        if ( self._features_cache_dir != None ):
+            content_cache_key = self.features_cache_key( self._image_contents, [ self._content_layer ] )
+            self._features_content = self.load_features_cache( "content", content_cache_key )
+
+        if ( self._features_content == None ):
+            network_content = self.vgg_network( self._image_content_holder )    # 内容画像層のモデル構造（Tensor型の list）
+            self._features_content = {}                                         # 内容画像層の特徴量
+            #print( "network_content :\n", network_content )
+
+            # 内容画像の行列を正規化（バッチ処理時は全内容画像をまとめて正規化）
+            content_norm_matrix = self._image_contents - self._norm_mean_matrix
+
+            #print( "content_norm_matrix.shape :\n", content_norm_matrix.shape )
+
+            # 構築した 内容画像層のモデルを session.run(...) し、
+            # 学習済み CNN モデルから、内容層の特徴量（画像の内容、形状）を抽出する。
+            self._features_content[ self._content_layer ] =\
+                self._session.run( 
+                    network_content[ self._content_layer ], 
+                    feed_dict = { self._image_content_holder : content_norm_matrix } 
+                )
 
-            # layer "relux_x" の先頭の文字列が Relu を表す "r" の場合 
-            elif ( layer[0] == "r" ):
-                noize_image_tsr = tf.nn.relu( noize_image_tsr )
+            if ( content_cache_key != None ):
+                self.save_features_cache( "content", content_cache_key, self._features_content )
 
-            # layer "pool_x" の先頭の文字列がプーリング層を表す "p" の場合 
-            else:
-                noize_image_tsr = \
-                    tf.nn.max_pool(
-                        value = noize_image_tsr,
-                        ksize = [ 1, self._n_pool_wndsize, self._n_pool_wndsize, 1 ],    # プーリングする範囲（ウィンドウ）のサイズ
-                        strides = [ 1, self._n_pool_strides, self._n_pool_strides, 1 ],  # ストライドサイズ strides[0] = strides[3] = 1. とする必要がある
-                        padding = "SAME"                                                 # ゼロパディングを利用する場合は SAME を指定
-                    )
+        #------------------------------------
+        # スタイル画像層の構築
+        #------------------------------------
+        self.extract_features_style()
 
-            
-            self._vgg_network[ layer ] = noize_image_tsr
-            #print( "noize_image_tsr :\n", noize_image_tsr )
-        #
+        #--------------------------------------------------------------------
+        # 内容画像とスタイル画像を組み合わせる処理のモデルを構築
+        # ここで構築したモデル（Variable）が、StyleNet のトレーニング対象となる
+        # この処理は、ランダムノイズを適用した Variable に対する vgg_net
+        # バッチ処理時は [_n_images, height, width, channels] の Variable をまとめてトレーニングする
+        #--------------------------------------------------------------------
+        if ( self._image_init is None ):
+            self._image_var = tf.Variable(
+                                tf.random_normal( shape = (self._n_images,) + self._image_content.shape ) * 0.256
+                            )
+        else:
+            # 初期値とする画像を内容画像のサイズに拡大縮小し、正規化した値で初期化する
+            image_init = np.reshape( self._image_init, (-1,) + self._image_init.shape[-3:] )
+            image_init = np.array( [ 
+                scipy.misc.imresize( np.clip( image, 0, 255 ).astype( np.uint8 ), self._image_content.shape[:2] ) 
+                for image in image_init
+            ] )
+            self._image_var = tf.Variable(
+                                ( image_init - self._norm_mean_matrix ).astype( np.float32 )
+                            )
+
+        self._vgg_network = self.vgg_network( self._image_var )
         #print( "_vgg_network :\n", self._vgg_network )
         #self._y_out_op = self._vgg_network
 
         return self._y_out_op
 
 
-    def loss( self ):
+    def loss_content( self, network, features_content ):
         """
-        損失関数の定義を行う。
-                    
+        内容画像層の損失関数を定義する。
+
+        [Input]
+            network : dict <str, Tensor>
+                vgg_network(...) で構築した生成画像に対する VGG の各層
+            features_content : ndarray or Tensor
+                内容層の特徴量
+
         [Output]
-            self._loss_op : Operator
-                損失関数を表すオペレーター
+            loss_content_op : Operator
+                内容層の特徴量との平均２乗誤差 × _weight_image_content
         """
-        #-------------------------------------------------------
-        # 内容画像層の損失値
-        #-------------------------------------------------------
-        self._loss_content_op = \
+        # 2 * tf.nn.l2_loss( x ) / x.size と同じ値（x の shape が動的な場合にも対応）
+        loss_content_op = \
             self._weight_image_content * \
-            ( 2 * tf.nn.l2_loss( 
-                      self._vgg_network[self._content_layer] - self._features_content[self._content_layer] 
-                  ) / self._features_content[ self._content_layer ].size
-            )
+            tf.reduce_mean( tf.square( network[ self._content_layer ] - features_content ) )
 
-        #-------------------------------------------------------
-        # 内容画像層の損失値
-        #-------------------------------------------------------
-        loss_style = 0
+        return loss_content_op
+
+
+    def loss_style( self, network ):
+        """
+        スタイル画像層の損失関数を定義する。
+
+        [Input]
+            network : dict <str, Tensor>
+                vgg_network(...) で構築した生成画像に対する VGG の各層
+
+        [Output]
+            loss_style_op : Operator
+                スタイル層毎のグラム行列とスタイル画像のグラム行列との平均２乗誤差の和 × _weight_image_style
+        """
         style_losses = []
         for style_layer in self._style_layers:
             # スタイル層の style_layer 番目のモデルの内容を抽出
-            layer = self._vgg_network[ style_layer ]
+            layer = network[ style_layer ]
 
-            #
-            feats, height, width, channels = [x.value for x in layer.get_shape()]
-            size = height * width * channels
-            features = tf.reshape( layer, (-1, channels) )
+            # バッチ内の画像毎にグラム行列を算出する [batch, channels, channels]
+            layer_shape = tf.shape( layer )
+            channels = layer.get_shape()[3].value
+            size = tf.cast( layer_shape[1] * layer_shape[2] * layer_shape[3], tf.float32 )
+            features = tf.reshape( layer, ( layer_shape[0], -1, channels ) )
 
-            style_gram_matrix = tf.matmul( tf.transpose(features), features ) / size
+            style_gram_matrix = tf.matmul( features, features, transpose_a = True ) / size
             style_expected = self._features_style[ style_layer ]
-            #style_temp_loss = sess.run(2 * tf.nn.l2_loss(style_gram_matrix - style_expected) / style_expected.size)
-            #print('Layer: {}, Loss: {}'.format(style_layer, style_temp_loss))
 
+            # 共通のスタイル画像のグラム行列との差をバッチ内の画像で平均する
+            # 2 * tf.nn.l2_loss( x ) / ( style_expected.size * batch ) と同じ値
             style_losses.append(
-                2 * tf.nn.l2_loss( style_gram_matrix - style_expected ) / style_expected.size
+                tf.reduce_mean( tf.square( style_gram_matrix - style_expected ) )
             )
 
-        self._loss_style_op = 0
-        self._loss_style_op += self._weight_image_style  * tf.reduce_sum( style_losses )
+        loss_style_op = self._weight_image_style * tf.reduce_sum( style_losses )
 
-        #-------------------------------------------------------
-        # 内容層とスタイル層のノイズ付き合成加工に応じた、全変動損失関数
-        # 滑らかな結果を得るためことを目的としている
-        #-------------------------------------------------------
+        return loss_style_op
+
+
+    def loss_total_var( self, image_tsr ):
+        """
+        内容層とスタイル層のノイズ付き合成加工に応じた、全変動損失関数を定義する。
+        滑らかな結果を得るためことを目的としている
+
+        [Input]
+            image_tsr : Tensor
+                生成画像の Tensor [batch, height, width, channels]
+
+        [Output]
+            loss_total_var_op : Operator
+        """
         # ?
-        # tf.reduce_prod(...) : 積の操作で縮約
-        total_var_x = self._session.run( 
-            tf.reduce_prod( self._image_var[ :, 1:, :, : ].get_shape() )   #  
-        )
-        total_var_y = self._session.run(
-            tf.reduce_prod( self._image_var[ :, :, 1:, : ].get_shape() )
-        )
+        # tf.size(...) : 要素数（バッチサイズ、画像サイズが動的な場合にも対応）
+        total_var_x = tf.cast( tf.size( image_tsr[ :, 1:, :, : ] ), tf.float32 )
+        total_var_y = tf.cast( tf.size( image_tsr[ :, :, 1:, : ] ), tf.float32 )
 
         # ?
         first_term = self._weight_regularization  * 2
         second_term_numerator = tf.nn.l2_loss(
-                                    self._image_var[ :, 1:, :, : ] 
-                                    - self._image_var[ :, :( (1,) + self._image_content.shape )[1] - 1, :, : ]
+                                    image_tsr[ :, 1:, :, : ] 
+                                    - image_tsr[ :, :-1, :, : ]
                                 )
         second_term = second_term_numerator / total_var_y
         third_term = ( 
                          tf.nn.l2_loss( 
-                             self._image_var[ :, :, 1:, : ] 
-                             - self._image_var[ :, :, :( (1,) + self._image_content.shape )[2] - 1, : ] 
+                             image_tsr[ :, :, 1:, : ] 
+                             - image_tsr[ :, :, :-1, : ] 
                          ) / total_var_x 
                      )
-        self._loss_total_var_op = first_term * ( second_term + third_term )
+        loss_total_var_op = first_term * ( second_term + third_term )
+
+        return loss_total_var_op
+
+
+    def loss( self ):
+        """
+        損失関数の定義を行う。
+                    
+        [Output]
+            self._loss_op : Operator
+                損失関数を表すオペレーター
+        """
+        #-------------------------------------------------------
+        # 内容画像層の損失値
+        #-------------------------------------------------------
+        self._loss_content_op = self.loss_content( self._vgg_network, self._features_content[ self._content_layer ] )
+
+        #-------------------------------------------------------
+        # スタイル画像層の損失値
+        #-------------------------------------------------------
+        self._loss_style_op = self.loss_style( self._vgg_network )
+
+        #-------------------------------------------------------
+        # 内容層とスタイル層のノイズ付き合成加工に応じた、全変動損失関数
+        #-------------------------------------------------------
+        self._loss_total_var_op = self.loss_total_var( self._image_var )
 
         #-------------------------------------------------------
         # 最終的な損失関数の Operator
@@ -700,15 +1058,28 @@ class CNNStyleNet( object ):
         [Output]
             optimizer の train_step
         """
+        # L-BFGS の場合は、トレーニング対象の画像データ（Variable）のみを最適化対象とする
+        if ( isinstance( nnOptimizer, LBFGS ) ):
+            self._train_step = nnOptimizer.train_step( self._loss_op, var_list = [ self._image_var ] )
+        else:
+            self._train_step = nnOptimizer.train_step( self._loss_op )
+
+            # トレーニングステップと同じ session.run(...) で、更新後の画像を取得するためのオペレーター
+            with tf.control_dependencies( [ self._train_step ] ):
+                self._image_updated_op = self._image_var.read_value()
+
         self._optimizer = nnOptimizer._optimizer
-        self._train_step = nnOptimizer.train_step( self._loss_op )
         
         return self._train_step
 
 
-    def run( self ):
+    def run( self, b_save_temp_image = True ):
         """
         StyleNet を駆動し、損失値と途中生成画像を生成し、一時保存する。
+
+        [Input]
+            b_save_temp_image : bool
+                True の場合は、評価処理ステップ毎に途中生成画像を保存する
         """
         #----------------------------
         # 画像生成開始処理
@@ -723,22 +1094,32 @@ class CNNStyleNet( object ):
         if ( os.path.isdir( "output_image" ) == False):
             os.makedirs( "output_image" )
 
+        # 最適化アルゴリズムに L-BFGS が指定されている場合
+        if ( isinstance( self._train_step, tf.contrib.opt.ScipyOptimizerInterface ) ):
+            self.run_lbfgs()
+            return
+
         #-----------------------------------------
         # 画像生成処理
         #-----------------------------------------
         for epoch in range( self._epochs ):
             print( "epoch : %d" % epoch )
-            # 設定された最適化アルゴリズム Optimizer で
-            # トレーニング処理（内容画像とスタイル画像に対するがノイズ付き合成）を run
-            self._session.run( self._train_step )
+            # 評価処理ステップ以外の場合
+            if ( (epoch + 1) % self._eval_step != 0 ):
+                # 設定された最適化アルゴリズム Optimizer で
+                # トレーニング処理（内容画像とスタイル画像に対するがノイズ付き合成）を run
+                self._session.run( self._train_step )
 
             # 評価処理ステップの場合
-            if ( (epoch + 1) % self._eval_step == 0 ):
-                # 損失関数値の算出
-                loss = self._session.run( self._loss_op )
-                loss_content = self._session.run( self._loss_content_op )
-                loss_style = self._session.run( self._loss_style_op )
-                loss_total_var = self._session.run( self._loss_total_var_op )
+            else:
+                # トレーニング処理と、損失関数値（トレーニングステップでの順伝播処理の値）の算出、
+                # 途中生成画像（トレーニングステップ実行後の値）の取得を１回の session.run(...) で行う
+                fetches = [ self._train_step, self._loss_op, self._loss_content_op, self._loss_style_op, self._loss_total_var_op ]
+                if ( b_save_temp_image == True ):
+                    fetches.append( self._image_updated_op )
+
+                values = self._session.run( fetches )
+                loss, loss_content, loss_style, loss_total_var = values[1:5]
 
                 self._losses_train.append( loss )
                 self._losses_content_train.append( loss_content )
@@ -749,22 +1130,91 @@ class CNNStyleNet( object ):
                       ( epoch + 1, loss, loss_content, loss_style, loss_total_var ) )
                 
                 # 途中生成画像の保存
-                image_eval = self._session.run( self._image_var )
-                image_eval = image_eval.reshape( self._image_content.shape ) + self._norm_mean_matrix
-
-                output_file = "output_image/temp_output_image{}.jpg".format( epoch + 1 )
-                scipy.misc.imsave( output_file, image_eval )
+                if ( b_save_temp_image == True ):
+                    self.save_image_var( values[5], "output_image/temp_output_image{}".format( epoch + 1 ) )
 
         # 最終生成画像の保存
         image_eval = self._session.run( self._image_var )
-        image_eval = image_eval.reshape( self._image_content.shape ) + self._norm_mean_matrix
+        self._images_output = self.save_image_var( image_eval, "output_image/output_image" )
+
+        return
 
-        output_file = "output_image/output_image.jpg"
-        scipy.misc.imsave( output_file, image_eval )
+
+    def run_lbfgs( self ):
+        """
+        最適化アルゴリズムに L-BFGS（LBFGS クラス）を指定した場合の画像生成処理。
+        scipy の L-BFGS-B による反復処理全体を１回の minimize(...) で実行し、
+        反復毎のコールバックで、_eval_step 間隔で損失値の記録と途中生成画像の保存を行う。
+        損失関数値の改善が停滞した場合（LBFGS の ftol 以下）は、最大反復回数に達する前に終了する。
+        """
+        # 最後に評価した損失関数値 [ loss, loss_content, loss_style, loss_total_var ]
+        losses_eval = [ None ]
+        n_iter = [ 0 ]
+
+        def loss_callback( loss, loss_content, loss_style, loss_total_var ):
+            # 損失関数の評価毎に呼び出される
+            losses_eval[0] = ( loss, loss_content, loss_style, loss_total_var )
+            return
+
+        def step_callback( image_packed ):
+            # L-BFGS の反復毎に、その反復で更新された Variable の値（１次元に pack されたもの）を引数として呼び出される
+            n_iter[0] += 1
+            if ( n_iter[0] % self._eval_step != 0 ):
+                return
+
+            loss, loss_content, loss_style, loss_total_var = losses_eval[0]
+            self._losses_train.append( loss )
+            self._losses_content_train.append( loss_content )
+            self._losses_style_train.append( loss_style )
+            self._losses_total_var_train.append( loss_total_var )
+
+            print( "iter %d / loss = %0.1f / loss_content = %0.1f / loss_style = %0.1f / loss_total_var = %0.1f" % 
+                  ( n_iter[0], loss, loss_content, loss_style, loss_total_var ) )
+
+            # 途中生成画像の保存
+            self.save_image_var( image_packed, "output_image/temp_output_image{}".format( n_iter[0] ) )
+            return
+
+        self._train_step.minimize( 
+            session = self._session,
+            fetches = [ self._loss_op, self._loss_content_op, self._loss_style_op, self._loss_total_var_op ],
+            loss_callback = loss_callback,
+            step_callback = step_callback
+        )
+
+        # 最終生成画像の保存
+        image_eval = self._session.run( self._image_var )
+        self._images_output = self.save_image_var( image_eval, "output_image/output_image" )
 
         return
 
 
+    def save_image_var( self, image_eval, file_name ):
+        """
+        トレーニング対象の画像データ（Variable）の値を、正規化を戻した上で jpg ファイルに保存する。
+        バッチ処理時は、ファイル名の後ろに内容画像の番号を付けて画像毎に保存する。
+
+        [Input]
+            image_eval : ndarray
+                session.run( self._image_var ) の値 [ _n_images, height, width, channels ]
+            file_name : str
+                保存するファイル名（拡張子なし）
+
+        [Output]
+            images : ndarray
+                正規化を戻した生成画像 [ _n_images, height, width, channels ]
+        """
+        images = image_eval.reshape( (self._n_images,) + self._image_content.shape ) + self._norm_mean_matrix
+
+        if ( self._n_images == 1 ):
+            scipy.misc.imsave( file_name + ".jpg", images[0] )
+        else:
+            for ( i, image ) in enumerate( images ):
+                scipy.misc.imsave( "{}_{}.jpg".format( file_name, i ), image )
+
+        return images
+
+
     def show_output_image( self ):
         """
         合成出力した画像を plot する。
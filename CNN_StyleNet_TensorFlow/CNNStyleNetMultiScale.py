@@ -0,0 +1,202 @@
+# -*- coding:utf-8 -*-
+# Anaconda 4.3.0 環境 (TensorFlow インストール済み)
+
+"""
+    更新情報
+    [26/10/19] : 新規作成
+    [17/xx/xx] :
+               :
+"""
+import numpy as np
+
+# TensorFlow ライブラリ
+import tensorflow as tf
+from tensorflow.python.framework import ops
+
+# 自作クラス
+from CNNStyleNet import CNNStyleNet
+
+
+class CNNStyleNetMultiScale( object ):
+    """
+    粗い解像度から細かい解像度へと段階的に画像生成する（Coarse-to-fine）CNN-StyleNet を表すクラス.
+    解像度毎に計算グラフを構築して CNNStyleNet で画像生成し、
+    前の解像度で生成した画像を拡大したものを、次の解像度でのトレーニング対象の画像の初期値とする。
+    反復処理の大部分を縮小画像で行い、元の解像度では少ない反復回数で仕上げる。
+    ------------------------------------------------------------------------------------------------
+    [public] public アクセス可能なインスタスンス変数には, 便宜上変数名の最後にアンダースコア _ を付ける.
+        _scales : list <float>
+            各段階での内容画像の拡大縮小率（昇順）
+            ex) [ 0.25, 0.5, 1.0 ]
+        _epochs : list <int>
+            各段階でのエポック数（トレーニング回数）
+        _eval_step : int
+            学習処理時に評価指数の算出処理＆途中生成画像の出力を行う step 間隔
+
+        _image_content_path : str or list <str>
+            内容画像ファイルのパス
+        _image_style_path : str
+            スタイル画像ファイルのパス
+        _vgg_mat_file : str
+            学習済み CNN モデル（VGG）の mat ファイル、又は npy ファイルのディレクトリのパス
+
+        _weight_image_content : float
+        _weight_image_style : float
+        _weight_regularization : int
+
+        _n_strides : int
+        _n_pool_wndsize : int
+        _n_pool_strides : int
+        _features_cache_dir : str
+            CNNStyleNet に渡す特徴量のキャッシュファイルのディレクトリのパス
+
+        _styleNets : list <CNNStyleNet>
+            各段階で画像生成した CNNStyleNet
+        _images_output : ndarray
+            最終的に生成した画像 [ _n_images, height, width, channels ]
+
+        _losses_train : list <float32>
+            全段階を通しての損失関数の値の list
+        _losses_content_train : list <float32>
+        _losses_style_train : list <float32>
+        _losses_total_var_train : list <float32>
+
+    [protedted] protedted な使用法を想定
+
+
+    [private] 変数名の前にダブルアンダースコア __ を付ける（Pythonルール）
+
+
+    """
+    def __init__(
+            self,
+            image_content_path,
+            image_style_path,
+            vgg_mat_file,
+            scales = [ 0.25, 0.5, 1.0 ],
+            epochs = [ 1000, 300, 100 ],
+            eval_step = 50,
+            weight_image_content = 5.0,
+            weight_image_style = 500.0,
+            weight_regularization = 100,
+            n_strides = 1,
+            n_pool_wndsize = 2,
+            n_pool_strides = 2,
+            features_cache_dir = None
+        ):
+
+        # 各パラメータの初期化
+        self._scales = scales
+        self._epochs = epochs
+        self._eval_step = eval_step
+
+        self._image_content_path = image_content_path
+        self._image_style_path = image_style_path
+        self._vgg_mat_file = vgg_mat_file
+
+        self._weight_image_content = weight_image_content
+        self._weight_image_style = weight_image_style
+        self._weight_regularization = weight_regularization
+
+        self._n_strides = n_strides
+        self._n_pool_wndsize = n_pool_wndsize
+        self._n_pool_strides = n_pool_strides
+        self._features_cache_dir = features_cache_dir
+
+        self._styleNets = []
+        self._images_output = None
+
+        # evaluate 関連の初期化
+        self._losses_train = []
+        self._losses_content_train = []
+        self._losses_style_train = []
+        self._losses_total_var_train = []
+
+        return
+
+    def print( self, str ):
+        print( "----------------------------------" )
+        print( self )
+        print( str )
+
+        print( "_scales : ", self._scales )
+        print( "_epochs : ", self._epochs )
+        print( "_eval_step : ", self._eval_step )
+
+        print( "_image_content_path : ", self._image_content_path )
+        print( "_image_style_path : ", self._image_style_path )
+        print( "_vgg_mat_file : ", self._vgg_mat_file )
+
+        print( "_weight_image_content : ", self._weight_image_content )
+        print( "_weight_image_style : ", self._weight_image_style )
+        print( "_weight_regularization : ", self._weight_regularization )
+
+        print( "_features_cache_dir : ", self._features_cache_dir )
+        print( "_styleNets : ", self._styleNets )
+
+        print( "----------------------------------" )
+
+        return
+
+
+    def run( self, create_optimizer ):
+        """
+        粗い解像度から順に CNNStyleNet を駆動し、最終的な生成画像を生成する。
+
+        [Input]
+            create_optimizer : function
+                NNOptimizer のクラスのオブジェクトを生成する関数
+                解像度毎に別の計算グラフを構築するので、Optimizer も解像度毎に生成する
+                ex) lambda : Adam( learning_rate = 0.01 )
+
+        [Output]
+            self._images_output : ndarray
+                最終的に生成した画像 [ _n_images, height, width, channels ]
+        """
+        self._styleNets = []
+        image_init = None
+
+        for ( scale, epochs ) in zip( self._scales, self._epochs ):
+            print( "scale : %0.3f / epochs : %d" % ( scale, epochs ) )
+
+            # 解像度毎に placeholder, Variable の shape が異なるので、別の計算グラフ、Session で構築する
+            graph = tf.Graph()
+            with graph.as_default():
+                session = tf.Session( graph = graph )
+
+                styleNet = CNNStyleNet(
+                               image_content_path = self._image_content_path,
+                               image_style_path = self._image_style_path,
+                               vgg_mat_file = self._vgg_mat_file,
+                               session = session,
+                               epochs = epochs,
+                               eval_step = self._eval_step,
+                               weight_image_content = self._weight_image_content,
+                               weight_image_style = self._weight_image_style,
+                               weight_regularization = self._weight_regularization,
+                               n_strides = self._n_strides,
+                               n_pool_wndsize = self._n_pool_wndsize,
+                               n_pool_strides = self._n_pool_strides,
+                               features_cache_dir = self._features_cache_dir,
+                               image_scale = scale,
+                               image_init = image_init      # 前の解像度で生成した画像（CNNStyleNet 内で拡大される）
+                           )
+
+                styleNet.model()
+                styleNet.loss()
+                styleNet.optimizer( create_optimizer() )
+                styleNet.run()
+
+                session.close()
+
+            self._losses_train.extend( styleNet._losses_train )
+            self._losses_content_train.extend( styleNet._losses_content_train )
+            self._losses_style_train.extend( styleNet._losses_style_train )
+            self._losses_total_var_train.extend( styleNet._losses_total_var_train )
+
+            self._styleNets.append( styleNet )
+            image_init = styleNet._images_output
+
+        self._images_output = image_init
+
+        return self._images_output
@@ -0,0 +1,342 @@
+# -*- coding:utf-8 -*-
+# Anaconda 4.3.0 環境 (TensorFlow インストール済み)
+
+"""
+    更新情報
+    [26/10/19] : 新規作成
+               : スタイル層のグラム行列を、内容画像全体の幅に合わせたスタイル画像から、タイル単位の順伝播で累積して算出するように変更
+    [17/xx/xx] :
+               :
+"""
+# I/O 関連
+import os
+
+import scipy.misc
+
+import numpy as np
+
+# TensorFlow ライブラリ
+import tensorflow as tf
+from tensorflow.python.framework import ops
+
+# 自作クラス
+from CNNStyleNet import CNNStyleNet
+
+
+class CNNStyleNetTiled( object ):
+    """
+    大きな内容画像を、重なりを持つタイルに分割して画像生成する CNN-StyleNet を表すクラス.
+    タイル毎に計算グラフを構築して CNNStyleNet で画像生成し、重なり部分を線形に重み付けして合成する。
+    スタイル層のグラム行列は、内容画像全体の幅に合わせて拡大縮小したスタイル画像からタイルのループ前に一度だけ算出し、
+    全タイルで共有する（タイルの幅に合わせるとスタイルの模様のスケールがタイルのサイズに依存してしまうため）。
+    この際もスタイル画像をタイルに分割して順伝播し、グラム行列の和を累積するので、
+    スタイル画像の順伝播、及び各タイルの画像生成のメモリ使用量は、内容画像全体のサイズではなく、タイルのサイズに比例する。
+    ------------------------------------------------------------------------------------------------
+    [public] public アクセス可能なインスタスンス変数には, 便宜上変数名の最後にアンダースコア _ を付ける.
+        _tile_size : int
+            タイルの高さ、幅の pixel 数
+        _tile_overlap : int
+            隣り合うタイルが重なる pixel 数
+        _epochs : int
+            タイル毎のエポック数（トレーニング回数）
+        _eval_step : int
+            学習処理時に評価指数の算出処理＆途中生成画像の出力を行う step 間隔
+
+        _image_content_path : str
+            内容画像ファイルのパス
+        _image_style_path : str
+            スタイル画像ファイルのパス
+        _vgg_mat_file : str
+            学習済み CNN モデル（VGG）の mat ファイル、又は npy ファイルのディレクトリのパス
+
+        _image_content :　ndarray
+            内容画像全体の配列
+
+        _weight_image_content : float
+        _weight_image_style : float
+        _weight_regularization : int
+
+        _n_strides : int
+        _n_pool_wndsize : int
+        _n_pool_strides : int
+        _features_cache_dir : str
+            CNNStyleNet に渡す特徴量のキャッシュファイルのディレクトリのパス
+
+        _features_style : dict <str, ndarray>
+            全タイルで共有するスタイル層のグラム行列
+        _image_output : ndarray
+            タイルを合成して最終的に生成した画像 [ height, width, channels ]
+
+    [protedted] protedted な使用法を想定
+
+
+    [private] 変数名の前にダブルアンダースコア __ を付ける（Pythonルール）
+
+
+    """
+    def __init__(
+            self,
+            image_content_path,
+            image_style_path,
+            vgg_mat_file,
+            tile_size = 512,
+            tile_overlap = 64,
+            epochs = 1000,
+            eval_step = 50,
+            weight_image_content = 5.0,
+            weight_image_style = 500.0,
+            weight_regularization = 100,
+            n_strides = 1,
+            n_pool_wndsize = 2,
+            n_pool_strides = 2,
+            features_cache_dir = None
+        ):
+
+        # 各パラメータの初期化
+        self._tile_size = tile_size
+        self._tile_overlap = tile_overlap
+        self._epochs = epochs
+        self._eval_step = eval_step
+
+        self._image_content_path = image_content_path
+        self._image_style_path = image_style_path
+        self._vgg_mat_file = vgg_mat_file
+
+        self._weight_image_content = weight_image_content
+        self._weight_image_style = weight_image_style
+        self._weight_regularization = weight_regularization
+
+        self._n_strides = n_strides
+        self._n_pool_wndsize = n_pool_wndsize
+        self._n_pool_strides = n_pool_strides
+        self._features_cache_dir = features_cache_dir
+
+        self._features_style = None
+        self._image_output = None
+
+        # 内容画像全体の読み込み
+        self._image_content = scipy.misc.imread( image_content_path )
+
+        return
+
+    def print( self, str ):
+        print( "----------------------------------" )
+        print( self )
+        print( str )
+
+        print( "_tile_size : ", self._tile_size )
+        print( "_tile_overlap : ", self._tile_overlap )
+        print( "_epochs : ", self._epochs )
+        print( "_eval_step : ", self._eval_step )
+
+        print( "_image_content_path : ", self._image_content_path )
+        print( "_image_style_path : ", self._image_style_path )
+        print( "_vgg_mat_file : ", self._vgg_mat_file )
+        print( "_image_content.shape : ", self._image_content.shape )
+
+        print( "_weight_image_content : ", self._weight_image_content )
+        print( "_weight_image_style : ", self._weight_image_style )
+        print( "_weight_regularization : ", self._weight_regularization )
+
+        print( "_features_cache_dir : ", self._features_cache_dir )
+
+        print( "----------------------------------" )
+
+        return
+
+
+    def tile_positions( self, length ):
+        """
+        画像の高さ or 幅 length を、重なりを持つタイルで覆うための各タイルの開始位置を返す。
+        全てのタイルは同じサイズとし、最後のタイルは画像の端に揃える。
+
+        [Input]
+            length : int
+                画像の高さ or 幅の pixel 数
+
+        [Output]
+            positions : list <int>
+                各タイルの開始位置
+            tile_length : int
+                タイルの高さ or 幅の pixel 数
+        """
+        tile_length = min( self._tile_size, length )
+        stride = max( tile_length - self._tile_overlap, 1 )
+
+        positions = list( range( 0, length - tile_length + 1, stride ) )
+        if ( positions[-1] != length - tile_length ):
+            positions.append( length - tile_length )
+
+        return ( positions, tile_length )
+
+
+    def tile_blend_weights( self, tile_height, tile_width ):
+        """
+        タイルの合成用の重みを返す。
+        タイルの端から _tile_overlap pixel の範囲で線形に減衰させ、重なり部分の継ぎ目を目立たなくする。
+
+        [Output]
+            weights : ndarray
+                タイルの各 pixel の重み [ tile_height, tile_width, 1 ]
+        """
+        def ramp( length ):
+            index = np.arange( length, dtype = np.float32 )
+            return np.minimum( 1.0, np.minimum( index + 1, length - index ) / ( self._tile_overlap + 1 ) )
+
+        weights = np.outer( ramp( tile_height ), ramp( tile_width ) )
+
+        return weights[ :, :, np.newaxis ]
+
+
+    def extract_features_style( self ):
+        """
+        内容画像全体の幅に合わせて拡大縮小したスタイル画像から、スタイル層のグラム行列を算出する。
+        スタイル画像を重なりのないタイルに分割して VGG で順伝播し、各スタイル層の F^T * F の和と位置の数を累積して、
+        最後に一度だけ正規化する。VGG のネットワークはタイルのサイズの入力に対してのみ構築・実行する。
+        タイルの境界では畳み込みのゼロパディングの分だけ、スタイル画像全体を一度に順伝播した場合と値が異なる。
+
+        [Output]
+            self._features_style : dict <str, ndarray>
+                全タイルで共有するスタイル層のグラム行列
+        """
+        # スタイル画像を、内容画像全体の幅に合わせる（CNNStyleNet.load_image_contant_style(...) と同じ倍率）
+        image_style = scipy.misc.imread( self._image_style_path )
+        image_style = scipy.misc.imresize( image_style, self._image_content.shape[1] / image_style.shape[1] )
+
+        graph = tf.Graph()
+        with graph.as_default():
+            session = tf.Session( graph = graph )
+
+            # 重み・正規化行列の読み込みとネットワークの構築のみに使用するので、内容画像は１タイル分とする
+            styleNet = CNNStyleNet(
+                           image_content_path = self._image_content[ : self._tile_size, : self._tile_size ],
+                           image_style_path = self._image_style_path,
+                           vgg_mat_file = self._vgg_mat_file,
+                           session = session,
+                           n_strides = self._n_strides,
+                           n_pool_wndsize = self._n_pool_wndsize,
+                           n_pool_strides = self._n_pool_strides,
+                           features_cache_dir = self._features_cache_dir
+                       )
+
+            styleNet.load_vgg_weights()
+            style_layers = styleNet._style_layers
+
+            # タイルへの分割により、スタイル画像全体を一度に順伝播した場合とは値が異なるので、別のキャッシュファイルとする
+            style_cache_prefix = "style_tile{}".format( self._tile_size )
+            style_cache_key = None
+            if ( self._features_cache_dir != None ):
+                style_cache_key = styleNet.features_cache_key( image_style, style_layers )
+                self._features_style = styleNet.load_features_cache( style_cache_prefix, style_cache_key )
+
+            if ( self._features_style is None ):
+                # 高さ、幅が可変のタイルを入力とするスタイル画像層
+                style_tile_holder = tf.placeholder( "float", shape = ( 1, None, None, image_style.shape[2] ) )
+                network_style = styleNet.vgg_network( style_tile_holder )
+
+                gram_sums = { layer : 0.0 for layer in style_layers }
+                n_positions = { layer : 0 for layer in style_layers }
+
+                for y in range( 0, image_style.shape[0], self._tile_size ):
+                    for x in range( 0, image_style.shape[1], self._tile_size ):
+                        style_tile = image_style[ y : y + self._tile_size, x : x + self._tile_size ]
+                        style_norm_matrix = np.array( [ style_tile - styleNet._norm_mean_matrix ] )
+
+                        layer_outputs = \
+                            session.run(
+                                [ network_style[ layer ] for layer in style_layers ],
+                                feed_dict = { style_tile_holder : style_norm_matrix }
+                            )
+
+                        for ( layer, layer_output ) in zip( style_layers, layer_outputs ):
+                            layer_output = np.reshape( layer_output, ( -1, layer_output.shape[3] ) ).astype( np.float64 )
+                            gram_sums[ layer ] = gram_sums[ layer ] + np.matmul( layer_output.T, layer_output )
+                            n_positions[ layer ] += layer_output.shape[0]
+
+                # CNNStyleNet.extract_features_style(...) と同じく、特徴量の要素数（位置の数 × チャンネル数）で正規化
+                self._features_style = {
+                    layer : ( gram_sums[ layer ] / ( n_positions[ layer ] * gram_sums[ layer ].shape[0] ) ).astype( np.float32 )
+                    for layer in style_layers
+                }
+
+                if ( style_cache_key != None ):
+                    styleNet.save_features_cache( style_cache_prefix, style_cache_key, self._features_style )
+
+            session.close()
+
+        return self._features_style
+
+
+    def run( self, create_optimizer ):
+        """
+        タイル毎に CNNStyleNet を駆動し、生成したタイルを合成した最終的な生成画像を生成する。
+
+        [Input]
+            create_optimizer : function
+                NNOptimizer のクラスのオブジェクトを生成する関数
+                タイル毎に別の計算グラフを構築するので、Optimizer もタイル毎に生成する
+                ex) lambda : Adam( learning_rate = 0.01 )
+
+        [Output]
+            self._image_output : ndarray
+                タイルを合成して最終的に生成した画像 [ height, width, channels ]
+        """
+        height, width = self._image_content.shape[:2]
+        positions_y, tile_height = self.tile_positions( height )
+        positions_x, tile_width = self.tile_positions( width )
+
+        blend_weights = self.tile_blend_weights( tile_height, tile_width )
+        image_sum = np.zeros( self._image_content.shape, dtype = np.float64 )
+        weight_sum = np.zeros( ( height, width, 1 ), dtype = np.float64 )
+
+        # スタイル層のグラム行列は、タイルのループ前に内容画像全体のサイズで一度だけ算出する
+        if ( self._features_style is None ):
+            self.extract_features_style()
+
+        for y in positions_y:
+            for x in positions_x:
+                print( "tile : y = %d / x = %d" % ( y, x ) )
+                image_tile = self._image_content[ y : y + tile_height, x : x + tile_width ]
+
+                # タイル毎に別の計算グラフ、Session で構築し、タイル分のメモリのみを使用する
+                graph = tf.Graph()
+                with graph.as_default():
+                    session = tf.Session( graph = graph )
+
+                    styleNet = CNNStyleNet(
+                                   image_content_path = image_tile,
+                                   image_style_path = self._image_style_path,
+                                   vgg_mat_file = self._vgg_mat_file,
+                                   session = session,
+                                   epochs = self._epochs,
+                                   eval_step = self._eval_step,
+                                   weight_image_content = self._weight_image_content,
+                                   weight_image_style = self._weight_image_style,
+                                   weight_regularization = self._weight_regularization,
+                                   n_strides = self._n_strides,
+                                   n_pool_wndsize = self._n_pool_wndsize,
+                                   n_pool_strides = self._n_pool_strides,
+                                   features_cache_dir = self._features_cache_dir,
+                                   features_style = self._features_style    # 全タイルで算出済みのグラム行列を共有
+                               )
+
+                    styleNet.model()
+                    styleNet.loss()
+                    styleNet.optimizer( create_optimizer() )
+                    styleNet.run()
+
+                    session.close()
+
+                # 重なり部分を線形に重み付けして合成
+                image_sum[ y : y + tile_height, x : x + tile_width ] += styleNet._images_output[0] * blend_weights
+                weight_sum[ y : y + tile_height, x : x + tile_width ] += blend_weights
+
+        self._image_output = image_sum / weight_sum
+
+        # 最終生成画像の保存
+        if ( os.path.isdir( "output_image" ) == False):
+            os.makedirs( "output_image" )
+
+        scipy.misc.imsave( "output_image/output_image_tiled.jpg", self._image_output )
+
+        return self._image_output
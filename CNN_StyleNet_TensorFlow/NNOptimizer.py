@@ -5,6 +5,7 @@
     更新情報
     [17/11/18] : 新規作成
     [17/11/20] : 最急降下法で学習率が幾何学的に減衰していく最適化アルゴリズム GradentDecentDecay 追加
+    [26/10/19] : 外部 Optimizer インターフェイス経由で scipy の L-BFGS を用いる最適化アルゴリズム LBFGS 追加
                : 
 """
 
@@ -283,3 +284,47 @@ class Adam( NNOptimzer ):
         self._train_step = self._optimizer.minimize( loss_op )
         return self._train_step
 
+
+class LBFGS( NNOptimzer ):
+    """
+    L-BFGS アルゴリズムを表すクラス
+    NNOptimizer クラスの子クラスとして定義
+
+    TensorFlow の外部 Optimizer インターフェイス tf.contrib.opt.ScipyOptimizerInterface を通じて、
+    scipy.optimize.minimize(...) の L-BFGS-B で最適化する。
+    他の Optimizer と異なり、_train_step は session.run(...) するオペレーターではなく、
+    minimize( session, ... ) で最適化処理全体を実行する ScipyOptimizerInterface のオブジェクトとなる。
+    [public]
+        _max_iter : int
+            最大反復回数
+        _ftol : float
+            損失関数の相対的な改善量がこの値以下になった場合に、反復を打ち切る
+        _max_corrections : int
+            L-BFGS で保持する修正ベクトルの数
+    """
+    def __init__( self, max_iter = 1000, ftol = 1e-7, max_corrections = 10, node_name = "LBFGS_Optimizer" ):
+        self._learning_rate = None
+        self._max_iter = max_iter
+        self._ftol = ftol
+        self._max_corrections = max_corrections
+        self._node_name = node_name
+        self._optimizer = self.optimizer()
+        self._train_step = None
+
+        return
+    
+    def optimizer( self ):
+        # ScipyOptimizerInterface は損失関数の指定が必要なため、train_step(...) で生成する
+        self._optimizer = None
+        return self._optimizer
+
+    def train_step( self, loss_op, var_list = None ):
+        self._train_step = tf.contrib.opt.ScipyOptimizerInterface( 
+                               loss_op,
+                               var_list = var_list,
+                               method = "L-BFGS-B",
+                               options = { "maxiter" : self._max_iter, "ftol" : self._ftol, "maxcor" : self._max_corrections }
+                           )
+        self._optimizer = self._train_step
+
+        return self._train_step
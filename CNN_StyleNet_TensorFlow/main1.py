@@ -6,6 +6,8 @@
 #     pip install --ignore-installed --upgrade tensorflow
 #     pip install --ignore-installed --upgrade tensorflow-gpu
 
+import os
+
 import numpy
 import pandas
 import matplotlib.pyplot as plt
@@ -39,6 +41,7 @@ from NNOptimizer import NesterovMomentum
 from NNOptimizer import Adagrad
 from NNOptimizer import Adadelta
 from NNOptimizer import Adam
+from NNOptimizer import LBFGS
 
 from CNNStyleNet import CNNStyleNet
 
@@ -80,6 +83,8 @@ def main():
     #======================================================================
     image_content_path1 = "C:\Data\MachineLearning_DataSet\CNN-StyleNet\image_content\\neko-sensei.jpg"
     image_style_path1 = "C:\Data\MachineLearning_DataSet\CNN-StyleNet\image_style\starry_night.jpg"
+    vgg_mat_file1 = "C:\Data\MachineLearning_DataSet\CNN-StyleNet\imagenet-vgg-verydeep-19.mat"
+    vgg_npy_dir1 = "C:\Data\MachineLearning_DataSet\CNN-StyleNet\imagenet-vgg-verydeep-19_npy"
     learning_rate1 = 0.01
     adam_beta1 = 0.9        # For the Adam optimizer
     adam_beta2 = 0.999      # For the Adam optimizer
@@ -96,10 +101,15 @@ def main():
     #     x_input_holder = tf.placeholder(tf.float32, [None, input_size])
     #     y_input_holder = tf.placeholder(tf.fload32, [None, num_classes])
     #======================================================================
+    # 学習済み VGG の mat ファイルを層毎の npy ファイルに変換しておく（初回のみ）
+    # 以降は npy ファイルを memory map で読み込む
+    if ( os.path.isdir( vgg_npy_dir1 ) == False ):
+        CNNStyleNet.convert_model_info( mat_file_path = vgg_mat_file1, npy_dir = vgg_npy_dir1 )
+
     styleNet1 = CNNStyleNet(
                     image_content_path = image_content_path1,
                     image_style_path = image_style_path1,
-                    vgg_mat_file = "C:\Data\MachineLearning_DataSet\CNN-StyleNet\imagenet-vgg-verydeep-19.mat",
+                    vgg_mat_file = vgg_npy_dir1,
                     session = tf.Session( config = tf.ConfigProto(log_device_placement=True) ),
                     epochs = 10000,
                     eval_step = 50,
@@ -108,7 +118,8 @@ def main():
                     weight_regularization = 100,
                     n_strides = 1,
                     n_pool_wndsize = 2,
-                    n_pool_strides = 2
+                    n_pool_strides = 2,
+                    features_cache_dir = "features_cache"
                 )
     
     styleNet1.print( "" )
@@ -134,6 +145,7 @@ def main():
     styleNet1.optimizer( Adam( learning_rate = learning_rate1, beta1 = adam_beta1, beta2 = adam_beta2 ) )
     #styleNet1._session.run( tf.global_variables_initializer() )
     #styleNet1.optimizer( GradientDecent( learning_rate = learning_rate1 ) )
+    #styleNet1.optimizer( LBFGS( max_iter = 1000 ) )
 
     # TensorBoard 用のファイル（フォルダ）を作成
     styleNet1.write_tensorboard_graph()
@@ -0,0 +1,106 @@
+# -*- coding:utf-8 -*-
+# Anaconda 4.3.0 環境 (TensorFlow インストール済み)
+#     <Anaconda Prompt>
+#     conda create -n tensorflow python=3.5
+#     activate tensorflow
+#     pip install --ignore-installed --upgrade tensorflow
+#     pip install --ignore-installed --upgrade tensorflow-gpu
+
+import os
+
+import numpy
+import pandas
+import matplotlib.pyplot as plt
+
+# TensorFlow ライブラリ
+import tensorflow as tf
+from tensorflow.python.framework import ops
+
+# 自作クラス
+#from MLPlot import MLPlot
+
+import NNActivation                                     # ニューラルネットワークの活性化関数を表すクラス
+from NNActivation import NNActivation
+from NNActivation import Sigmoid
+from NNActivation import Relu
+from NNActivation import Softmax
+
+import NNLoss                                           # ニューラルネットワークの損失関数を表すクラス
+from NNLoss import L1Norm
+from NNLoss import L2Norm
+from NNLoss import BinaryCrossEntropy
+from NNLoss import CrossEntropy
+from NNLoss import SoftmaxCrossEntropy
+from NNLoss import SparseSoftmaxCrossEntropy
+
+import NNOptimizer                                      # ニューラルネットワークの最適化アルゴリズム Optimizer を表すクラス
+from NNOptimizer import GradientDecent
+from NNOptimizer import GradientDecentDecay
+from NNOptimizer import Momentum
+from NNOptimizer import NesterovMomentum
+from NNOptimizer import Adagrad
+from NNOptimizer import Adadelta
+from NNOptimizer import Adam
+from NNOptimizer import LBFGS
+
+from CNNStyleNet import CNNStyleNet
+from CNNStyleNetTiled import CNNStyleNetTiled
+
+
+def main():
+    """
+    TensorFlow を用いた CNN-StyleNet / NeuralStyle（ニューラルスタイル）による画像生成処理
+    大きな内容画像を重なりを持つタイルに分割して画像生成する
+    """
+    print("Enter main()")
+
+    #======================================================================
+    # アルゴリズム（モデル）のパラメータを設定
+    # Set algorithm parameters.
+    # ex) learning_rate = 0.01  iterations = 1000
+    #======================================================================
+    image_content_path1 = "C:\Data\MachineLearning_DataSet\CNN-StyleNet\image_content\\neko-sensei.jpg"
+    image_style_path1 = "C:\Data\MachineLearning_DataSet\CNN-StyleNet\image_style\starry_night.jpg"
+    vgg_mat_file1 = "C:\Data\MachineLearning_DataSet\CNN-StyleNet\imagenet-vgg-verydeep-19.mat"
+    vgg_npy_dir1 = "C:\Data\MachineLearning_DataSet\CNN-StyleNet\imagenet-vgg-verydeep-19_npy"
+    learning_rate1 = 0.01
+    adam_beta1 = 0.9        # For the Adam optimizer
+    adam_beta2 = 0.999      # For the Adam optimizer
+
+    # 学習済み VGG の mat ファイルを層毎の npy ファイルに変換しておく（初回のみ）
+    if ( os.path.isdir( vgg_npy_dir1 ) == False ):
+        CNNStyleNet.convert_model_info( mat_file_path = vgg_mat_file1, npy_dir = vgg_npy_dir1 )
+
+    #======================================================================
+    # 変数とプレースホルダを設定
+    # Initialize variables and placeholders.
+    #======================================================================
+    # 512 x 512 pixel のタイル毎に画像生成し、64 pixel の重なり部分を合成する
+    styleNet1 = CNNStyleNetTiled(
+                    image_content_path = image_content_path1,
+                    image_style_path = image_style_path1,
+                    vgg_mat_file = vgg_npy_dir1,
+                    tile_size = 512,
+                    tile_overlap = 64,
+                    epochs = 2000,
+                    eval_step = 50,
+                    weight_image_content = 200.0,
+                    weight_image_style = 200.0,
+                    weight_regularization = 100,
+                    features_cache_dir = "features_cache"
+                )
+    
+    styleNet1.print( "" )
+
+    #======================================================================
+    # モデルの初期化と学習（トレーニング）
+    # タイル毎に、モデルの構造、損失関数、最適化アルゴリズムを設定して画像生成する
+    #======================================================================
+    styleNet1.run( lambda : Adam( learning_rate = learning_rate1, beta1 = adam_beta1, beta2 = adam_beta2 ) )
+
+    print("Finish main()")
+    return
+    
+
+if __name__ == '__main__':
+     main()
@@ -0,0 +1,143 @@
+# -*- coding:utf-8 -*-
+# Anaconda 4.3.0 環境 (TensorFlow インストール済み)
+#     <Anaconda Prompt>
+#     conda create -n tensorflow python=3.5
+#     activate tensorflow
+#     pip install --ignore-installed --upgrade tensorflow
+#     pip install --ignore-installed --upgrade tensorflow-gpu
+
+import os
+import glob
+
+import scipy.misc
+
+import numpy
+import pandas
+import matplotlib.pyplot as plt
+
+# TensorFlow ライブラリ
+import tensorflow as tf
+from tensorflow.python.framework import ops
+
+# 自作クラス
+#from MLPlot import MLPlot
+
+import NNActivation                                     # ニューラルネットワークの活性化関数を表すクラス
+from NNActivation import NNActivation
+from NNActivation import Sigmoid
+from NNActivation import Relu
+from NNActivation import Softmax
+
+import NNLoss                                           # ニューラルネットワークの損失関数を表すクラス
+from NNLoss import L1Norm
+from NNLoss import L2Norm
+from NNLoss import BinaryCrossEntropy
+from NNLoss import CrossEntropy
+from NNLoss import SoftmaxCrossEntropy
+from NNLoss import SparseSoftmaxCrossEntropy
+
+import NNOptimizer                                      # ニューラルネットワークの最適化アルゴリズム Optimizer を表すクラス
+from NNOptimizer import GradientDecent
+from NNOptimizer import GradientDecentDecay
+from NNOptimizer import Momentum
+from NNOptimizer import NesterovMomentum
+from NNOptimizer import Adagrad
+from NNOptimizer import Adadelta
+from NNOptimizer import Adam
+from NNOptimizer import LBFGS
+
+from CNNStyleNet import CNNStyleNet
+from CNNFastStyleNet import CNNFastStyleNet
+
+
+def main():
+    """
+    TensorFlow を用いた CNN-StyleNet / NeuralStyle（ニューラルスタイル）による画像生成処理
+    スタイル画像毎に画像変換ネットワークを学習し、１回の順伝播処理でスタイル変換する（Fast Style Transfer）
+    """
+    print("Enter main()")
+
+    #======================================================================
+    # アルゴリズム（モデル）のパラメータを設定
+    # Set algorithm parameters.
+    # ex) learning_rate = 0.01  iterations = 1000
+    #======================================================================
+    image_train_dir1 = "C:\\Data\\MachineLearning_DataSet\\CNN-StyleNet\\image_train"
+    image_content_path1 = "C:\Data\MachineLearning_DataSet\CNN-StyleNet\image_content\\neko-sensei.jpg"
+    image_style_path1 = "C:\Data\MachineLearning_DataSet\CNN-StyleNet\image_style\starry_night.jpg"
+    vgg_mat_file1 = "C:\Data\MachineLearning_DataSet\CNN-StyleNet\imagenet-vgg-verydeep-19.mat"
+    vgg_npy_dir1 = "C:\Data\MachineLearning_DataSet\CNN-StyleNet\imagenet-vgg-verydeep-19_npy"
+    learning_rate1 = 0.001
+    adam_beta1 = 0.9        # For the Adam optimizer
+    adam_beta2 = 0.999      # For the Adam optimizer
+
+    # 学習済み VGG の mat ファイルを層毎の npy ファイルに変換しておく（初回のみ）
+    if ( os.path.isdir( vgg_npy_dir1 ) == False ):
+        CNNStyleNet.convert_model_info( mat_file_path = vgg_mat_file1, npy_dir = vgg_npy_dir1 )
+
+    #======================================================================
+    # 変数とプレースホルダを設定
+    # Initialize variables and placeholders.
+    #======================================================================
+    styleNet1 = CNNFastStyleNet(
+                    image_style_path = image_style_path1,
+                    vgg_mat_file = vgg_npy_dir1,
+                    session = tf.Session(),
+                    image_size = ( 256, 256 ),
+                    epochs = 2,
+                    batch_size = 4,
+                    eval_step = 50,
+                    weight_image_content = 200.0,
+                    weight_image_style = 200.0,
+                    weight_regularization = 100,
+                    features_cache_dir = "features_cache"
+                )
+
+    #======================================================================
+    # モデルの構造、損失関数、最適化アルゴリズムを設定する。
+    #======================================================================
+    styleNet1.model()
+    styleNet1.loss()
+    styleNet1.optimizer( Adam( learning_rate = learning_rate1, beta1 = adam_beta1, beta2 = adam_beta2 ) )
+
+    styleNet1.print( "after optimizer()" )
+
+    #======================================================================
+    # モデルの初期化と学習（トレーニング）
+    # 画像変換ネットワークはスタイル画像毎に１回だけ学習し、保存しておく
+    #======================================================================
+    styleNet1.fit( glob.glob( os.path.join( image_train_dir1, "*.jpg" ) ) )
+    styleNet1.save_model( dir = "./model_session", file_name = "fast_stylenet_variables" )
+
+    #======================================================================
+    # デプロイと新しい成果指標の予想 (Optional)
+    # 学習済みの画像変換ネットワークの１回の順伝播処理でスタイル変換
+    #======================================================================
+    image_output = styleNet1.predict( scipy.misc.imread( image_content_path1, mode = "RGB" ) )
+    scipy.misc.imsave( "CNN_StyleNet_4-1.jpg", image_output )
+
+    #-------------------------------------------------------------------
+    # トレーニング回数に対する loss 値の plot
+    #-------------------------------------------------------------------
+    plt.clf()
+    plt.plot(
+        range( len(styleNet1._losses_train) ), styleNet1._losses_train,
+        label = "losses",
+        linestyle = '-',
+        #linewidth = 2,
+        color = 'black'
+    )
+    plt.title( "loss : AdamOptimizer / fast style transfer" )
+    plt.legend( loc = 'best' )
+    plt.xlabel( "Epocs %d / eval_step %d" % ( styleNet1._epochs, styleNet1._eval_step ) )
+    plt.tight_layout()
+   
+    plt.savefig("CNN_StyleNet_4-2.png", dpi = 300, bbox_inches = "tight" )
+    plt.show()
+
+    print("Finish main()")
+    return
+    
+
+if __name__ == '__main__':
+     main()
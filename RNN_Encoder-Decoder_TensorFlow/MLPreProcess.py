@@ -16,6 +16,10 @@
     [17/12/08] : The Project Gutenberg EBook にある、シェイクスピア作品のテキストデータの読み込み関数 `load_textdata_by_shakespeare_from_theProjectGutenbergEBook(...)` 追加
     [17/12/09] : テキストデータを数値インデックスの配列に変換する関数 `text_vocabulary_processing_without_tensorflow( ... )` 追加
     [17/12/10] : 整数の加算演算データセット `generate_add_uint_operation_dataset(...)` 生成関数追加
+    [26/10/19] : `generate_add_uint_operation_dataset(...)` に one-hot encoding せずに int8 の数値インデックスで返すオプション bOneHot を追加
+               : `text_vocabulary_processing_without_tensorflow(...)` を TextVocabulary クラスによる処理に変更（行を跨いだ単語の連結の修正、出現頻度順のインデックス、一括変換）
+               : テキストデータの読み込み関数を、MLTextPreProcess の１行ずつ読み込み＆クリーニングするジェネレータによる処理に変更
+               : `generate_adding_problem(...)`, `generate_add_uint_operation_dataset(...)` をループなしのベクトル化した処理に変更し、ミニバッチ単位で逐次生成するジェネレータを追加
     [xx/xx/xx] :
 
 """
@@ -56,6 +60,10 @@ from sklearn.pipeline import Pipeline                   # パイプライン
 # TensorFlow ライブラリ関連
 import tensorflow as tf
 
+# 自作クラス
+from MLTextPreProcess import MLTextPreProcess   # テキストデータの前処理を行うクラス
+from MLTextPreProcess import TextVocabulary     # テキストデータの vocabulary を表すクラス
+
 
 class MLPreProcess( object ):
     """
@@ -245,44 +253,81 @@ class MLPreProcess( object ):
             adding_targets : nadarry / shape = ( n_sequence )
                 出力
         """
-        numpy.random.seed( seed = seed )
-        
+        random_state = numpy.random.RandomState( seed )
+
+        return MLPreProcess.sampling_adding_problem( random_state, t, n_sequence )
+
+    @staticmethod
+    def generate_adding_problem_batches( t, batch_size, n_batches = None, seed = 12 ):
+        """
+        Adding Problem の入出力データを、ミニバッチ単位で逐次生成するジェネレータ
+        データセット全体をメモリに保持せずに、トレーニング処理中に新しいデータを供給し続ける。
+
+        [Input]
+            t : int
+                1 つのシーケンスのサイズ
+            batch_size : int
+                ミニバッチのシーケンスの数
+            n_batches : int
+                生成するミニバッチの数（None の場合は無限に生成する）
+
+        [Output]
+            adding_data, adding_targets : nadarry
+                generate_adding_problem(...) と同じ形式の、１ミニバッチ分のデータ
+        """
+        random_state = numpy.random.RandomState( seed )
+
+        i = 0
+        while ( ( n_batches is None ) or ( i < n_batches ) ):
+            # yield 文で逐次データを return（関数の処理を一旦停止し、値を返す）
+            yield MLPreProcess.sampling_adding_problem( random_state, t, batch_size )
+            i += 1
+
+    @staticmethod
+    def sampling_adding_problem( random_state, t, n_sequence ):
+        """
+        乱数生成器 random_state から、Adding Problem の入出力データをまとめて生成する。
+        各シーケンスで値が 1 となるマスクの位置 2 箇所は、一様乱数のキーに対する
+        numpy.argpartition(...) で、シーケンス毎のループなしに全シーケンスまとめて選択する。
+
+        [Input]
+            random_state : numpy.random.RandomState
+                乱数生成器
+            t : int
+                1 つのシーケンスのサイズ
+            n_sequence :int
+                シーケンスの数
+
+        [Output]
+            adding_data, adding_targets : nadarry
+                generate_adding_problem(...) と同じ形式のデータ
+        """
         # 0~1 の間の一様ランダムからなるシグナル（シーケンス）× シグナル数（シーケンス数）作成
-        singnals = numpy.random.uniform( low = 0.0, high = 1.0, size = ( n_sequence, t ) )
-        
+        singnals = random_state.uniform( low = 0.0, high = 1.0, size = ( n_sequence, t ) )
+
         #-----------------------------
         # 0 or 1 からなるマスクの作成
         #-----------------------------
-        # まず全体を 0 で埋める
+        # 一様乱数のキーの小さい方から 2 つの位置を、重複なしのランダムな位置とする
+        # numpy.argpartition(...) : 全体をソートせずに、小さい方から 2 つとそれ以外に分割する
+        keys = random_state.uniform( size = ( n_sequence, t ) )
+        indices = numpy.argpartition( keys, 1, axis = 1 )[ :, :2 ]
+
         masks = numpy.zeros( shape = ( n_sequence, t ) )
+        masks[ numpy.arange( n_sequence )[ :, numpy.newaxis ], indices ] = 1
 
-        for i in range( n_sequence ):
-            # マスクの値 0 or 1
-            mask = numpy.zeros( shape = ( t ) )
-            # numpy.random.permutation(...) : 配列をランダムに入れ替え
-            inidices = numpy.random.permutation( numpy.arange(t) )[:2]
-            mask[inidices] = 1
-            masks[i] = mask
-        
         #-----------------------------
         # シグナル×マスクの作成
         #-----------------------------
-        # まず全体を 0 で埋める
-        adding_data = numpy.zeros( shape = ( n_sequence, t, 2 ) )
-        
-        # シグナルの配列
-        adding_data[ :, :, 0 ] = singnals
-        
-        # マスクの配列
-        adding_data[ :, :, 1 ] = masks
+        adding_data = numpy.stack( [ singnals, masks ], axis = 2 )
 
-        # 出力
-        adding_targets = ( singnals * masks ).sum( axis = 1 ).reshape( n_sequence, 1 )
+        # 出力（マスクの位置のシグナルの和）
+        adding_targets = singnals[ numpy.arange( n_sequence )[ :, numpy.newaxis ], indices ].sum( axis = 1 ).reshape( n_sequence, 1 )
 
         return adding_data, adding_targets
 
     @staticmethod
-    def generate_add_uint_operation_dataset( n_samples = 100, digits = 3, seed = 12 ):
+    def generate_add_uint_operation_dataset( n_samples = 100, digits = 3, seed = 12, bOneHot = True ):
         """
         整数の加算演算データセットを生成する。
         加算されるデータは、指定された桁数のランダムな値
@@ -292,6 +337,10 @@ class MLPreProcess( object ):
 
             digit : int
                 生成する整数の桁数
+            bOneHot : bool
+                True の場合、one-hot encoding したデータセットを返す。
+                False の場合、one-hot encoding せずに、int8 の数値インデックスのデータセットを返す。
+                X_features / shape = (n_samples, n_sequence), y_labels / shape = (n_samples, n_sequence)
         [Output]
             X_features : numpy.ndarray / shape = (n_samples, n_sequence(=input_digit), one-hot encoded vector size)
                 加算されるデータセットからなる 3 次元 Numpy 配列 ( padding 処理 & one-hot encode 済み )
@@ -308,79 +357,145 @@ class MLPreProcess( object ):
                 one-hot encoding する際に参照する数値インデックスから文字への map
 
         """
-        numpy.random.seed( seed )
-        
+        random_state = numpy.random.RandomState( seed )
+
+        X_features, y_labels = MLPreProcess.sampling_add_uint_operation( random_state, n_samples, digits, bOneHot )
+        dict_str_to_idx, dict_idx_to_str = MLPreProcess.add_uint_operation_dict()
+
+        return X_features, y_labels, dict_str_to_idx, dict_idx_to_str
+
+    @staticmethod
+    def generate_add_uint_operation_batches( batch_size, digits = 3, n_batches = None, seed = 12, bOneHot = True ):
+        """
+        整数の加算演算データを、ミニバッチ単位で逐次生成するジェネレータ
+        データセット全体をメモリに保持せずに、トレーニング処理中に新しいデータを供給し続ける。
+        文字と数値インデックスの map は add_uint_operation_dict() で取得する。
+
+        [Input]
+            batch_size : int
+                ミニバッチのデータ数
+            digit : int
+                生成する整数の桁数
+            n_batches : int
+                生成するミニバッチの数（None の場合は無限に生成する）
+            bOneHot : bool
+                one-hot encoding したデータを返すか否か
+
+        [Output]
+            X_features, y_labels : numpy.ndarray
+                generate_add_uint_operation_dataset(...) と同じ形式の、１ミニバッチ分のデータ
+        """
+        random_state = numpy.random.RandomState( seed )
+
+        i = 0
+        while ( ( n_batches is None ) or ( i < n_batches ) ):
+            # yield 文で逐次データを return（関数の処理を一旦停止し、値を返す）
+            yield MLPreProcess.sampling_add_uint_operation( random_state, batch_size, digits, bOneHot )
+            i += 1
+
+    @staticmethod
+    def add_uint_operation_dict():
+        """
+        整数の加算演算データの、文字と数値インデックスの map を返す。
+        "0"~"9" は数値インデックス 0~9、"+" は 10、padding の空白 " " は 11
+
+        [Output]
+            dict_str_to_idx : ディクショナリ
+                文字から数値インデックスへの map
+            dict_idx_to_str : ディクショナリ
+                数値インデックスから文字への map
+        """
+        map_str = "0123456789+ "  # map 作成用の使用する文字列
+        # 文字からインデックスへの map
+        dict_str_to_idx = { key: idx for (idx,key) in enumerate( map_str ) }
+
+        # インデックスから文字への map
+        dict_idx_to_str = { idx: key for (key,idx) in dict_str_to_idx.items() }
+
+        return dict_str_to_idx, dict_idx_to_str
+
+    @staticmethod
+    def sampling_add_uint_operation( random_state, n_samples, digits, bOneHot = True ):
+        """
+        乱数生成器 random_state から、整数の加算演算データをまとめて生成する。
+        文字列を経由せずに、整数の各桁を商と剰余の算術演算で取り出して、全データまとめて数値インデックスに変換する。
+
+        [Input]
+            random_state : numpy.random.RandomState
+                乱数生成器
+            n_samples : int
+                データ数
+            digit : int
+                生成する整数の桁数
+            bOneHot : bool
+                one-hot encoding したデータを返すか否か
+
+        [Output]
+            X_features, y_labels : numpy.ndarray
+                generate_add_uint_operation_dataset(...) と同じ形式のデータ
+        """
+        # "+" と padding の空白 " " の数値インデックス（"0"~"9" は各桁の値がそのまま数値インデックス）
+        idx_plus = 10
+        idx_space = 11
+
         def generate_number_uint( digits ):
             """
-            指定された桁数の整数字をランダムに生成する。
+            指定された桁数以下の整数をランダムに生成する。
+            桁数を 1 ~ digits から一様に選び、その桁数の範囲で一様に値を選ぶ（先頭の 0 を含む）
             """
-            number = ""
+            n_digits = random_state.randint( 1, digits + 1, size = n_samples )
+            return ( random_state.uniform( size = n_samples ) * ( 10 ** n_digits ) ).astype( numpy.int64 )
 
-            # 1 ~ digit 番目の桁数に関してのループ
-            for i in range( numpy.random.randint(1, digits+1) ):
-                number += numpy.random.choice( list("0123456789") )
-    
-            return int(number)
-        
-        def padding( str, max_len ):
+        def encode_uint( numbers, max_len ):
             """
-            空白文字の Padding 処理による桁合わせ
+            整数の各桁を左詰めで並べ、残りを空白で padding した数値インデックスの配列と、各整数の桁数を返す。
             """
-            # 空白 × 埋め合わせ数
-            str_padding = str + " " * ( max_len - len(str) )
-            
-            return str_padding
+            # 各整数の桁数（0 は 1 桁）
+            n_digits = 1 + ( numbers[ :, numpy.newaxis ] >= 10 ** numpy.arange( 1, max_len ) ).sum( axis = 1 )
+
+            # 左から pos 番目の桁は、10 の ( 桁数 - 1 - pos ) 乗の位
+            exponents = n_digits[ :, numpy.newaxis ] - 1 - numpy.arange( max_len )
+            digits_idx = ( numbers[ :, numpy.newaxis ] // 10 ** numpy.maximum( exponents, 0 ) ) % 10
+
+            return numpy.where( exponents >= 0, digits_idx, idx_space ), n_digits
 
         # 入力桁数
         input_digit = digits * 2 + 1     # 123+456
         # 出力桁数
         output_digit = digits + 1        # 500+500=1000 のような桁上りのケースを考慮
 
-        # 
-        dat_x = []
-        dat_y = []
-
-        # 指定されたサンプル数ぶんループ処理
-        for i in range( n_samples ):
-            uint_x = generate_number_uint( digits )
-            uint_y = generate_number_uint( digits )
-            #print( "unit_x = {}, uint_y = {}".format( uint_x, uint_y ) )
+        uint_x = generate_number_uint( digits )
+        uint_y = generate_number_uint( digits )
 
-            train = "{}+{}".format( uint_x, uint_y )
-            train = padding( train, input_digit )
-            dat_x.append( train )
-
-            target = "{}".format( uint_x + uint_y )
-            target = padding( target, output_digit )
-            dat_y.append( target )
-
-        print( "dat_x :\n", dat_x )
-        print( "dat_y :\n", dat_y )
+        x_idx, x_len = encode_uint( uint_x, input_digit )
+        y_idx, y_len = encode_uint( uint_y, input_digit )
 
         #---------------------------------------------------------------------
-        # one-hot encoding
+        # "x+y" を空白で padding した数値インデックスのデータ shape = (n_sample, sequence)
         #---------------------------------------------------------------------
-        map_str = "0123456789+ "  # map 作成用の使用する文字列
-        # 文字からインデックスへの map
-        dict_str_to_idx = { key: idx for (idx,key) in enumerate( map_str ) }
-        
-        # インデックスから文字への map
-        dict_idx_to_str = { idx: key for (key,idx) in dict_str_to_idx.items() }
-        #print( "dict_str_to_idx :", dict_str_to_idx )
-        #print( "dict_idx_to_str :", dict_idx_to_str )
+        pos = numpy.arange( input_digit )[ numpy.newaxis, : ]
+        x_len = x_len[ :, numpy.newaxis ]
 
-        # one-hot encode されたデータ shape = (n_sample, sequence, one-hot encodeed vector size)
-        X_features = numpy.zeros( ( len(dat_x), input_digit, len(map_str) ), dtype = numpy.int )
-        y_labels = numpy.zeros( ( len(dat_x), output_digit, len(map_str) ), dtype = numpy.int )
+        # "+" の後ろの位置での、y の桁の位置
+        y_pos = numpy.clip( pos - x_len - 1, 0, input_digit - 1 )
+        y_part = numpy.take_along_axis( y_idx, y_pos, axis = 1 )
 
-        for i in range( n_samples ):
-            for (j, str) in enumerate( dat_x[i] ):
-                X_features[ i, j, dict_str_to_idx[str] ] = 1     # one-hot encode の 1 の部分
-            for (j, str) in enumerate( dat_y[i] ):
-                y_labels[ i, j, dict_str_to_idx[str] ] = 1     # one-hot encode の 1 の部分
+        X_features = numpy.where(
+                         pos < x_len, x_idx,
+                         numpy.where( pos == x_len, idx_plus, y_part )
+                     ).astype( numpy.int8 )
 
-        return X_features, y_labels, dict_str_to_idx, dict_idx_to_str
+        # 加算結果
+        y_labels = encode_uint( uint_x + uint_y, output_digit )[0].astype( numpy.int8 )
 
+        if ( bOneHot == False ):
+            return X_features, y_labels
+
+        # one-hot encode されたデータ shape = (n_sample, sequence, one-hot encodeed vector size)
+        X_features = numpy.eye( idx_space + 1, dtype = int )[ X_features ]
+        y_labels = numpy.eye( idx_space + 1, dtype = int )[ y_labels ]
+
+        return X_features, y_labels
 
     #---------------------------------------------------------
     # 検証用サンプルデータセットを読み込むする関数群
@@ -888,70 +1003,16 @@ class MLPreProcess( object ):
             ...
             ham	Rofl. Its true to its name   
         """
-        text_data = []
-
         #----------------------------------------------------
-        # codecs.open() 関数と with 構文でテキストデータを読み込む
-        # "r" : 文字のまま読み込み
+        # １行ずつ読み込み＆クリーニングするジェネレータから、( ラベル, 本文 ) のリストを作成する
+        # 最後の行は除外される
+        # クリーニング処理は、文字量を減らすために、特殊文字と余分なホワイトスペースを取り除く
         #----------------------------------------------------
-        with codecs.open( path, "r", "utf-8" ) as file:
-           # txt ファイルの各行に関してのループ処理
-           for row in file:
-               # 各行の文字列全体（特殊文字、空白込 : \t　\n）を格納
-               text_data.append( row )
-        
-        #print( "text_data :", text_data )
-         
-        # ? 最後の行の除去処理
-        # text_data[:-1] : 最初の行の文字列 ~ 最後の行 -1 の文字列の配列
-        # ['ham\tGo until jurong point, crazy.. Available only in bugis n great world la e buffet... Cine there got amore wat...\n', 
-        # 'ham\tOk lar... Joking wif u oni...\n', ... 
-        # "ham\tThe guy did some bitching but I acted like i'd be interested in buying something else next week and he gave it to us for free\n" ]
-        text_data = text_data[:-1]
-        #print( "text_data :", text_data )
-
-        # 水平タブを表すエスケープシーケンス `\t` 部分で別の配列に分割する。
-        # split(...) : 文字列の分割
-        # [ ['ham', 'Go until jurong point, crazy.. Available only in bugis n great world la e buffet... Cine there got amore wat...\n'], 
-        #   ['ham', 'Ok lar... Joki ..\n'], ...
-        #   ['ham', "The guy did some bitching but I acted like i'd be interested in buying something else next week and he gave it to us for free\n"]
-        # ]
-        text_data = [ str.split( "\t" ) for str in text_data if len(str) >= 1 ]
-        #print( "text_data :", text_data )
+        text_data = list( MLTextPreProcess.iter_sms_spam_collection( path, bCleaning ) )
 
         # "ham", "spam" の文字列の部分を教師データに切り分け
-        # list(...) : リストの内包表記と合わせて text_data_labels と test_data_feature のリストの生成
-        # zip(*text_data) → zip(*list) : 関数の前のアスタリスクは展開されて解釈されるので、
-        # text_data の内容が "ham" or "spam" , と "本文" 部分に unpack（展開）解釈される。
-        text_data_labels, text_data_features = [ list(str) for str in zip(*text_data) ]
-        #print( "text_data_labels :", text_data_labels )
-        #print( "text_data_features :", text_data_features )
-
-        #----------------------------------------------------------------
-        # クリーニング処理
-        # 文字量を減らすために、特殊文字と余分なホワイトスペースを取り除く
-        #----------------------------------------------------------------
-        if ( bCleaning == True ):
-            def clean_text( str ):
-                # re.sub() : 正規表現で文字列を別の文字列で置換
-                str = re.sub( 
-                          pattern = r"([^\s\w]|_|[0-9])+",  # 正規表現 : []集合, |和集合（または）()グループ化
-                          repl = "",                        # 置換する文字列 : "" なので文字なしに置換
-                          string = str                      # 置換される文字列
-                      )
-                #print( "re.sub(...) :", str )
-
-                # sep.join(seq) : sepを区切り文字として、seqを連結してひとつの文字列にする。
-                # 空白文字 " " を区切りにして分割処理
-                str = " ".join( str.split() )
-                #print( "sep.join( str.split() ) :", str )
-
-                # リスト中の大文字→小文字に変換
-                str = str.lower()
-
-                return str
-
-            text_data_features = [ clean_text(str) for str in text_data_features ]
+        text_data_labels = [ label for (label, text) in text_data ]
+        text_data_features = [ text for (label, text) in text_data ]
 
         return text_data_features, text_data_labels
 
@@ -975,82 +1036,14 @@ class MLPreProcess( object ):
             text_data : list <str>
                 シェイクスピア作品の本文の文字列から成るテキストデータのリスト
         """
-        text_data = []
-
-        #--------------------------------------------------------
-        # codecs.open() 関数と with 構文でテキストデータの読み込む
-        # "r" : 文字のまま読み込み
-        #--------------------------------------------------------
-        with codecs.open( path, "r", "utf-8" ) as file:
-           # txt ファイルの各行に関してのループ処理
-           for row in file:
-               # 各行の文字列全体（特殊文字、空白込 : \t　\n）を格納
-               text_data.append( row )
-
-        # ['\ufeffThe Project Gutenberg EBook of The Complete Works of William Shakespeare, by\r\n', 
-        # 'William Shakespeare\r\n', '\r\n', ...
-        # '\r\n', '*** END: FULL LICENSE ***\r\n']
-        #print( "text_data :\n", text_data )
-
-        # EBook のテキストファイルに含まれている、最初の説明文の段落部分を除外
-        text_data = text_data[ n_DeleteParagraph : ]
-        #print( "text_data :\n", text_data )
-
-        # 改行, 先頭に復帰の特殊文字 \n, \r を削除する
-        text_data = [ str.replace( "\r\n", "" ) for str in text_data ]
-        text_data = [ str.replace( "\n", "" ) for str in text_data ]
-        #print( "text_data :\n", text_data )
-
         #----------------------------------------------------------------
-        # クリーニング処理
-        # 文字量を減らすために、
-        # 各種句読点、余分なホワイトスペースを削除する
+        # １行ずつ読み込み＆クリーニングするジェネレータから、リストを作成する
+        # 改行, 先頭に復帰の特殊文字 \n, \r を削除し、
+        # クリーニング処理では、各種句読点、余分なホワイトスペースを削除する
         # ハイフン "-" と、アポストロフィ "'" は残す。（この作品文章が文章内容を繋ぐのに、頻繁に使用されているため）
+        # 大きなテキストをリストにせずに処理する場合は、MLTextPreProcess.iter_shakespeare_lines(...) を直接使用する
         #----------------------------------------------------------------
-        if ( bCleaning == True ):
-            # string.punctuation : 文字と文字の間の句読点、括弧などをまとめたもの
-            # 置換表現で「!"#$%&'()*+,-./:;<=>?@[\]^_`{|}~」等
-            punctuation = string.punctuation
-            #print( "punctuation :", punctuation )     # punctuation : !"#$%&'()*+,-./:;<=>?@[\]^_`{|}~
-
-            # punctuation から ハイフン "-" と、アポストロフィ "'" を除外
-            # sep.join(seq) : sepを区切り文字として、seqを連結してひとつの文字列にする。
-            punctuation = ''.join( [ x for x in punctuation if x not in ['-', "'"] ] )
-            #print( "punctuation :", punctuation )     # punctuation : !"#$%&()*+,./:;<=>?@[\]^_`{|}~
-
-            def clean_text( str ):
-                # ハイフン "-" と、アポストロフィ "'" 以外の特殊文字をホワイトスペース " " に置換
-                # re.sub() : 正規表現で文字列を別の文字列で置換
-                str = re.sub( 
-                          pattern = r"[{}]".format( punctuation ),  # 正規表現 : []集合, |和集合（または）()グループ化
-                          repl = " ",                               # 置換する文字列 : " " なのでホワイトスペースに置換
-                          string = str                              # 置換される文字列
-                      )
-                #print( "clean_text( str ) / step1 :", str )
-
-                # 任意の空白文字 \s = [\t\n\r\f\v] をホワイトスペース " " に置換
-                # + : １回以上の繰り返し（正規表現）
-                str = re.sub( 
-                          pattern = "\s+",      # 正規表現 : []集合, |和集合（または）()グループ化
-                          repl = " ",           # 置換する文字列 : " " なのでホワイトスペースに置換
-                          string = str          # 置換される文字列
-                      )
-                #print( "clean_text( str ) / step2 :", str )
-
-                # ホワイトスペース " " に置換したものを一斉に除外
-                # str.strip() : 引数を指定しないとホワイトスペースを除去する
-                str = str.strip()
-                #print( "clean_text( str ) / step3 :", str )
-
-                # リスト中の大文字→小文字に変換
-                str = str.lower()
-                #print( "clean_text( str ) / step4 :", str )
-
-                return str
-
-            text_data = [ clean_text(str) for str in text_data ]
-
-        #print( "text_data", text_data )
+        text_data = list( MLTextPreProcess.iter_shakespeare_lines( path, n_DeleteParagraph, bCleaning ) )
 
         return text_data
 
@@ -1115,57 +1108,20 @@ class MLPreProcess( object ):
             n_vocab : int
                 出現頻度の高い単語（ワード、語彙）の数
         """
-        # list<str> → １つの str に変換
-        text_data = "".join( text_data )
-        #print( "text_data:\n", text_data )
-
-        # 空白スペースで split し、単語単位の配列に変換
-        text_data = text_data.split( " " )
-        #print( "text_data:\n", text_data )
-
-        # collections.Counter(...) : 単語などの出現頻度を数える
-        # collections.Counter(...) : Counter( { 'the': 23974, 'and': 19409, ... , '6': 70, '8': 46, '7': 44 } )
-        word_counts = collections.Counter( text_data )
-        #print( "collections.Counter(...) :", word_counts )
-
-        #----------------------------------------------------------------------
-        # 抽出した単語の出現頻度から、
-        # 出現頻度の高い (min_word_freq 値以上の) 単語をディクショナリに登録する。
-        # 出現頻度の低い単語は除外
-        #----------------------------------------------------------------------
-        word_counts = { key: count for (key,count) in word_counts.items() if count > min_word_freq }    # ディクショナリの内包表現
-        
-        #---------------------------------------------------------
-        # 語彙 "xxx" → インデックスへの map を作成
-        #---------------------------------------------------------
-        # dict.keys() : ディクショナリから key を取り出し
-        dict_keys_words = word_counts.keys()
-        #print( "dict_keys_words :\n", dict_keys_words )         # dict_keys(['from', 'fairest', 'creatures', ... , 'donations', 'f'])
-        dict_vcab_to_idx = { key: (idx+1) for (idx,key) in enumerate( dict_keys_words ) }
+        # 各行を空白文字で単語に分割し、出現頻度の高い (min_word_freq 値より多く出現した) 単語を
+        # 出現回数の降順のインデックスで vocabulary に登録する。
         # 不明な key (=vocab) のインデックスとして 0 を登録
-        dict_vcab_to_idx[ "unknown" ] = 0
-        #print( "dict_vcab_to_idx :\n", dict_vcab_to_idx )       # {'from': 1, 'fairest': 2, 'creatures': 3, ... , 'donations': 7509, 'f': 7510}
+        vocabulary = TextVocabulary( min_word_freq = min_word_freq ).fit( text_data )
+
+        # 語彙 "xxx" → インデックスへの map
+        dict_vcab_to_idx = vocabulary._dict_vcab_to_idx
 
-        #---------------------------------------------------------
-        # インデックス → 語彙 "xxx" への map を作成
-        #---------------------------------------------------------
-        dict_idx_to_vocab = { idx: key for (key,idx) in dict_vcab_to_idx.items() }
-        #print( "dict_idx_to_vocab :\n", dict_idx_to_vocab )     # {1: 'from', 2: 'fairest', 3: 'creatures', ... , 7509: 'donations', 7510: 'f'}
+        # インデックス → 語彙 "xxx" への map
+        dict_idx_to_vocab = dict( enumerate( vocabulary._idx_to_vocab ) )
 
-        #---------------------------------------------------------
         # テキストデータのインデックス配列
-        #---------------------------------------------------------
-        text_data_idx = []
-        
-        # テキストから抽出した単語単位の配列 text_data に関してのループ
-        for (idx,words) in enumerate( text_data ):
-            try:
-                text_data_idx.append( dict_vcab_to_idx[words] )
-            except:
-                text_data_idx.append( 0 )
-
-        # list → ndarray に変換
-        text_data_idx = numpy.array( text_data_idx )
+        # vocabulary に含まれない単語はインデックス 0
+        text_data_idx = vocabulary.encode( text_data )
 
         # 単語の数
         n_vocab = len( dict_idx_to_vocab ) + 1
@@ -0,0 +1,148 @@
+# -*- coding:utf-8 -*-
+# Anaconda 5.0.1 環境 (TensorFlow インストール済み)
+
+"""
+    更新情報
+    [26/10/19] : 新規作成
+    [xx/xx/xx] :
+               :
+"""
+
+import numpy
+
+# TensorFlow ライブラリ
+import tensorflow as tf
+from tensorflow.python.framework import ops
+
+
+class BeamSearchDecoder( object ):
+    """
+    RNN の Decoder のビームサーチ [beam search] による復号化を表すクラス
+    バッチ内の全データの全ビームを、計算グラフ内の tf.while_loop(...) でまとめて処理する。
+    ビームの系列、スコア、RNN の状態は、全て Python のリストではなく Tensor で保持する。
+    ------------------------------------------------------------------------------------------------
+    [public] public アクセス可能なインスタスンス変数には, 便宜上変数名の最後にアンダースコア _ を付ける.
+        _beam_width : int
+            ビーム幅（各データで保持する候補の系列の数）
+        _node_name : str
+            この Operator ノードの名前
+
+        _ids_op : Operator
+            復号化した系列のオペレーター [ batch_size, beam_width, n_steps ]
+            各データのビームは、スコアの降順に並ぶ
+        _scores_op : Operator
+            各ビームのスコア（対数尤度の和）のオペレーター [ batch_size, beam_width ]
+
+    [protedted] protedted な使用法を想定
+
+    [private] 変数名の前にダブルアンダースコア __ を付ける（Pythonルール）
+
+    """
+    def __init__( self, beam_width = 5, node_name = "BeamSearch_op" ):
+        self._beam_width = beam_width
+        self._node_name = node_name
+
+        self._ids_op = None
+        self._scores_op = None
+
+        return
+
+    def print( self, str ):
+        print( "BeamSearchDecoder" )
+        print( self )
+        print( str )
+        print( "_beam_width :", self._beam_width )
+        print( "_node_name :", self._node_name )
+        print( "_ids_op :", self._ids_op )
+        print( "_scores_op :", self._scores_op )
+
+        return
+
+
+    def decode( self, step_fn, initial_state, initial_log_probs, n_steps ):
+        """
+        ビームサーチによる復号化のオペレーターを返す。
+
+        [Input]
+            step_fn : function
+                step_fn( ids, state ) → ( log_probs, next_state )
+                直前の時刻のシンボル ids [ batch_size * beam_width ] と RNN の状態 state から、
+                次の時刻のシンボルの対数確率 log_probs [ batch_size * beam_width, n_classes ] と、次の状態を返す関数
+            initial_state : Tensor or tuple <Tensor>
+                Encoder の最終状態など、復号化を開始する RNN の状態 [ batch_size, ... ]
+                全ビームで共有するので、ビーム幅分に複製して使用する
+            initial_log_probs : Tensor
+                最初の時刻のシンボルの対数確率 [ batch_size, n_classes ]
+            n_steps : int or Tensor
+                復号化する系列の長さ（最初の時刻を含む）
+
+        [Output]
+            self._ids_op : Operator
+                復号化した系列のオペレーター [ batch_size, beam_width, n_steps ]
+            self._scores_op : Operator
+                各ビームのスコアのオペレーター [ batch_size, beam_width ]
+        """
+        beam_width = self._beam_width
+        nest = tf.contrib.framework.nest
+
+        with tf.name_scope( self._node_name ):
+            batch_size = tf.shape( initial_log_probs )[0]
+            n_classes = tf.shape( initial_log_probs )[1]
+
+            # 最初の時刻：各データの上位 beam_width 個のシンボルを、ビームの先頭とする
+            scores, ids = tf.nn.top_k( initial_log_probs, k = beam_width )
+            parents = tf.zeros_like( ids )
+
+            # Encoder の状態を各ビームに複製 [ batch_size, ... ] → [ batch_size * beam_width, ... ]
+            # tf.contrib.seq2seq.tile_batch(...) : 各データを beam_width 回ずつ連続して並べる
+            state = nest.map_structure(
+                        lambda tsr : tf.contrib.seq2seq.tile_batch( tsr, multiplier = beam_width ),
+                        initial_state
+                    )
+
+            # 各データのビームの先頭の、[ batch_size * beam_width ] の通し番号
+            batch_offsets = tf.expand_dims( tf.range( batch_size ) * beam_width, 1 )
+
+            ids_ta = tf.TensorArray( tf.int32, size = n_steps ).write( 0, ids )
+            parents_ta = tf.TensorArray( tf.int32, size = n_steps ).write( 0, parents )
+
+            def body( t, ids, scores, state, ids_ta, parents_ta ):
+                log_probs, state = step_fn( tf.reshape( ids, [-1] ), state )
+
+                # 全ビーム × 全シンボルの候補のスコア [ batch_size, beam_width * n_classes ]
+                total_scores = tf.expand_dims( scores, 2 ) + tf.reshape( log_probs, [ batch_size, beam_width, n_classes ] )
+                total_scores = tf.reshape( total_scores, [ batch_size, -1 ] )
+
+                # 上位 beam_width 個の候補を、次の時刻のビームとする
+                scores, indices = tf.nn.top_k( total_scores, k = beam_width )
+                parents = indices // n_classes
+                ids = indices % n_classes
+
+                # 選択されたビームの親の状態を並び替え
+                state = nest.map_structure(
+                            lambda tsr : tf.gather( tsr, tf.reshape( parents + batch_offsets, [-1] ) ),
+                            state
+                        )
+
+                return ( t + 1, ids, scores, state, ids_ta.write( t, ids ), parents_ta.write( t, parents ) )
+
+            _, _, scores, _, ids_ta, parents_ta = tf.while_loop(
+                                                      cond = lambda t, *args : t < n_steps,
+                                                      body = body,
+                                                      loop_vars = ( tf.constant( 1 ), ids, scores, state, ids_ta, parents_ta )
+                                                  )
+
+            # 各時刻の親のインデックスを辿り、最終的なビームの系列を復元する
+            # tf.contrib.seq2seq.gather_tree(...) : shape = [ n_steps, batch_size, beam_width ]
+            ids_tsr = tf.contrib.seq2seq.gather_tree(
+                          ids_ta.stack(),
+                          parents_ta.stack(),
+                          max_sequence_lengths = tf.fill( [ batch_size ], n_steps ),
+                          end_token = -1
+                      )
+
+            # [ n_steps, batch_size, beam_width ] → [ batch_size, beam_width, n_steps ]
+            self._ids_op = tf.transpose( ids_tsr, perm = [1, 2, 0] )
+            self._scores_op = scores
+
+        return ( self._ids_op, self._scores_op )
@@ -0,0 +1,96 @@
+# -*- coding:utf-8 -*-
+# Anaconda 5.0.1 環境 (TensorFlow インストール済み)
+
+"""
+    更新情報
+    [26/10/19] : 新規作成
+    [xx/xx/xx] :
+               :
+"""
+
+import numpy
+
+# TensorFlow ライブラリ
+import tensorflow as tf
+from tensorflow.python.framework import ops
+
+
+class LSTMCellFactory( object ):
+    """
+    RNN の各モデルで使用する LSTM の cell を生成するクラス
+    b_fused = True の場合、時刻毎の多数の小さな演算からなる BasicLSTMCell, LSTMCell の代わりに、
+    １時刻分の LSTM を１つのカーネルで処理する融合されたブロック LSTM（tf.contrib.rnn.LSTMBlockCell）を生成する。
+    LSTMBlockCell は RNNCell のインターフェイスを持つので、MultiRNNCell, DropoutWrapper, tf.nn.dynamic_rnn(...) 等にそのまま渡せる。
+    ------------------------------------------------------------------------------------------------
+    [public] public アクセス可能なインスタスンス変数には, 便宜上変数名の最後にアンダースコア _ を付ける.
+        _cell_type : str
+            置き換え元の cell の種類 "basic" : BasicLSTMCell, "lstm" : LSTMCell
+        _b_fused : bool
+            融合されたブロック LSTM を使用するか否か
+
+    [protedted] protedted な使用法を想定
+
+    [private] 変数名の前にダブルアンダースコア __ を付ける（Pythonルール）
+
+    """
+    # 置き換え元の cell の Variable の名前空間
+    # LSTMBlockCell を同じ名前空間で生成することで、重み kernel [入力 + 隠れ層, 4 * 隠れ層]、バイアス項 bias [4 * 隠れ層] が
+    # 同じ名前、同じ shape、同じゲートの並び (i, j, f, o) となり、置き換え前後でチェックポイントを相互に読み込める。
+    cell_scope_names = {
+        "basic" : "basic_lstm_cell",
+        "lstm" : "lstm_cell"
+    }
+
+    def __init__( self, cell_type = "lstm", b_fused = False ):
+        if ( ( cell_type in LSTMCellFactory.cell_scope_names ) == False ):
+            raise ValueError( "invalid cell_type : %s" % cell_type )
+
+        self._cell_type = cell_type
+        self._b_fused = b_fused
+
+        return
+
+    def print( self, str ):
+        print( "LSTMCellFactory" )
+        print( self )
+        print( str )
+        print( "_cell_type :", self._cell_type )
+        print( "_b_fused :", self._b_fused )
+
+        return
+
+
+    def create( self, num_units, forget_bias = 1.0 ):
+        """
+        LSTM の cell を生成する。
+
+        [Input]
+            num_units : int
+                LSTM の cell のユニット数
+            forget_bias : float
+                忘却ゲートのバイアス項
+
+        [Output]
+            cell : RNNCell
+                LSTM の cell
+        """
+        if ( self._b_fused == True ):
+            # tf.contrib.rnn.LSTMBlockCell(...) : ゲートの計算を１つのカーネルに融合した LSTM の cell
+            cell = tf.contrib.rnn.LSTMBlockCell(
+                       num_units = num_units,
+                       forget_bias = forget_bias,
+                       name = LSTMCellFactory.cell_scope_names[ self._cell_type ]
+                   )
+        elif ( self._cell_type == "basic" ):
+            cell = tf.nn.rnn_cell.BasicLSTMCell(
+                       num_units,
+                       forget_bias = forget_bias,
+                       state_is_tuple = True
+                   )
+        else:
+            cell = tf.contrib.rnn.LSTMCell(
+                       num_units = num_units,
+                       forget_bias = forget_bias
+                   )
+
+        return cell
@@ -5,6 +5,7 @@
     更新情報
     [17/11/18] : 新規作成
     [17/12/04] : 損失関数の処理の名前空間を設定するように修正 
+    [26/10/19] : 学習時の候補サンプリングによる損失関数 SampledSoftmaxCrossEntropy, NCE を追加
     [17/xx/xx] : 
                : 
 """
@@ -199,3 +200,101 @@ class SparseSoftmaxCrossEntropy( NNLoss ):
         return self._loss_op
 
 
+class SampledLoss( NNLoss ):
+    """
+    出力層の全クラスではなく、サンプリングした一部のクラス（候補）のみで近似する損失関数
+    NNLoss クラスの子クラスとして定義
+    出力層の logits ではなく、出力層への入力と出力層の重み、バイアス項から損失を計算するので、
+    学習時の計算量がクラス数（語彙数）にほぼ依存しなくなる。
+    推定時は近似を行わず、全クラスでの softmax を使用すること。
+    ------------------------------------------------------------------------------------------------
+    [public]
+        _n_sampled : int
+            １つのミニバッチでサンプリングするクラス数
+    """
+    def __init__( self, n_sampled = 64, node_name = "Loss_SampledLoss_op" ):
+        self._loss_op = None
+        self._node_name = node_name
+        self._n_sampled = n_sampled
+
+        return
+
+    def loss( self, t_holder, y_out_op, inputs, weights, biases, n_classes ):
+        """
+        損失関数のオペレーターを返す。
+
+        [Input]
+            t_holder : Tensor
+                教師データの数値インデックス shape = [None, 1] (int64)
+            y_out_op : Operator
+                出力層の logits（近似には使用しない）
+            inputs : Tensor
+                出力層への入力 shape = [None, dim]
+            weights : Tensor
+                出力層の重み shape = [n_classes, dim]
+            biases : Tensor
+                出力層のバイアス項 shape = [n_classes]
+            n_classes : int
+                出力層のクラス数（語彙数）
+
+        [Output]
+            損失関数のオペレーター
+        """
+        with tf.name_scope( self._node_name ):
+            self._loss_op = None
+
+        return self._loss_op
+
+
+class SampledSoftmaxCrossEntropy( SampledLoss ):
+    """
+    サンプリングしたクラスのみで近似するソフトマックス・クロス・エントロピーの損失関数（sampled softmax）
+    SampledLoss クラスの子クラスとして定義
+    """
+    def __init__( self, n_sampled = 64, node_name = "Loss_SampledSoftmaxCrossEntropy_op" ):
+        super().__init__( n_sampled, node_name )
+
+        return
+
+    def loss( self, t_holder, y_out_op, inputs, weights, biases, n_classes ):
+        with tf.name_scope( self._node_name ):
+            # tf.nn.sampled_softmax_loss(...) : 正解クラスと n_sampled 個のサンプリングしたクラスのみで softmax を計算
+            self._loss_op = tf.reduce_mean(
+                                tf.nn.sampled_softmax_loss(
+                                    weights = weights,
+                                    biases = biases,
+                                    labels = t_holder,
+                                    inputs = inputs,
+                                    num_sampled = self._n_sampled,
+                                    num_classes = n_classes
+                                )
+                            )
+
+        return self._loss_op
+
+
+class NCE( SampledLoss ):
+    """
+    ノイズ対照推定 [NCE : Noise-Contrastive Estimation] の損失関数
+    SampledLoss クラスの子クラスとして定義
+    """
+    def __init__( self, n_sampled = 64, node_name = "Loss_NCE_op" ):
+        super().__init__( n_sampled, node_name )
+
+        return
+
+    def loss( self, t_holder, y_out_op, inputs, weights, biases, n_classes ):
+        with tf.name_scope( self._node_name ):
+            # tf.nn.nce_loss(...) : 正解クラスと n_sampled 個のノイズのクラスを識別するロジスティック回帰の損失
+            self._loss_op = tf.reduce_mean(
+                                tf.nn.nce_loss(
+                                    weights = weights,
+                                    biases = biases,
+                                    labels = t_holder,
+                                    inputs = inputs,
+                                    num_sampled = self._n_sampled,
+                                    num_classes = n_classes
+                                )
+                            )
+
+        return self._loss_op
@@ -4,6 +4,8 @@
 """
     更新情報
     [17/12/14] : 新規作成
+    [26/10/19] : 損失関数 loss(...) を実装し、学習時に sampled softmax / NCE（NNLoss.SampledLoss）を指定できるように修正
+               : Encoder の LSTM の cell を NNCell.LSTMCellFactory で生成し、融合されたブロック LSTM を選択できるように変更
     [xx/xx/xx] : 
 
 """
@@ -31,6 +33,8 @@ import NNLoss                                       # ニューラルネット
 
 import NNOptimizer                                  # ニューラルネットワークの最適化アルゴリズム Optimizer を表すクラス
 
+from NNCell import LSTMCellFactory                  # LSTM の cell を生成するクラス
+
 class RecurrectNNEncoderDecoderEmbeddingLSTM( RecurrectNNEncoderDecoderLSTM ):
     """
     LSTM による RNN Encoder-Decoder を表すクラス.
@@ -47,6 +51,12 @@ class RecurrectNNEncoderDecoderEmbeddingLSTM( RecurrectNNEncoderDecoderLSTM ):
         _embedding_lookup_op : Operator
             埋め込み検索演算を表す Operator
 
+        _decoder_output_op : Operator
+            出力層への入力（Decoder の出力） shape = [ None, _n_hiddenLayer ]
+            sampled softmax / NCE での損失関数の計算に使用する
+        _y_in_op : Operator
+            出力層の logits shape = [ None, _n_vocab ]
+
     [protedted] protedted な使用法を想定 
 
     [private] 変数名の前にダブルアンダースコア __ を付ける（Pythonルール）
@@ -62,7 +72,8 @@ class RecurrectNNEncoderDecoderEmbeddingLSTM( RecurrectNNEncoderDecoderLSTM ):
             epochs = 1000,
             batch_size = 10,
             eval_step = 1,
-            save_step = 100
+            save_step = 100,
+            b_fused_cell = False
         ):
         """
         コンストラクタ（厳密にはイニシャライザ）
@@ -71,7 +82,8 @@ class RecurrectNNEncoderDecoderEmbeddingLSTM( RecurrectNNEncoderDecoderLSTM ):
             session,
             n_inputLayer, n_hiddenLayer, n_outputLayer,
             n_in_sequence_encoder, n_in_sequence_decoder,
-            epochs, batch_size, eval_step
+            epochs, batch_size, eval_step,
+            b_fused_cell = b_fused_cell
         )
 
         self._n_vocab = n_vocab
@@ -80,6 +92,9 @@ class RecurrectNNEncoderDecoderEmbeddingLSTM( RecurrectNNEncoderDecoderLSTM ):
         self._embedding_matrix_var = None
         self._embedding_lookup_op = None
 
+        self._decoder_output_op = None
+        self._y_in_op = None
+
         # placeholder の初期化
         # shape の列（横方向）は、各層の次元（ユニット数）に対応させる。
         # shape の行は、None にして汎用性を確保
@@ -165,7 +180,8 @@ class RecurrectNNEncoderDecoderEmbeddingLSTM( RecurrectNNEncoderDecoderLSTM ):
         # 埋め込み層を使用しているので Encoder は不要？
         #--------------------------------------------------------------
         # 忘却ゲートなしの LSTM
-        cell_encoder = tf.contrib.rnn.BasicLSTMCell( self._n_hiddenLayer )
+        # _b_fused_cell = True の場合は、融合されたブロック LSTM（LSTMBlockCell）を使用
+        cell_encoder = LSTMCellFactory( cell_type = "basic", b_fused = self._b_fused_cell ).create( self._n_hiddenLayer )
         init_state_encoder = cell_encoder.zero_state( self._batch_size_holder, tf.float32 )
         self._rnn_cells_encoder.append( cell_encoder )
         self._rnn_states_encoder.append( init_state_encoder )
@@ -266,6 +282,10 @@ class RecurrectNNEncoderDecoderEmbeddingLSTM( RecurrectNNEncoderDecoderLSTM ):
         # 出力層への入力
         # shape = [None, self._n_vocab]
         y_in_op = tf.matmul( output, self._weights[-1] ) + self._biases[-1]
+
+        # sampled softmax / NCE での損失関数の計算のために、出力層への入力と logits を保持
+        self._decoder_output_op = output
+        self._y_in_op = y_in_op
         
         # 最終的な出力
         # shape = [None, self._n_vocab]
@@ -274,10 +294,42 @@ class RecurrectNNEncoderDecoderEmbeddingLSTM( RecurrectNNEncoderDecoderLSTM ):
         return self._y_out_op
 
 
-    def loss( self ):
+    def loss( self, nnLoss = None ):
+        """
+        損失関数の定義を行う。
 
-        # ?
-        # tf.contrib.legacy_seq2seq.sequence_loss_by_example : Weighted cross-entropy loss for a sequence of logits (per example).
-        loss_func = tf.contrib.legacy_seq2seq.sequence_loss_by_example
+        [Input]
+            nnLoss : NNLoss クラスのオブジェクト
+                NNLoss.SampledLoss（SampledSoftmaxCrossEntropy, NCE）の場合は、
+                サンプリングした単語のみで損失関数を近似し、学習時の計算量を語彙数にほぼ依存しなくする。
+                それ以外の場合は、logits と数値インデックスの教師データで定義する（SparseSoftmaxCrossEntropy）
+                推定時の出力 self._y_out_op は、いずれの場合も全語彙での softmax のまま
+                None の場合は、呼び出し毎に NNLoss.SparseSoftmaxCrossEntropy() を生成して使用する
+
+        [Output]
+            self._loss_op : Operator
+                損失関数を表すオペレーター
+        """
+        # デフォルト引数のオブジェクトは全インスタンスで共有されるので、呼び出し毎に生成する
+        if ( nnLoss is None ):
+            nnLoss = NNLoss.SparseSoftmaxCrossEntropy()
+
+        if ( isinstance( nnLoss, NNLoss.SampledLoss ) == True ):
+            # 教師データは数値インデックスのまま shape = [None, 1] に reshape
+            t_reshaped_holder = tf.reshape( tf.cast( self._t_holder, tf.int64 ), shape = [-1, 1] )
+
+            # 出力層の重みは shape = [n_hidden, n_vocab] なので、転置して [n_vocab, n_hidden] で渡す
+            self._loss_op = nnLoss.loss(
+                                t_holder = t_reshaped_holder,
+                                y_out_op = self._y_in_op,
+                                inputs = self._decoder_output_op,
+                                weights = tf.transpose( self._weights[-1] ),
+                                biases = self._biases[-1],
+                                n_classes = self._n_vocab
+                            )
+        else:
+            # logits の shape = [None, n_vocab] との整合性のため、教師データを shape = [None] に reshape
+            t_reshaped_holder = tf.reshape( self._t_holder, shape = [-1] )
+            self._loss_op = nnLoss.loss( t_holder = t_reshaped_holder, y_out_op = self._y_in_op )
 
         return self._loss_op
\ No newline at end of file
@@ -15,6 +15,9 @@
     [17/12/03] : Adding Problem のデータの生成関数 generate_adding_problem(...) 追加
     [17/12/08] : The Project Gutenberg EBook にある、シェイクスピア作品のテキストデータの読み込み関数 `load_textdata_by_shakespeare_from_theProjectGutenbergEBook(...)` 追加
     [17/12/09] : テキストデータを数値インデックスの配列に変換する関数 `text_vocabulary_processing_without_tensorflow( ... )` 追加
+    [26/10/19] : `text_vocabulary_processing_without_tensorflow(...)` を TextVocabulary クラスによる処理に変更（行を跨いだ単語の連結の修正、出現頻度順のインデックス、一括変換）
+               : テキストデータの読み込み関数を、MLTextPreProcess の１行ずつ読み込み＆クリーニングするジェネレータによる処理に変更
+               : `generate_adding_problem(...)` をループなしのベクトル化した処理に変更し、ミニバッチ単位で逐次生成するジェネレータを追加
     [xx/xx/xx] :
 
 """
@@ -55,6 +58,10 @@ from sklearn.pipeline import Pipeline                   # パイプライン
 # TensorFlow ライブラリ関連
 import tensorflow as tf
 
+# 自作クラス
+from MLTextPreProcess import MLTextPreProcess   # テキストデータの前処理を行うクラス
+from MLTextPreProcess import TextVocabulary     # テキストデータの vocabulary を表すクラス
+
 
 class MLPreProcess( object ):
     """
@@ -244,39 +251,76 @@ class MLPreProcess( object ):
             adding_targets : nadarry / shape = ( n_sequence )
                 出力
         """
-        numpy.random.seed( seed = seed )
-        
+        random_state = numpy.random.RandomState( seed )
+
+        return MLPreProcess.sampling_adding_problem( random_state, t, n_sequence )
+
+    @staticmethod
+    def generate_adding_problem_batches( t, batch_size, n_batches = None, seed = 12 ):
+        """
+        Adding Problem の入出力データを、ミニバッチ単位で逐次生成するジェネレータ
+        データセット全体をメモリに保持せずに、トレーニング処理中に新しいデータを供給し続ける。
+
+        [Input]
+            t : int
+                1 つのシーケンスのサイズ
+            batch_size : int
+                ミニバッチのシーケンスの数
+            n_batches : int
+                生成するミニバッチの数（None の場合は無限に生成する）
+
+        [Output]
+            adding_data, adding_targets : nadarry
+                generate_adding_problem(...) と同じ形式の、１ミニバッチ分のデータ
+        """
+        random_state = numpy.random.RandomState( seed )
+
+        i = 0
+        while ( ( n_batches is None ) or ( i < n_batches ) ):
+            # yield 文で逐次データを return（関数の処理を一旦停止し、値を返す）
+            yield MLPreProcess.sampling_adding_problem( random_state, t, batch_size )
+            i += 1
+
+    @staticmethod
+    def sampling_adding_problem( random_state, t, n_sequence ):
+        """
+        乱数生成器 random_state から、Adding Problem の入出力データをまとめて生成する。
+        各シーケンスで値が 1 となるマスクの位置 2 箇所は、一様乱数のキーに対する
+        numpy.argpartition(...) で、シーケンス毎のループなしに全シーケンスまとめて選択する。
+
+        [Input]
+            random_state : numpy.random.RandomState
+                乱数生成器
+            t : int
+                1 つのシーケンスのサイズ
+            n_sequence :int
+                シーケンスの数
+
+        [Output]
+            adding_data, adding_targets : nadarry
+                generate_adding_problem(...) と同じ形式のデータ
+        """
         # 0~1 の間の一様ランダムからなるシグナル（シーケンス）× シグナル数（シーケンス数）作成
-        singnals = numpy.random.uniform( low = 0.0, high = 1.0, size = ( n_sequence, t ) )
-        
+        singnals = random_state.uniform( low = 0.0, high = 1.0, size = ( n_sequence, t ) )
+
         #-----------------------------
         # 0 or 1 からなるマスクの作成
         #-----------------------------
-        # まず全体を 0 で埋める
+        # 一様乱数のキーの小さい方から 2 つの位置を、重複なしのランダムな位置とする
+        # numpy.argpartition(...) : 全体をソートせずに、小さい方から 2 つとそれ以外に分割する
+        keys = random_state.uniform( size = ( n_sequence, t ) )
+        indices = numpy.argpartition( keys, 1, axis = 1 )[ :, :2 ]
+
         masks = numpy.zeros( shape = ( n_sequence, t ) )
+        masks[ numpy.arange( n_sequence )[ :, numpy.newaxis ], indices ] = 1
 
-        for i in range( n_sequence ):
-            # マスクの値 0 or 1
-            mask = numpy.zeros( shape = ( t ) )
-            # numpy.random.permutation(...) : 配列をランダムに入れ替え
-            inidices = numpy.random.permutation( numpy.arange(t) )[:2]
-            mask[inidices] = 1
-            masks[i] = mask
-        
         #-----------------------------
         # シグナル×マスクの作成
         #-----------------------------
-        # まず全体を 0 で埋める
-        adding_data = numpy.zeros( shape = ( n_sequence, t, 2 ) )
-        
-        # シグナルの配列
-        adding_data[ :, :, 0 ] = singnals
-        
-        # マスクの配列
-        adding_data[ :, :, 1 ] = masks
+        adding_data = numpy.stack( [ singnals, masks ], axis = 2 )
 
-        # 出力
-        adding_targets = ( singnals * masks ).sum( axis = 1 ).reshape( n_sequence, 1 )
+        # 出力（マスクの位置のシグナルの和）
+        adding_targets = singnals[ numpy.arange( n_sequence )[ :, numpy.newaxis ], indices ].sum( axis = 1 ).reshape( n_sequence, 1 )
 
         return adding_data, adding_targets
 
@@ -786,70 +830,16 @@ class MLPreProcess( object ):
             ...
             ham	Rofl. Its true to its name   
         """
-        text_data = []
-
         #----------------------------------------------------
-        # codecs.open() 関数と with 構文でテキストデータを読み込む
-        # "r" : 文字のまま読み込み
+        # １行ずつ読み込み＆クリーニングするジェネレータから、( ラベル, 本文 ) のリストを作成する
+        # 最後の行は除外される
+        # クリーニング処理は、文字量を減らすために、特殊文字と余分なホワイトスペースを取り除く
         #----------------------------------------------------
-        with codecs.open( path, "r", "utf-8" ) as file:
-           # txt ファイルの各行に関してのループ処理
-           for row in file:
-               # 各行の文字列全体（特殊文字、空白込 : \t　\n）を格納
-               text_data.append( row )
-        
-        #print( "text_data :", text_data )
-         
-        # ? 最後の行の除去処理
-        # text_data[:-1] : 最初の行の文字列 ~ 最後の行 -1 の文字列の配列
-        # ['ham\tGo until jurong point, crazy.. Available only in bugis n great world la e buffet... Cine there got amore wat...\n', 
-        # 'ham\tOk lar... Joking wif u oni...\n', ... 
-        # "ham\tThe guy did some bitching but I acted like i'd be interested in buying something else next week and he gave it to us for free\n" ]
-        text_data = text_data[:-1]
-        #print( "text_data :", text_data )
-
-        # 水平タブを表すエスケープシーケンス `\t` 部分で別の配列に分割する。
-        # split(...) : 文字列の分割
-        # [ ['ham', 'Go until jurong point, crazy.. Available only in bugis n great world la e buffet... Cine there got amore wat...\n'], 
-        #   ['ham', 'Ok lar... Joki ..\n'], ...
-        #   ['ham', "The guy did some bitching but I acted like i'd be interested in buying something else next week and he gave it to us for free\n"]
-        # ]
-        text_data = [ str.split( "\t" ) for str in text_data if len(str) >= 1 ]
-        #print( "text_data :", text_data )
+        text_data = list( MLTextPreProcess.iter_sms_spam_collection( path, bCleaning ) )
 
         # "ham", "spam" の文字列の部分を教師データに切り分け
-        # list(...) : リストの内包表記と合わせて text_data_labels と test_data_feature のリストの生成
-        # zip(*text_data) → zip(*list) : 関数の前のアスタリスクは展開されて解釈されるので、
-        # text_data の内容が "ham" or "spam" , と "本文" 部分に unpack（展開）解釈される。
-        text_data_labels, text_data_features = [ list(str) for str in zip(*text_data) ]
-        #print( "text_data_labels :", text_data_labels )
-        #print( "text_data_features :", text_data_features )
-
-        #----------------------------------------------------------------
-        # クリーニング処理
-        # 文字量を減らすために、特殊文字と余分なホワイトスペースを取り除く
-        #----------------------------------------------------------------
-        if ( bCleaning == True ):
-            def clean_text( str ):
-                # re.sub() : 正規表現で文字列を別の文字列で置換
-                str = re.sub( 
-                          pattern = r"([^\s\w]|_|[0-9])+",  # 正規表現 : []集合, |和集合（または）()グループ化
-                          repl = "",                        # 置換する文字列 : "" なので文字なしに置換
-                          string = str                      # 置換される文字列
-                      )
-                #print( "re.sub(...) :", str )
-
-                # sep.join(seq) : sepを区切り文字として、seqを連結してひとつの文字列にする。
-                # 空白文字 " " を区切りにして分割処理
-                str = " ".join( str.split() )
-                #print( "sep.join( str.split() ) :", str )
-
-                # リスト中の大文字→小文字に変換
-                str = str.lower()
-
-                return str
-
-            text_data_features = [ clean_text(str) for str in text_data_features ]
+        text_data_labels = [ label for (label, text) in text_data ]
+        text_data_features = [ text for (label, text) in text_data ]
 
         return text_data_features, text_data_labels
 
@@ -872,82 +862,14 @@ class MLPreProcess( object ):
             text_data : list <str>
                 シェイクスピア作品の本文の文字列から成るテキストデータのリスト
         """
-        text_data = []
-
-        #--------------------------------------------------------
-        # codecs.open() 関数と with 構文でテキストデータの読み込む
-        # "r" : 文字のまま読み込み
-        #--------------------------------------------------------
-        with codecs.open( path, "r", "utf-8" ) as file:
-           # txt ファイルの各行に関してのループ処理
-           for row in file:
-               # 各行の文字列全体（特殊文字、空白込 : \t　\n）を格納
-               text_data.append( row )
-
-        # ['\ufeffThe Project Gutenberg EBook of The Complete Works of William Shakespeare, by\r\n', 
-        # 'William Shakespeare\r\n', '\r\n', ...
-        # '\r\n', '*** END: FULL LICENSE ***\r\n']
-        #print( "text_data :\n", text_data )
-
-        # EBook のテキストファイルに含まれている、最初の説明文の段落部分を除外
-        text_data = text_data[ n_DeleteParagraph : ]
-        #print( "text_data :\n", text_data )
-
-        # 改行, 先頭に復帰の特殊文字 \n, \r を削除する
-        text_data = [ str.replace( "\r\n", "" ) for str in text_data ]
-        text_data = [ str.replace( "\n", "" ) for str in text_data ]
-        #print( "text_data :\n", text_data )
-
         #----------------------------------------------------------------
-        # クリーニング処理
-        # 文字量を減らすために、
-        # 各種句読点、余分なホワイトスペースを削除する
+        # １行ずつ読み込み＆クリーニングするジェネレータから、リストを作成する
+        # 改行, 先頭に復帰の特殊文字 \n, \r を削除し、
+        # クリーニング処理では、各種句読点、余分なホワイトスペースを削除する
         # ハイフン "-" と、アポストロフィ "'" は残す。（この作品文章が文章内容を繋ぐのに、頻繁に使用されているため）
+        # 大きなテキストをリストにせずに処理する場合は、MLTextPreProcess.iter_shakespeare_lines(...) を直接使用する
         #----------------------------------------------------------------
-        if ( bCleaning == True ):
-            # string.punctuation : 文字と文字の間の句読点、括弧などをまとめたもの
-            # 置換表現で「!"#$%&'()*+,-./:;<=>?@[\]^_`{|}~」等
-            punctuation = string.punctuation
-            #print( "punctuation :", punctuation )     # punctuation : !"#$%&'()*+,-./:;<=>?@[\]^_`{|}~
-
-            # punctuation から ハイフン "-" と、アポストロフィ "'" を除外
-            # sep.join(seq) : sepを区切り文字として、seqを連結してひとつの文字列にする。
-            punctuation = ''.join( [ x for x in punctuation if x not in ['-', "'"] ] )
-            #print( "punctuation :", punctuation )     # punctuation : !"#$%&()*+,./:;<=>?@[\]^_`{|}~
-
-            def clean_text( str ):
-                # ハイフン "-" と、アポストロフィ "'" 以外の特殊文字をホワイトスペース " " に置換
-                # re.sub() : 正規表現で文字列を別の文字列で置換
-                str = re.sub( 
-                          pattern = r"[{}]".format( punctuation ),  # 正規表現 : []集合, |和集合（または）()グループ化
-                          repl = " ",                               # 置換する文字列 : " " なのでホワイトスペースに置換
-                          string = str                              # 置換される文字列
-                      )
-                #print( "clean_text( str ) / step1 :", str )
-
-                # 任意の空白文字 \s = [\t\n\r\f\v] をホワイトスペース " " に置換
-                # + : １回以上の繰り返し（正規表現）
-                str = re.sub( 
-                          pattern = "\s+",      # 正規表現 : []集合, |和集合（または）()グループ化
-                          repl = " ",           # 置換する文字列 : " " なのでホワイトスペースに置換
-                          string = str          # 置換される文字列
-                      )
-                #print( "clean_text( str ) / step2 :", str )
-
-                # ホワイトスペース " " に置換したものを一斉に除外
-                # str.strip() : 引数を指定しないとホワイトスペースを除去する
-                str = str.strip()
-                #print( "clean_text( str ) / step3 :", str )
-
-                # リスト中の大文字→小文字に変換
-                str = str.lower()
-                #print( "clean_text( str ) / step4 :", str )
-
-                return str
-
-            text_data = [ clean_text(str) for str in text_data ]
-
-        #print( "text_data", text_data )
+        text_data = list( MLTextPreProcess.iter_shakespeare_lines( path, n_DeleteParagraph, bCleaning ) )
 
         return text_data
 
@@ -1011,57 +933,20 @@ class MLPreProcess( object ):
             n_vocab : int
                 出現頻度の高い単語（ワード、語彙）の数
         """
-        # list<str> → １つの str に変換
-        text_data = "".join( text_data )
-        #print( "text_data:\n", text_data )
-
-        # 空白スペースで split し、単語単位の配列に変換
-        text_data = text_data.split( " " )
-        #print( "text_data:\n", text_data )
-
-        # collections.Counter(...) : 単語などの出現頻度を数える
-        # collections.Counter(...) : Counter( { 'the': 23974, 'and': 19409, ... , '6': 70, '8': 46, '7': 44 } )
-        word_counts = collections.Counter( text_data )
-        #print( "collections.Counter(...) :", word_counts )
-
-        #----------------------------------------------------------------------
-        # 抽出した単語の出現頻度から、
-        # 出現頻度の高い (min_word_freq 値以上の) 単語をディクショナリに登録する。
-        # 出現頻度の低い単語は除外
-        #----------------------------------------------------------------------
-        word_counts = { key: count for (key,count) in word_counts.items() if count > min_word_freq }    # ディクショナリの内包表現
-        
-        #---------------------------------------------------------
-        # 語彙 "xxx" → インデックスへの map を作成
-        #---------------------------------------------------------
-        # dict.keys() : ディクショナリから key を取り出し
-        dict_keys_words = word_counts.keys()
-        #print( "dict_keys_words :\n", dict_keys_words )         # dict_keys(['from', 'fairest', 'creatures', ... , 'donations', 'f'])
-        dict_vcab_to_idx = { key: (idx+1) for (idx,key) in enumerate( dict_keys_words ) }
+        # 各行を空白文字で単語に分割し、出現頻度の高い (min_word_freq 値より多く出現した) 単語を
+        # 出現回数の降順のインデックスで vocabulary に登録する。
         # 不明な key (=vocab) のインデックスとして 0 を登録
-        dict_vcab_to_idx[ "unknown" ] = 0
-        #print( "dict_vcab_to_idx :\n", dict_vcab_to_idx )       # {'from': 1, 'fairest': 2, 'creatures': 3, ... , 'donations': 7509, 'f': 7510}
+        vocabulary = TextVocabulary( min_word_freq = min_word_freq ).fit( text_data )
 
-        #---------------------------------------------------------
-        # インデックス → 語彙 "xxx" への map を作成
-        #---------------------------------------------------------
-        dict_idx_to_vocab = { idx: key for (key,idx) in dict_vcab_to_idx.items() }
-        #print( "dict_idx_to_vocab :\n", dict_idx_to_vocab )     # {1: 'from', 2: 'fairest', 3: 'creatures', ... , 7509: 'donations', 7510: 'f'}
+        # 語彙 "xxx" → インデックスへの map
+        dict_vcab_to_idx = vocabulary._dict_vcab_to_idx
+
+        # インデックス → 語彙 "xxx" への map
+        dict_idx_to_vocab = dict( enumerate( vocabulary._idx_to_vocab ) )
 
-        #---------------------------------------------------------
         # テキストデータのインデックス配列
-        #---------------------------------------------------------
-        text_data_idx = []
-        
-        # テキストから抽出した単語単位の配列 text_data に関してのループ
-        for (idx,words) in enumerate( text_data ):
-            try:
-                text_data_idx.append( dict_vcab_to_idx[words] )
-            except:
-                text_data_idx.append( 0 )
-
-        # list → ndarray に変換
-        text_data_idx = numpy.array( text_data_idx )
+        # vocabulary に含まれない単語はインデックス 0
+        text_data_idx = vocabulary.encode( text_data )
 
         # 単語の数
         n_vocab = len( dict_idx_to_vocab ) + 1
@@ -0,0 +1,653 @@
+# -*- coding:utf-8 -*-
+# Anaconda 5.0.1 環境
+
+"""
+    更新情報
+    [26/10/19] : 新規作成
+                 IMDb 映画評論データセットの読み込み、トークン化、数値インデックス化、キャッシュ処理を行う MLTextPreProcess クラスを追加
+               : 出現頻度順の vocabulary の作成、数値インデックスへの一括変換、保存＆読み込みを行う TextVocabulary クラスを追加
+               : シェイクスピア作品、SMS Spam Collection のテキストを１行ずつ読み込み＆クリーニングするジェネレータを追加
+    [xx/xx/xx] :
+
+"""
+
+import os
+import re
+import string
+import json
+import hashlib
+import itertools
+from collections import deque
+from collections import Counter                     # 出現回数をカウントする辞書型オブジェクト
+from concurrent.futures import ProcessPoolExecutor  # プロセスプールによる並列処理
+
+import numpy
+
+
+# 句読点を１つのトークン、それ以外の空白以外の連続した文字列を１つのトークンとする正規表現
+# 句読点の前後に空白を挿入して空白で分割する処理と同じトークン列になる
+# string.punctuation : 「!"#$%&'()*+,-./:;<=>?@[\]^_`{|}~」
+token_pattern = re.compile( r"[{0}]|[^\s{0}]+".format( re.escape( string.punctuation ) ) )
+
+# SMS Spam Collection のクリーニング用の正規表現 : 特殊文字、アンダースコア、数字の連続
+sms_clean_pattern = re.compile( r"([^\s\w]|_|[0-9])+" )
+
+# シェイクスピア作品のクリーニング用の変換テーブル : ハイフン "-" と、アポストロフィ "'" 以外の句読点をホワイトスペース " " に置換
+shakespeare_clean_table = str.maketrans( { char : " " for char in string.punctuation if char not in [ "-", "'" ] } )
+
+
+#---------------------------------------------------------
+# プロセスプールのワーカーで実行する関数
+# ワーカープロセスに pickle で渡すために、モジュールのトップレベルで定義する
+#---------------------------------------------------------
+def read_text_file( path ):
+    """
+    テキストファイル全体を１つの文字列として読み込む。
+    """
+    with open( path, "r", encoding = "utf-8" ) as infile:
+        return infile.read()
+
+
+def tokenize_text( text ):
+    """
+    テキストを小文字化し、単語と句読点のトークンのリストに分割する。
+    """
+    return token_pattern.findall( text.lower() )
+
+
+def clean_sms_record( record ):
+    """
+    SMS Spam Collection の ( ラベル, 本文 ) の本文から、特殊文字と数字を削除し、余分なホワイトスペースを取り除いて小文字化する。
+    """
+    label, text = record
+    return ( label, " ".join( sms_clean_pattern.sub( "", text ).split() ).lower() )
+
+
+def clean_shakespeare_text( text ):
+    """
+    シェイクスピア作品の１行から、ハイフンとアポストロフィ以外の句読点、余分なホワイトスペースを取り除いて小文字化する。
+    """
+    return " ".join( text.translate( shakespeare_clean_table ).split() ).lower()
+
+
+def clean_text_chunk( clean_fn, chunk ):
+    """
+    チャンク内の各テキストをクリーニングする。
+    """
+    return [ clean_fn( text ) for text in chunk ]
+
+
+class MLTextPreProcess( object ):
+    """
+    テキストデータの前処理（読み込み、トークン化、数値インデックス化）を行うクラス
+    ・ファイルの読み込みとトークン化は、プロセスプールで並列に処理する
+    ・トークン化は、コンパイル済みの正規表現で行う
+    ・数値インデックス化は、ゼロパディングされた int32 の行列にまとめて変換する
+    ・変換後の行列と vocabulary は .npy / .json ファイルにキャッシュし、２回目以降は前処理を省略する
+    """
+    @staticmethod
+    def tokenize( text ):
+        """
+        テキストを小文字化し、単語と句読点のトークンのリストに分割する。
+
+        [Input]
+            text : str
+                テキスト
+
+        [Output]
+            tokens : list <str>
+                トークンのリスト
+        """
+        return tokenize_text( text )
+
+
+    @staticmethod
+    def tokenize_texts( texts, n_jobs = None, chunksize = 256 ):
+        """
+        テキストのリストをプロセスプールで並列にトークン化する。
+
+        [Input]
+            texts : list <str>
+                テキストのリスト
+            n_jobs : int
+                プロセス数（None の場合は CPU 数）
+
+        [Output]
+            tokenized : list < list <str> >
+                各テキストのトークンのリスト
+        """
+        with ProcessPoolExecutor( max_workers = n_jobs ) as executor:
+            tokenized = list( executor.map( tokenize_text, texts, chunksize = chunksize ) )
+
+        return tokenized
+
+
+    @staticmethod
+    def read_text_files( paths, n_jobs = None, chunksize = 256 ):
+        """
+        複数のテキストファイルをプロセスプールで並列に読み込む。
+
+        [Input]
+            paths : list <str>
+                テキストファイルのパスのリスト
+            n_jobs : int
+                プロセス数（None の場合は CPU 数）
+
+        [Output]
+            texts : list <str>
+                各ファイルの内容（paths と同じ順序）
+        """
+        with ProcessPoolExecutor( max_workers = n_jobs ) as executor:
+            texts = list( executor.map( read_text_file, paths, chunksize = chunksize ) )
+
+        return texts
+
+
+    @staticmethod
+    def iter_text_lines( path, n_skip_lines = 0 ):
+        """
+        テキストファイルを１行ずつ返すジェネレータ（改行文字は含む）
+
+        [Input]
+            path : str
+                テキストファイルのパス
+            n_skip_lines : int
+                先頭から読み飛ばす行数
+        """
+        with open( path, "r", encoding = "utf-8", newline = "" ) as infile:
+            for line in itertools.islice( infile, n_skip_lines, None ):
+                yield line
+
+
+    @staticmethod
+    def map_chunks( clean_fn, texts, n_jobs = 1, chunk_size = 10000 ):
+        """
+        テキストに clean_fn を適用した結果を、入力の順序で１つずつ返すジェネレータ
+        n_jobs > 1 の場合は、chunk_size 個毎のチャンクをプロセスプールで並列に処理する。
+        処理中のチャンクは高々 2 * n_jobs 個なので、入力全体の大きさに依らずメモリ使用量は一定となる。
+
+        [Input]
+            clean_fn : function
+                各テキストに適用する関数（プロセスプールで使用する場合は、モジュールのトップレベルで定義された関数）
+            texts : iterable
+                テキスト（list 又は generator）
+            n_jobs : int
+                プロセス数（1 の場合は並列化しない、None の場合は CPU 数）
+            chunk_size : int
+                １つのチャンクのテキストの数
+        """
+        if ( n_jobs == 1 ):
+            for text in texts:
+                yield clean_fn( text )
+            return
+
+        if ( n_jobs is None ):
+            n_jobs = os.cpu_count()
+
+        texts = iter( texts )
+        with ProcessPoolExecutor( max_workers = n_jobs ) as executor:
+            futures = deque()
+            while True:
+                chunk = list( itertools.islice( texts, chunk_size ) )
+                if ( len( chunk ) > 0 ):
+                    futures.append( executor.submit( clean_text_chunk, clean_fn, chunk ) )
+
+                if ( len( futures ) == 0 ):
+                    break
+
+                # 処理中のチャンクが一定数に達した場合、又は入力の終端に達した場合は、先頭のチャンクの結果を返す
+                if ( ( len( futures ) >= 2 * n_jobs ) or ( len( chunk ) == 0 ) ):
+                    for text in futures.popleft().result():
+                        yield text
+
+
+    @staticmethod
+    def iter_sms_spam_collection( path, bCleaning = True, n_jobs = 1, chunk_size = 10000 ):
+        """
+        SMS Spam Collection データセットの ( ラベル, 本文 ) を１行ずつ返すジェネレータ
+        MLPreProcess.load_sms_spam_collection(...) と同じく、最後の行は除外する。
+
+        [Input]
+            path : str
+                SMS Spam Collection データセットへのパス（ファイル名含む）
+            bCleaning : Bool
+                クリーニング処理を行うか否かのフラグ
+            n_jobs : int
+                クリーニング処理のプロセス数（1 の場合は並列化しない）
+
+        [Output]
+            ( label, text ) : ( str, str )
+                ラベル "ham" or "spam" と本文
+        """
+        def split_records():
+            previous = None
+            for line in MLTextPreProcess.iter_text_lines( path ):
+                # 次の行を読み込んでから前の行を返すことで、最後の行を除外する
+                if ( previous is not None ):
+                    fields = previous.split( "\t" )
+                    yield ( fields[0], fields[1] )
+
+                previous = line
+
+        records = split_records()
+        if ( bCleaning == True ):
+            records = MLTextPreProcess.map_chunks( clean_sms_record, records, n_jobs, chunk_size )
+
+        for record in records:
+            yield record
+
+
+    @staticmethod
+    def iter_shakespeare_lines( path, n_DeleteParagraph = 182, bCleaning = True, n_jobs = 1, chunk_size = 10000 ):
+        """
+        The Project Gutenberg EBook にある、シェイクスピア作品のテキストを１行ずつ返すジェネレータ
+        TextVocabulary.fit_partial(...), TextVocabulary.encode_stream(...) に直接渡すことが出来る。
+
+        [Input]
+            path : str
+                テキストデータへのパス（ファイル名含む）
+            n_DeleteParagraph : int
+                読み込み対象のテキストファイルに対して、（先頭から）除外する段落の数
+            bCleaning : Bool
+                クリーニング処理を行うか否かのフラグ
+            n_jobs : int
+                クリーニング処理のプロセス数（1 の場合は並列化しない）
+
+        [Output]
+            line : str
+                改行文字を除いた１行の文字列
+        """
+        lines = ( line.rstrip( "\r\n" ) for line in MLTextPreProcess.iter_text_lines( path, n_DeleteParagraph ) )
+        if ( bCleaning == True ):
+            lines = MLTextPreProcess.map_chunks( clean_shakespeare_text, lines, n_jobs, chunk_size )
+
+        for line in lines:
+            yield line
+
+
+    @staticmethod
+    def build_vocabulary( tokenized ):
+        """
+        トークン化したテキストから、出現回数の降順の vocabulary を作成する。
+        インデックス 0 はゼロパディング用とし、単語のインデックスは 1 から割り当てる。
+
+        [Input]
+            tokenized : list < list <str> >
+                各テキストのトークンのリスト
+
+        [Output]
+            dict_word2int : dict <str, int>
+                単語 → インデックスへの map
+        """
+        # Counter.update(...) で全テキストの単語を１回の走査で数える
+        counts = Counter( itertools.chain.from_iterable( tokenized ) )
+
+        # Counter.most_common() : 出現回数の降順（同じ回数の場合は最初に出現した順）
+        dict_word2int = { word: idx for (idx, (word, _)) in enumerate( counts.most_common(), 1 ) }
+
+        return dict_word2int
+
+
+    @staticmethod
+    def encode_padded_sequences( tokenized, dict_word2int, sequence_length = 200 ):
+        """
+        トークン化したテキストを、右側をゼロパディングした int32 のインデックスの行列に変換する。
+        シーケンス長より長いテキストは、最後の sequence_length 個のトークンを使用する。
+
+        [Input]
+            tokenized : list < list <str> >
+                各テキストのトークンのリスト
+            dict_word2int : dict <str, int>
+                単語 → インデックスへの map
+            sequence_length : int
+                シーケンス長（行列の列数）
+
+        [Output]
+            sequences : numpy.ndarray ( shape = [n_samples, sequence_length], dtype = int32 )
+                インデックスの行列
+            sequences_len : numpy.ndarray ( shape = [n_samples], dtype = int32 )
+                各テキストの有効な系列長
+        """
+        n_samples = len( tokenized )
+        lengths = numpy.fromiter( map( len, tokenized ), dtype = numpy.int64, count = n_samples )
+
+        # 全テキストのトークンを１つの配列にまとめてインデックスに変換
+        flat_ids = numpy.fromiter(
+                       map( dict_word2int.__getitem__, itertools.chain.from_iterable( tokenized ) ),
+                       dtype = numpy.int32,
+                       count = int( lengths.sum() )
+                   )
+
+        # 各トークンの行番号と、テキスト内での位置
+        rows = numpy.repeat( numpy.arange( n_samples ), lengths )
+        starts = numpy.cumsum( lengths ) - lengths
+        positions = numpy.arange( len( flat_ids ) ) - numpy.repeat( starts, lengths )
+
+        # 最後の sequence_length 個のトークンのみを、行列の左側から詰める
+        sequences_len = numpy.minimum( lengths, sequence_length ).astype( numpy.int32 )
+        cols = positions - numpy.repeat( lengths - sequences_len, lengths )
+        mask = ( cols >= 0 )
+
+        sequences = numpy.zeros( ( n_samples, sequence_length ), dtype = numpy.int32 )
+        sequences[ rows[mask], cols[mask] ] = flat_ids[mask]
+
+        return sequences, sequences_len
+
+
+    @staticmethod
+    def list_imdb_files( basepath ):
+        """
+        IMDb 映画評論データセット（aclImdb）のファイルのパスと評価ラベルのリストを返す。
+        """
+        labels = { "pos":1, "neg":0 }   # 肯定的、否定的の評価ラベル
+
+        paths = []
+        sentiments = []
+        for str1 in ( "test", "train" ):
+            for str2 in ( "pos", "neg" ):
+                path = os.path.join( basepath, str1, str2 )
+
+                for file in os.listdir( path ):
+                    paths.append( os.path.join( path, file ) )
+                    sentiments.append( labels[str2] )
+
+        return paths, numpy.array( sentiments, dtype = numpy.int32 )
+
+
+    @staticmethod
+    def imdb_cache_key( path, sequence_length, seed ):
+        """
+        IMDb 映画評論データセットのキャッシュファイルのキーを返す。
+        読み込み元の絶対パス、サイズと更新時刻、シーケンス長、シャッフルの seed のハッシュ値とすることで、
+        読み込み元や設定を変更した場合に、古いキャッシュを読み込まないようにする。
+        ディレクトリの場合は、ディレクトリ自体ではなく、含まれる各ファイルのサイズと更新時刻を用いる。
+
+        [Output]
+            key : str
+                "imdb_<sequence_length>_<ハッシュ値>" 形式の文字列
+        """
+        if ( os.path.isdir( path ) ):
+            paths, _ = MLTextPreProcess.list_imdb_files( path )
+        else:
+            paths = [ path ]
+
+        stats = [ ( os.path.relpath( file, path ), os.stat( file ).st_size, os.stat( file ).st_mtime ) for file in sorted( paths ) ]
+        source = json.dumps( [ os.path.abspath( path ), sequence_length, seed, stats ] )
+
+        return "imdb_%d_%s" % ( sequence_length, hashlib.md5( source.encode( "utf-8" ) ).hexdigest()[:12] )
+
+
+    @staticmethod
+    def load_imdb_dataset( path, sequence_length = 200, cache_dir = "imdb_cache", n_jobs = None, seed = 0 ):
+        """
+        IMDb 映画評論データセットを、ゼロパディングされたインデックスの行列として読み込む。
+        キャッシュファイルが存在する場合は、前処理を行わずにキャッシュから読み込む。
+        キャッシュファイルは、読み込み元、シーケンス長、seed 毎に別のファイルとする（imdb_cache_key(...)）
+
+        [Input]
+            path : str
+                aclImdb ディレクトリのパス、又は "review", "sentiment" 列を持つ csv ファイルのパス
+                ディレクトリの場合は、読み込んだデータの順序を seed でシャッフルする
+            sequence_length : int
+                シーケンス長
+            cache_dir : str
+                キャッシュファイルのディレクトリのパス（None の場合はキャッシュしない）
+            n_jobs : int
+                ファイル読み込み、トークン化のプロセス数（None の場合は CPU 数）
+            seed : int
+                ディレクトリから読み込んだデータをシャッフルする乱数の seed
+
+        [Output]
+            sequences : numpy.ndarray ( shape = [n_samples, sequence_length], dtype = int32 )
+                右側をゼロパディングしたインデックスの行列
+            sequences_len : numpy.ndarray ( shape = [n_samples], dtype = int32 )
+                各レビュー文の有効な系列長
+            sentiments : numpy.ndarray ( shape = [n_samples], dtype = int32 )
+                評価ラベル
+            dict_word2int : dict <str, int>
+                単語 → インデックスへの map
+        """
+        if ( cache_dir is not None ):
+            cache_file = os.path.join( cache_dir, MLTextPreProcess.imdb_cache_key( path, sequence_length, seed ) )
+            if ( os.path.isfile( cache_file + ".json" ) ):
+                print( "load cache file :", cache_file )
+                with open( cache_file + ".json", "r", encoding = "utf-8" ) as infile:
+                    dict_word2int = json.load( infile )
+
+                sequences = numpy.load( cache_file + "_sequences.npy" )
+                sequences_len = numpy.load( cache_file + "_sequences_len.npy" )
+                sentiments = numpy.load( cache_file + "_sentiments.npy" )
+
+                return sequences, sequences_len, sentiments, dict_word2int
+
+        #---------------------------------------------
+        # テキストの読み込み
+        #---------------------------------------------
+        if ( os.path.isdir( path ) ):
+            paths, sentiments = MLTextPreProcess.list_imdb_files( path )
+            reviews = MLTextPreProcess.read_text_files( paths, n_jobs )
+
+            # 行の順番をシャッフルしておく。（過学習対策）
+            permutation = numpy.random.RandomState( seed ).permutation( len( reviews ) )
+            reviews = [ reviews[i] for i in permutation ]
+            sentiments = sentiments[permutation]
+        else:
+            import pandas
+            df = pandas.read_csv( path, encoding = "utf-8" )
+            reviews = df["review"].tolist()
+            sentiments = df["sentiment"].values.astype( numpy.int32 )
+
+        #---------------------------------------------
+        # トークン化 & 数値インデックス化
+        #---------------------------------------------
+        tokenized = MLTextPreProcess.tokenize_texts( reviews, n_jobs )
+        dict_word2int = MLTextPreProcess.build_vocabulary( tokenized )
+        sequences, sequences_len = MLTextPreProcess.encode_padded_sequences( tokenized, dict_word2int, sequence_length )
+
+        #---------------------------------------------
+        # キャッシュファイルに保存
+        #---------------------------------------------
+        if ( cache_dir is not None ):
+            if ( os.path.isdir( cache_dir ) == False ):
+                os.makedirs( cache_dir )
+
+            numpy.save( cache_file + "_sequences.npy", sequences )
+            numpy.save( cache_file + "_sequences_len.npy", sequences_len )
+            numpy.save( cache_file + "_sentiments.npy", sentiments )
+
+            # vocabulary は最後に保存し、キャッシュが揃っているか否かの判定に用いる
+            with open( cache_file + ".json", "w", encoding = "utf-8" ) as outfile:
+                json.dump( dict_word2int, outfile, ensure_ascii = False )
+
+        return sequences, sequences_len, sentiments, dict_word2int
+
+
+class TextVocabulary( object ):
+    """
+    空白で区切られた単語単位のテキストの vocabulary（単語 ↔ 数値インデックスの map）を表すクラス
+    ・単語のインデックスは、出現回数の降順（同じ回数の場合は単語の辞書順）に 1 から割り当てるので、入力の順序に依らず決定的
+    ・インデックス 0 は、vocabulary に含まれない単語（unknown）を表す
+    ・テキストの行毎に単語の出現回数を加算するので、メモリに乗らない大きなコーパスも逐次的に処理可能
+    ------------------------------------------------------------------------------------------------
+    [public] public アクセス可能なインスタスンス変数には, 便宜上変数名の最後にアンダースコア _ を付ける.
+        _min_word_freq : int
+            vocabulary に登録する単語の出現回数の閾値（この値より多く出現した単語のみを登録）
+        _unknown_token : str
+            vocabulary に含まれない単語を表す文字列（インデックス 0）
+        _word_counts : Counter
+            単語の出現回数
+        _dict_vcab_to_idx : dict <str, int>
+            語彙 "xxx" → インデックスへの map
+        _idx_to_vocab : numpy.ndarray <object>
+            インデックス → 語彙 "xxx" への配列
+
+    [protedted] protedted な使用法を想定
+
+    [private] 変数名の前にダブルアンダースコア __ を付ける（Pythonルール）
+
+    """
+    def __init__( self, min_word_freq = 0, unknown_token = "unknown" ):
+        self._min_word_freq = min_word_freq
+        self._unknown_token = unknown_token
+
+        self._word_counts = Counter()
+        self._dict_vcab_to_idx = None
+        self._idx_to_vocab = None
+
+        return
+
+    def print( self, str ):
+        print( "TextVocabulary" )
+        print( self )
+        print( str )
+        print( "_min_word_freq :", self._min_word_freq )
+        print( "_unknown_token :", self._unknown_token )
+        print( "n_vocab :", self.n_vocab() )
+
+        return
+
+
+    def n_vocab( self ):
+        """
+        unknown を含めた vocabulary のサイズ（埋め込み行列の行数）を返す。
+        """
+        if ( self._idx_to_vocab is None ):
+            return 0
+
+        return len( self._idx_to_vocab )
+
+
+    def fit_partial( self, text_data ):
+        """
+        テキストの各行の単語の出現回数を加算する。
+        コーパスを分割して複数回呼び出すことで、逐次的に出現回数を数えることが出来る。
+        この後 build() を呼び出して vocabulary を作成する。
+
+        [Input]
+            text_data : iterable <str>
+                テキストの行（list 又は generator）
+        """
+        for line in text_data:
+            self._word_counts.update( line.split() )
+
+        return self
+
+
+    def build( self ):
+        """
+        加算した単語の出現回数から、vocabulary を作成する。
+        """
+        words = [ word for (word, count) in self._word_counts.items() if ( count > self._min_word_freq ) and ( word != self._unknown_token ) ]
+
+        # 出現回数の降順、同じ回数の場合は単語の辞書順
+        words.sort( key = lambda word : ( -self._word_counts[word], word ) )
+
+        self._idx_to_vocab = numpy.array( [ self._unknown_token ] + words, dtype = object )
+        self._dict_vcab_to_idx = { word: idx for (idx, word) in enumerate( self._idx_to_vocab ) }
+
+        return self
+
+
+    def fit( self, text_data ):
+        """
+        テキストデータから vocabulary を作成する。
+
+        [Input]
+            text_data : iterable <str>
+                テキストの行（list 又は generator）
+        """
+        self._word_counts = Counter()
+
+        return self.fit_partial( text_data ).build()
+
+
+    def encode( self, text_data ):
+        """
+        テキストの各行を単語に分割し、全ての単語を連結した数値インデックスの配列に変換する。
+        vocabulary に含まれない単語はインデックス 0 に変換する。
+
+        [Input]
+            text_data : iterable <str>
+                テキストの行
+
+        [Output]
+            text_data_idx : numpy.ndarray ( dtype = int32 )
+                数値インデックスの配列
+        """
+        words = list( itertools.chain.from_iterable( map( str.split, text_data ) ) )
+
+        # dict.get(...) のハッシュ検索で、全ての単語を一括してインデックスに変換
+        text_data_idx = numpy.fromiter(
+                            map( self._dict_vcab_to_idx.get, words, itertools.repeat( 0 ) ),
+                            dtype = numpy.int32,
+                            count = len( words )
+                        )
+
+        return text_data_idx
+
+
+    def encode_stream( self, text_data, chunk_size = 100000 ):
+        """
+        テキストの行を chunk_size 行毎に数値インデックスの配列に変換して返すジェネレータ
+        メモリに乗らない大きなコーパスを、チャンク単位で変換する。
+
+        [Input]
+            text_data : iterable <str>
+                テキストの行（list 又は generator）
+            chunk_size : int
+                １つのチャンクの行数
+
+        [Output]
+            text_data_idx : numpy.ndarray ( dtype = int32 )
+                チャンク毎の数値インデックスの配列
+        """
+        text_data = iter( text_data )
+        while True:
+            chunk = list( itertools.islice( text_data, chunk_size ) )
+            if ( len( chunk ) == 0 ):
+                break
+
+            yield self.encode( chunk )
+
+
+    def decode( self, text_data_idx ):
+        """
+        数値インデックスの配列を、空白区切りの文字列に変換する。
+        """
+        return " ".join( self._idx_to_vocab[ numpy.asarray( text_data_idx ) ] )
+
+
+    def save( self, path ):
+        """
+        vocabulary を json ファイルに保存する。
+        """
+        with open( path, "w", encoding = "utf-8" ) as outfile:
+            json.dump(
+                {
+                    "min_word_freq" : self._min_word_freq,
+                    "unknown_token" : self._unknown_token,
+                    "vocab" : self._idx_to_vocab.tolist()
+                },
+                outfile,
+                ensure_ascii = False
+            )
+
+        return
+
+
+    @staticmethod
+    def load( path ):
+        """
+        json ファイルに保存した vocabulary を読み込む。
+
+        [Output]
+            vocabulary : TextVocabulary
+        """
+        with open( path, "r", encoding = "utf-8" ) as infile:
+            data = json.load( infile )
+
+        vocabulary = TextVocabulary( min_word_freq = data["min_word_freq"], unknown_token = data["unknown_token"] )
+        vocabulary._idx_to_vocab = numpy.array( data["vocab"], dtype = object )
+        vocabulary._dict_vcab_to_idx = { word: idx for (idx, word) in enumerate( vocabulary._idx_to_vocab ) }
+
+        return vocabulary
@@ -4,6 +4,9 @@
 """
     更新情報
     [18/04/19] : 新規作成
+    [26/10/19] : 系列長 sequence_length を考慮した RNN と、系列長の近いデータをまとめたミニバッチ（バケッティング）に対応
+               : バッチサイズを入力データから動的に決定するように変更し、推定時に全データを処理するように変更
+               : LSTM の cell を NNCell.LSTMCellFactory で生成し、融合されたブロック LSTM を選択できるように変更
     [xx/xx/xx] :
 
 """
@@ -30,6 +33,8 @@ import NNLoss                                       # ニューラルネット
 
 import NNOptimizer                                  # ニューラルネットワークの最適化アルゴリズム Optimizer を表すクラス
 
+from NNCell import LSTMCellFactory                  # LSTM の cell を生成するクラス
+
 
 class Many2OneMultiRNNLSTM( NeuralNetworkBase ):
     """description of class
@@ -50,12 +55,17 @@ class Many2OneMultiRNNLSTM( NeuralNetworkBase ):
             エポック数（トレーニング回数）
         _batch_size : int
             ミニバッチ学習でのバッチサイズ
+            計算グラフはバッチサイズに依存しないので、推定時は任意のバッチサイズで処理可能
         _eval_step : int
             学習処理時に評価指数の算出処理を行う step 間隔
         _losses_train : list <float32>
             トレーニングデータでの損失関数の値の list
         _encoder_input_holder : placeholder
             Encoder の入力層にデータを供給するための placeholder
+            系列方向の長さはミニバッチ毎に可変（ミニバッチ内の最大の系列長まで切り詰めたデータを供給可能）
+        _seq_len_holder : placeholder
+            各データの有効な系列長を供給するための placeholder
+            供給しない場合は、入力データの系列長全体を有効とする
         _t_holder : placeholder
             Decoder の出力層に教師データを供給するための placeholder
         _dropout_holder : placeholder
@@ -74,6 +84,9 @@ class Many2OneMultiRNNLSTM( NeuralNetworkBase ):
             これを次の時間の隠れ層に順々に渡していくことで、時間軸の逆伝搬を実現する。
         _rnn_states : list<Tensor>
             cell の状態
+        _b_fused_cell : bool
+            BasicLSTMCell の代わりに、融合されたブロック LSTM（LSTMBlockCell）を使用するか否か
+            Variable の名前と shape は BasicLSTMCell と同じなので、チェックポイントは相互に読み込み可能
 
     [protedted] protedted な使用法を想定 
 
@@ -91,7 +104,8 @@ class Many2OneMultiRNNLSTM( NeuralNetworkBase ):
             epochs = 1000,
             batch_size = 10,
             eval_step = 1,
-            save_step = 100
+            save_step = 100,
+            b_fused_cell = False
         ):
 
         super().__init__( session )
@@ -109,6 +123,7 @@ class Many2OneMultiRNNLSTM( NeuralNetworkBase ):
         
         self._n_vocab = n_vocab
         self._save_step = save_step
+        self._b_fused_cell = b_fused_cell
 
         # evaluate 関連の初期化
         self._losses_train = []
@@ -126,13 +141,20 @@ class Many2OneMultiRNNLSTM( NeuralNetworkBase ):
         # shape の行は、None にして汎用性を確保
         self._encoder_input_holder = tf.placeholder( 
                              tf.int32, 
-                             shape = [ self._batch_size, self._n_in_sequence_encoder ],
+                             shape = [ None, None ],
                              name = "encoder_input_holder"
                          )
+
+        # 有効な系列長の placeholder / データの右側がゼロパディングされていることを前提とする
+        self._seq_len_holder = tf.placeholder_with_default(
+                                   tf.fill( [ tf.shape(self._encoder_input_holder)[0] ], tf.shape(self._encoder_input_holder)[1] ),
+                                   shape = [ None ],
+                                   name = "seq_len_holder"
+                               )
         
         self._t_holder = tf.placeholder( 
                              tf.float32, 
-                             shape = [ self._batch_size ],
+                             shape = [ None ],
                              name = "t_holder"
                          )
         
@@ -162,8 +184,10 @@ class Many2OneMultiRNNLSTM( NeuralNetworkBase ):
         print( "_epoches : ", self._epochs )
         print( "_batch_size : ", self._batch_size )
         print( "_eval_step : ", self._eval_step )
+        print( "_b_fused_cell : ", self._b_fused_cell )
 
         print( "_encoder_input_holder : ", self._encoder_input_holder )
+        print( "_seq_len_holder : ", self._seq_len_holder )
         print( "_t_holder : ", self._t_holder )
         print( "_dropout_holder : ", self._dropout_holder )
 
@@ -210,10 +234,10 @@ class Many2OneMultiRNNLSTM( NeuralNetworkBase ):
         # 時系列に沿った RNN 構造を提供するクラス BasicLSTMCell の cell を取得する。
         # この cell は、内部（プロパティ）で state（隠れ層の状態）を保持しており、
         # これを次の時間の隠れ層に順々に渡していくことで、時間軸の逆伝搬を実現する。
-        lstm_cell = tf.nn.rnn_cell.BasicLSTMCell( 
+        # _b_fused_cell = True の場合は、融合されたブロック LSTM（LSTMBlockCell）を使用
+        lstm_cell = LSTMCellFactory( cell_type = "basic", b_fused = self._b_fused_cell ).create(
                         self._n_hiddenLayer,    # int, The number of units in the RNN(LSTM) cell.
-                        forget_bias=0.0,        # 忘却ゲート
-                        state_is_tuple=True 
+                        forget_bias=0.0         # 忘却ゲート
                     )
 
         # cell に Dropout を適用する。（＝中間層に dropout 機能を追加）
@@ -240,17 +264,20 @@ class Many2OneMultiRNNLSTM( NeuralNetworkBase ):
         # cell 初期状態を定義
         # 最初の時間 t0 では、過去の隠れ層がないので、
         # cell.zero_state(...) でゼロの状態を初期設定する。
-        init_state_tsr = cells.zero_state( batch_size=self._batch_size, dtype=tf.float32 )
+        # バッチサイズは入力データの shape から動的に決定する（学習時と推定時で異なるバッチサイズを使用可能）
+        init_state_tsr = cells.zero_state( batch_size=tf.shape(self._encoder_input_holder)[0], dtype=tf.float32 )
         self._rnn_states.append( init_state_tsr )
         print( "init_state_tsr :", init_state_tsr )
         
         # tf.nn.dynamic_rnn(...) を用いて、シーケンス長が可変長な RNN シーケンスを作成する。
+        # sequence_length を指定することで、各データの有効な系列長以降の時刻の計算は行われない。
         # outputs_tsr: The RNN output Tensor
         # state_tsr : The final state
         # lstm_outputs / shape = [batch_size, max_time, cells.output_size]
         outputs_tsr, final_state_tsr = tf.nn.dynamic_rnn(
                                            cells,
                                            self._embedding_lookup_op,     
+                                           sequence_length = self._seq_len_holder,
                                            initial_state = init_state_tsr
                                        )
         self._rnn_cells.append( outputs_tsr )
@@ -260,6 +287,15 @@ class Many2OneMultiRNNLSTM( NeuralNetworkBase ):
         print( "self._rnn_cells[-1] :", self._rnn_cells[-1] )
         print( "final_state_tsr :", final_state_tsr )
 
+        # 各データの有効な最後の時刻の出力を取り出す
+        # 有効な系列長以降の出力はゼロ埋めされるので、outputs_tsr[:,-1] ではなく系列長 - 1 の位置の出力を用いる
+        last_index_tsr = tf.stack(
+                             [ tf.range( tf.shape(outputs_tsr)[0] ), tf.maximum( self._seq_len_holder, 1 ) - 1 ],
+                             axis = 1
+                         )
+        last_outputs_tsr = tf.gather_nd( outputs_tsr, last_index_tsr )
+        print( "last_outputs_tsr :", last_outputs_tsr )
+
         #---------------------------------------------
         # fully connected layer
         #---------------------------------------------
@@ -267,7 +303,7 @@ class Many2OneMultiRNNLSTM( NeuralNetworkBase ):
         # This layer implements the operation: outputs = activation(inputs.kernel + bias)
         # Where activation is the activation function passed as the activation argument (if not None)
         y_in_op = tf.layers.dense(
-                      inputs = outputs_tsr[:,-1],    # RNN Cell の最終的な Output
+                      inputs = last_outputs_tsr,     # RNN Cell の有効な最後の時刻の Output
                       units = 1,                     # Integer or Long, dimensionality of the output space. / one-hot encoding していないので出力ノード数は 1
                       activation = None,
                       name = "logits"
@@ -276,7 +312,8 @@ class Many2OneMultiRNNLSTM( NeuralNetworkBase ):
         print( "y_in_op :", y_in_op )              # y_in_op : Tensor("logits/BiasAdd:0", shape=(100, 1), dtype=float32)
 
         # tf.squeeze(...) : size が 1 の次元を削除し次元数を減らす
-        y_in_op = tf.squeeze( y_in_op )
+        # バッチサイズが 1 の場合にスカラーにならないように、削除する次元を指定する
+        y_in_op = tf.squeeze( y_in_op, axis = 1 )
         print( "y_in_op :", y_in_op )              # y_in_op : Tensor("Squeeze:0", shape=(100,), dtype=float32)
         
         #--------------------------------------------------------------
@@ -321,7 +358,57 @@ class Many2OneMultiRNNLSTM( NeuralNetworkBase ):
         return self._train_step
 
 
-    def fit( self, X_train, y_train ):
+    def generate_bucketed_minibatch( self, X, X_seq_len, batch_size, y = None, bShuffle = True ):
+        """
+        系列長の近いデータ同士を同じミニバッチにまとめて返すジェネレータ（バケッティング）
+        各ミニバッチは、ミニバッチ内の最大の系列長まで切り詰めて返すので、
+        短い系列のみのミニバッチでは、RNN の時刻方向の計算量が削減される。
+
+        [Input]
+            X : numpy.ndarray ( shape = [n_samples, n_in_sequence] )
+                右側がゼロパディングされた系列データ
+            X_seq_len : numpy.ndarray ( shape = [n_samples] )
+                各データの有効な系列長
+            batch_size : int
+                ミニバッチのサイズ
+            y : numpy.ndarray ( shape = [n_samples] )
+                教師データ（None の場合は返さない）
+            bShuffle : bool
+                ミニバッチの順序、及び同じ系列長のデータの順序をシャッフルするか否か
+
+        [Output]
+            batch_indices : numpy.ndarray
+                ミニバッチの各データの、元のデータでのインデックス
+            batch_x, batch_seq_len (, batch_y) : numpy.ndarray
+        """
+        # 系列長の昇順に並び替えたインデックス
+        if ( bShuffle == True ):
+            # numpy.lexsort(...) : 最後のキー（系列長）を第１キー、一様乱数を第２キーとして並び替え、
+            # 同じ系列長の中ではランダムな順序とすることで、エポック毎に異なるミニバッチを構成する
+            indices = numpy.lexsort( ( numpy.random.rand( len( X_seq_len ) ), X_seq_len ) )
+        else:
+            # 同じ系列長の中では元の順序を維持
+            indices = numpy.argsort( X_seq_len, kind = "mergesort" )
+
+        # 端数のデータも最後のミニバッチとして処理する
+        n_batches = ( len( X ) + batch_size - 1 ) // batch_size
+        batch_order = numpy.arange( n_batches )
+        if ( bShuffle == True ):
+            batch_order = numpy.random.permutation( n_batches )
+
+        for i in batch_order:
+            batch_indices = indices[i*batch_size:(i+1)*batch_size]
+            batch_seq_len = X_seq_len[batch_indices]
+            max_len = max( numpy.max( batch_seq_len ), 1 )
+
+            # yield 文で逐次データを return（関数の処理を一旦停止し、値を返す）
+            if ( y is None ):
+                yield batch_indices, X[batch_indices, :max_len], batch_seq_len
+            else:
+                yield batch_indices, X[batch_indices, :max_len], batch_seq_len, y[batch_indices]
+
+
+    def fit( self, X_train, y_train, X_seq_len = None ):
         """
         指定されたトレーニングデータで、モデルの fitting 処理を行う。
 
@@ -332,20 +419,16 @@ class Many2OneMultiRNNLSTM( NeuralNetworkBase ):
             y_train : numpy.ndarray ( shape = [n_samples] )
                 トレーニングデータ用のクラスラベル（教師データ）のリスト
 
+            X_seq_len : numpy.ndarray ( shape = [n_samples] )
+                各データの有効な系列長（X_train は右側がゼロパディングされていること）
+                None の場合は、全データの系列長を n_features とする
+
         [Output]
             self : 自身のオブジェクト
         """
-        def generate_minibatch( x, y, batch_size ):
-            n_batches = len( x ) // batch_size
-            x = x[:n_batches*batch_size]
-            y = y[:n_batches*batch_size]
-
-            # batch_size 間隔で for loop
-            for i in range( 0, len(x), batch_size ):
-                # yield 文で逐次データを return（関数の処理を一旦停止し、値を返す）
-                # メモリ効率向上のための処理
-                yield x[i:i+batch_size], y[i:i+batch_size]
-        
+        if ( X_seq_len is None ):
+            X_seq_len = numpy.full( len(X_train), X_train.shape[1], dtype = numpy.int32 )
+
         #----------------------------
         # 学習開始処理
         #----------------------------
@@ -362,34 +445,20 @@ class Many2OneMultiRNNLSTM( NeuralNetworkBase ):
         # 学習処理
         #-------------------
         # for ループでエポック数分トレーニング
+        # 各データは独立したレビュー文なので、ミニバッチ毎に RNN Cell の状態はゼロの初期状態から開始する
         for epoch in range( self._epochs ):
-            # 各エポックの最初に、RNN Cell の状態を初期状態にリセット
-            # このプロセスを繰り返すことにより、エポックを通じての現在の状態の更新を実現する。
-            rnn_cell_state = self._session.run( self._rnn_states[0] )
-
-            # ミニバッチサイズ単位で for ループ
-            for batch_x, batch_y in generate_minibatch( X_train, y_train , self._batch_size ):
+            # 系列長の近いデータをまとめたミニバッチ単位で for ループ
+            for _, batch_x, batch_seq_len, batch_y in self.generate_bucketed_minibatch( X_train, X_seq_len, self._batch_size, y = y_train ):
                 # 設定された最適化アルゴリズム Optimizer でトレーニング処理を run
-                _, rnn_cell_state = self._session.run(
-                                        [ self._train_step, self._rnn_states[-1] ],
-                                        feed_dict = {
-                                            self._encoder_input_holder: batch_x,
-                                            self._t_holder: batch_y,
-                                            self._dropout_holder: 0.5,
-                                            self._rnn_states[0]: rnn_cell_state
-                                        }
-                                    )
-
-                # RNN cell の最終状態に現在の状態を feed し、最終状態を更新する。
-                # このプロセスを繰り返すことにより、エポックを通じての現在の状態の更新を実現する。
-                """
-                rnn_cell_state = self._session.run(
-                                     self._rnn_states[-1],
-                                     feed_dict = {
-                                         self._rnn_states[0] : rnn_cell_state
-                                     }
-                                 )
-                """
+                self._session.run(
+                    self._train_step,
+                    feed_dict = {
+                        self._encoder_input_holder: batch_x,
+                        self._seq_len_holder: batch_seq_len,
+                        self._t_holder: batch_y,
+                        self._dropout_holder: 0.5
+                    }
+                )
 
                 minibatch_iteration += 1
             
@@ -401,6 +470,7 @@ class Many2OneMultiRNNLSTM( NeuralNetworkBase ):
                                session = self._session,
                                feed_dict = {
                                    self._encoder_input_holder: batch_x,
+                                   self._seq_len_holder: batch_seq_len,
                                    self._t_holder: batch_y,
                                    self._dropout_holder: 0.5
                                }
@@ -414,7 +484,7 @@ class Many2OneMultiRNNLSTM( NeuralNetworkBase ):
 
 
 
-    def predict( self, X_test ):
+    def predict( self, X_test, X_seq_len = None, batch_size = None ):
         """
         fitting 処理したモデルで、推定を行い、予想値を返す。
 
@@ -424,90 +494,69 @@ class Many2OneMultiRNNLSTM( NeuralNetworkBase ):
                 n_samples : シーケンスに分割した時系列データのサンプル数
                 n_features(=n_in_sequence) : １つのシーケンスのサイズ
                 dim : 各シーケンスの要素の次元数
+            X_seq_len : numpy.ndarray ( shape = [n_samples] )
+                各データの有効な系列長（None の場合は n_features）
+            batch_size : int
+                推定時のバッチサイズ（None の場合は学習時のバッチサイズ）
 
         [Output]
             predicts : numpy.ndarry ( shape = [n_samples] )
                 予想結果（分類モデルの場合は、クラスラベル）
         """
-        def generate_minibatch( x, batch_size ):
-            n_batches = len( x ) // batch_size
-            x = x[:n_batches*batch_size]
-
-            # batch_size 間隔で for loop
-            for i in range( 0, len(x), batch_size ):
-                # yield 文で逐次データを return（関数の処理を一旦停止し、値を返す）
-                # メモリ効率向上のための処理
-                yield x[i:i+batch_size]
-
-        preds = []
-        test_state = self._session.run( self._rnn_states[0] )   # RNN Cell の初期状態で Session run()
-
-        for (i, batch_x) in enumerate( generate_minibatch(X_test, self._batch_size), 1 ):
-            pred, test_state = self._session.run(
-                                   [ tf.cast( tf.round(self._y_out_op), tf.int32 ), self._rnn_states[-1] ],
-                                   feed_dict = {
-                                       self._encoder_input_holder: batch_x,
-                                       self._dropout_holder: 0.5,
-                                       self._rnn_states[0]: test_state
-                                   }
-                               )
-
-            preds.append( pred )
-
-            #print( "pred :", pred )
-            #print( "test_state :", test_state )
+        proba = self.predict_proba( X_test, X_seq_len, batch_size )
 
-        # numpy.concatenate(...) :
-        return numpy.concatenate( preds )
+        return numpy.round( proba ).astype( numpy.int32 )
 
 
-    def predict_proba( self, X_test ):
+    def predict_proba( self, X_test, X_seq_len = None, batch_size = None ):
         """
         fitting 処理したモデルで、推定を行い、クラスの所属確率の予想値を返す。
         proba : probability
+        系列長の近いデータをまとめたミニバッチで推定し、元のデータの順序に並べ直して返す。
+        端数のデータも含めて全データを推定する。
+
         [Input]
             X_test : numpy.ndarry ( shape = [n_samples, n_features] )
                 予想したい特徴行列
+            X_seq_len : numpy.ndarray ( shape = [n_samples] )
+                各データの有効な系列長（None の場合は n_features）
+            batch_size : int
+                推定時のバッチサイズ（None の場合は学習時のバッチサイズ）
+                スループット重視の場合は大きな値、レイテンシ重視の場合は 1 などの小さな値を指定する
+
+        [Output]
+            preds : numpy.ndarry ( shape = [n_samples] )
         """
-        def generate_minibatch( x, batch_size ):
-            n_batches = len( x ) // batch_size
-            x = x[:n_batches*batch_size]
-
-            # batch_size 間隔で for loop
-            for i in range( 0, len(x), batch_size ):
-                # yield 文で逐次データを return（関数の処理を一旦停止し、値を返す）
-                # メモリ効率向上のための処理
-                yield x[i:i+batch_size]
-
-        preds = []
-        test_state = self._session.run( self._rnn_states[0] )   # RNN Cell の初期状態で Session run()
-
-        for (i, batch_x) in enumerate( generate_minibatch(X_test, self._batch_size), 1 ):
-            pred, test_state = self._session.run(
-                                   #[ "probabilities:0", self._rnn_states[-1] ],     # ?
-                                   [ self._y_out_op, self._rnn_states[-1] ],
-                                   feed_dict = {
-                                       self._encoder_input_holder: batch_x,
-                                       self._dropout_holder: 0.5,
-                                       self._rnn_states[0]: test_state
-                                   }
-                               )
+        if ( X_seq_len is None ):
+            X_seq_len = numpy.full( len(X_test), X_test.shape[1], dtype = numpy.int32 )
+
+        if ( batch_size is None ):
+            batch_size = self._batch_size
+
+        preds = numpy.zeros( len(X_test), dtype = numpy.float32 )
 
-            preds.append( pred )
+        for batch_indices, batch_x, batch_seq_len in self.generate_bucketed_minibatch( X_test, X_seq_len, batch_size, bShuffle = False ):
+            pred = self._session.run(
+                       self._y_out_op,
+                       feed_dict = {
+                           self._encoder_input_holder: batch_x,
+                           self._seq_len_holder: batch_seq_len,
+                           self._dropout_holder: 1.0
+                       }
+                   )
 
-            #print( "pred :", pred )
-            #print( "test_state :", test_state )
+            # 元のデータの順序の位置に格納
+            preds[batch_indices] = pred
 
-        # numpy.concatenate(...) :
-        return numpy.concatenate( preds )
+        return preds
 
 
-    def accuracy( self, X_test, y_test ):
+    def accuracy( self, X_test, y_test, X_seq_len = None ):
         """
         指定したデータでの正解率 [accuracy] を計算する。
         """
         # 予想ラベルを算出する。
-        predict = self.predict( X_test )
+        predict = self.predict( X_test, X_seq_len )
 
         # 正解数
         n_correct = numpy.sum( numpy.equal( predict, y_test[0:predict.shape[0]] ) )
@@ -4,6 +4,8 @@
 """
     更新情報
     [17/11/29] : 新規作成
+    [26/10/19] : 予想ステップ毎の session.run(...) を、計算グラフ内の tf.while_loop(...) で隠れ層の状態を引き継ぐ自己回帰の予想処理に変更
+               : 複数の時系列データをまとめてバッチ処理で予想する predict_forecast_series(...) を追加
     [xx/xx/xx] : 
 
 """
@@ -92,6 +94,11 @@ class RecurrentNN( NeuralNetworkBase ):
         _batch_size_holder : placeholder
             バッチサイズ _batch_size にデータを供給するための placeholder
             cell.zero_state(...) でバッチサイズを指定する必要があり、可変長に対応するために必要
+        _n_horizon_holder : placeholder
+            自己回帰で予想する未来のステップ数にデータを供給するための placeholder
+        _forecast_op : Operator
+            自己回帰で予想した未来の時系列データのオペレーター [ batch_size, n_horizon, n_outputLayer ]
+            入力層と出力層の次元が異なる場合は None
 
     [protedted] protedted な使用法を想定 
 
@@ -153,6 +160,9 @@ class RecurrentNN( NeuralNetworkBase ):
 
         self._keep_prob_holder = tf.placeholder( tf.float32, name = "keep_prob_holder" )
         self._batch_size_holder = tf.placeholder( tf.int32, shape=[], name = "batch_size_holder" )
+        self._n_horizon_holder = tf.placeholder( tf.int32, shape=[], name = "n_horizon_holder" )
+
+        self._forecast_op = None
 
         return
 
@@ -184,6 +194,8 @@ class RecurrentNN( NeuralNetworkBase ):
         print( "_t_holder : ", self._t_holder )
         print( "_keep_prob_holder : ", self._keep_prob_holder )
         print( "_batch_size_holder : ", self._batch_size_holder )
+        print( "_n_horizon_holder : ", self._n_horizon_holder )
+        print( "_forecast_op : ", self._forecast_op )
 
         print( "_rnn_cells : \n", self._rnn_cells )
         #if( (self._session != None) and (self._init_var_op != None) ):
@@ -318,9 +330,61 @@ class RecurrentNN( NeuralNetworkBase ):
         # 線形活性
         self._y_out_op = y_in_op
 
+        #--------------------------------------------------------------
+        # 自己回帰での予想処理
+        #--------------------------------------------------------------
+        self.model_forecast( cell, 'RNN' )
+
         return self._y_out_op
 
 
+    def model_forecast( self, cell, scope_name ):
+        """
+        モデルの出力を次の時刻の入力として与える自己回帰で、未来の時系列データを予想するオペレーターを設定する。
+        入力ウィンドウの最後の隠れ層の状態から、１ステップ分の処理を tf.while_loop(...) で計算グラフ内で繰り返す。
+        予想ステップ毎に入力ウィンドウを作り直さないので、予想ステップ数に対して線形時間で処理される。
+
+        [Input]
+            cell : RNNCell
+                model() で使用した RNN の cell
+            scope_name : str
+                model() で cell の Variable を作成した名前空間
+
+        [Output]
+            self._forecast_op : Operator
+                予想した未来の時系列データのオペレーター [ batch_size, n_horizon, n_outputLayer ]
+        """
+        # 出力を次の時刻の入力とするので、入力層と出力層の次元が一致している必要がある
+        if ( self._n_inputLayer != self._n_outputLayer ):
+            self._forecast_op = None
+            return self._forecast_op
+
+        def body( t, y_t, state_tsr, forecasts ):
+            # model() の cell の Variable を再利用して、１ステップ分の処理を行う
+            with tf.variable_scope( scope_name, reuse = True ):
+                cell_output, state_tsr = cell( inputs = y_t, state = state_tsr )
+
+            y_t = tf.matmul( cell_output, self._weights[-1] ) + self._biases[-1]
+            forecasts = forecasts.write( t, y_t )
+
+            return ( t + 1, y_t, state_tsr, forecasts )
+
+        # 入力ウィンドウに対するモデルの出力 self._y_out_op を、１ステップ目の予想値とする
+        forecasts = tf.TensorArray( tf.float32, size = self._n_horizon_holder )
+        forecasts = forecasts.write( 0, self._y_out_op )
+
+        _, _, _, forecasts = tf.while_loop(
+                                 cond = lambda t, y_t, state_tsr, forecasts: t < self._n_horizon_holder,
+                                 body = body,
+                                 loop_vars = ( tf.constant( 1 ), self._y_out_op, self._rnn_states[-1], forecasts )
+                             )
+
+        # [n_horizon, batch_size, n_outputLayer] → [batch_size, n_horizon, n_outputLayer]
+        self._forecast_op = tf.transpose( forecasts.stack(), perm = [1, 0, 2] )
+
+        return self._forecast_op
+
+
     def loss( self, nnLoss ):
         """
         損失関数の定義を行う。
@@ -457,6 +521,14 @@ class RecurrentNN( NeuralNetworkBase ):
 
         print( "n_sequences :", n_sequences )
 
+        # 入力層と出力層の次元が一致している場合は、
+        # 最初のシーケンスの隠れ層の状態を引き継ぎながら、計算グラフ内で自己回帰で予想する
+        if ( self._forecast_op is not None ):
+            forecasts = self.predict_forecast( X_t[0], n_sequences - self._n_in_sequence + 1 )
+            predicts.extend( forecasts[:,0] )
+
+            return predicts
+
         # サイズが τ で、
         # { f(t=1), f(t=2), ... , f(t=τ) }, { f(t=2), f(t=3), ... , f(t=τ+1) }, ... , { f(t-τ), f(t-τ+1), ... , f(t) }
         #  の合計 t - τ + 1 個のデータセットに対応したループ処理
@@ -506,6 +578,91 @@ class RecurrentNN( NeuralNetworkBase ):
         return predicts
 
 
+    def predict_forecast( self, X_window, n_horizon ):
+        """
+        fitting 処理したモデルで、入力ウィンドウに続く未来の時系列データを自己回帰で予想する。
+        予想ステップ数に関わらず、session.run(...) は１回のみ。
+
+        [Input]
+            X_window : numpy.ndarry ( shape = [n_in_sequence, dim] )
+                予想の起点となる入力ウィンドウ（時系列データ）
+            n_horizon : int
+                予想する未来のステップ数
+
+        [Output]
+            forecasts : numpy.ndarry ( shape = [n_horizon, n_outputLayer] )
+                予想した未来の時系列データ
+        """
+        # 出力を次の時刻の入力とするので、入力層と出力層の次元が一致している必要がある
+        if ( self._forecast_op is None ):
+            raise ValueError( "forecasting requires n_inputLayer == n_outputLayer" )
+
+        # 予想ステップ数が 0 以下の場合は、予想値なし
+        if ( n_horizon <= 0 ):
+            return numpy.empty( ( 0, self._n_outputLayer ), dtype = numpy.float32 )
+
+        forecasts = self._session.run(
+                        self._forecast_op,
+                        feed_dict = {
+                            self._X_holder: X_window.reshape( 1, self._n_in_sequence, self._n_inputLayer ),
+                            self._batch_size_holder: 1,
+                            self._n_horizon_holder: n_horizon
+                        }
+                    )
+
+        return forecasts[0]
+
+
+    def predict_forecast_series( self, X_series, n_horizon, batch_size = 1024 ):
+        """
+        fitting 処理したモデルで、互いに独立な複数の時系列データの未来の値を、まとめて自己回帰で予想する。
+        batch_size 個の時系列データ毎に１回の session.run(...) で予想ステップ数分を処理する。
+
+        [Input]
+            X_series : numpy.ndarry ( shape = [n_series, n_in_sequence, dim] )
+                各時系列データの予想の起点となる入力ウィンドウ
+            n_horizon : int
+                予想する未来のステップ数
+            batch_size : int
+                １回の session.run(...) でまとめて処理する時系列データの数
+
+        [Output]
+            forecasts : numpy.ndarry ( shape = [n_series, n_horizon] )
+                各時系列データの予想値
+                出力層が複数ノードの場合は shape = [n_series, n_horizon, n_outputLayer]
+                n_horizon が 0 以下の場合は、予想値なし（shape = [n_series, 0]）
+        """
+        # 出力を次の時刻の入力とするので、入力層と出力層の次元が一致している必要がある
+        if ( self._forecast_op is None ):
+            raise ValueError( "forecasting requires n_inputLayer == n_outputLayer" )
+
+        # 予想ステップ数が 0 以下の場合は、predict_forecast(...) と同じく予想値なし
+        n_horizon = max( n_horizon, 0 )
+
+        X_series = X_series.reshape( -1, self._n_in_sequence, self._n_inputLayer )
+        n_series = len( X_series )
+
+        forecasts = numpy.empty( ( n_series, n_horizon, self._n_outputLayer ), dtype = numpy.float32 )
+
+        if ( n_horizon > 0 ):
+            for i in range( 0, n_series, batch_size ):
+                X_batch = X_series[ i : i + batch_size ]
+
+                forecasts[ i : i + len(X_batch) ] = self._session.run(
+                                                        self._forecast_op,
+                                                        feed_dict = {
+                                                            self._X_holder: X_batch,
+                                                            self._batch_size_holder: len( X_batch ),
+                                                            self._n_horizon_holder: n_horizon
+                                                        }
+                                                    )
+
+        if ( self._n_outputLayer == 1 ):
+            forecasts = forecasts[:, :, 0]
+
+        return forecasts
+
+
     def predict_proba( self, X_test ):
         """
         fitting 処理したモデルで、推定を行い、クラスの所属確率の予想値を返す。
@@ -4,6 +4,8 @@
 """
     更新情報
     [17/12/01] : 新規作成
+    [26/10/19] : 自己回帰での予想処理 model_forecast(...) の呼び出しを追加
+               : LSTM の cell を NNCell.LSTMCellFactory で生成し、融合されたブロック LSTM を選択できるように変更
     [xx/xx/xx] : 
 
 """
@@ -42,6 +44,8 @@ from NNOptimizer import Adagrad
 from NNOptimizer import Adadelta
 from NNOptimizer import Adam
 
+from NNCell import LSTMCellFactory                  # LSTM の cell を生成するクラス
+
 
 class RecurrentNNLSTM( RecurrentNN ):
     """
@@ -58,6 +62,9 @@ class RecurrentNNLSTM( RecurrentNN ):
             これを次の時間の隠れ層に順々に渡していくことで、時間軸の逆伝搬を実現する。
         _rnn_states : list<Tensor>
             cell の状態
+        _b_fused_cell : bool
+            LSTMCell の代わりに、融合されたブロック LSTM（LSTMBlockCell）を使用するか否か
+            Variable の名前と shape は LSTMCell と同じなので、チェックポイントは相互に読み込み可能
 
     [protedted] protedted な使用法を想定 
 
@@ -73,7 +80,8 @@ class RecurrentNNLSTM( RecurrentNN ):
             n_in_sequence = 25,
             epochs = 1000,
             batch_size = 10,
-            eval_step = 1
+            eval_step = 1,
+            b_fused_cell = False
         ):
         """
         コンストラクタ（厳密にはイニシャライザ）
@@ -81,6 +89,8 @@ class RecurrentNNLSTM( RecurrentNN ):
         # 親クラスである ReccurentRNN クラスのコンストラクタ呼び出し
         super().__init__( session, n_inputLayer, n_hiddenLayer, n_outputLayer, n_in_sequence, epochs, batch_size, eval_step )
 
+        self._b_fused_cell = b_fused_cell
+
         return
 
 
@@ -99,10 +109,10 @@ class RecurrentNNLSTM( RecurrentNN ):
         # tf.contrib.rnn.LSTMCell(...) : 時系列に沿った RNN 構造を提供するクラス `LSTMCell` のオブジェクト cell を返す。
         # この cell は、内部（プロパティ）で state（隠れ層の状態）を保持しており、
         # これを次の時間の隠れ層に順々に渡していくことで、時間軸の逆伝搬を実現する。
-        cell = tf.contrib.rnn.LSTMCell( 
+        # _b_fused_cell = True の場合は、融合されたブロック LSTM（LSTMBlockCell）を使用
+        cell = LSTMCellFactory( cell_type = "lstm", b_fused = self._b_fused_cell ).create( 
                    num_units = self._n_hiddenLayer,     # int, The number of units in the RNN cell.
                    forget_bias = 1.0                    # 忘却ゲートのバイアス項 / Default : 1.0  in order to reduce the scale of forgetting at the beginning of the training.
-                   #activation = "tanh"                  # Nonlinearity to use. Default: tanh
                )
         #print( "cell :", cell )
 
@@ -149,4 +159,9 @@ class RecurrentNNLSTM( RecurrentNN ):
         # 線形活性
         self._y_out_op = y_in_op
 
+        #--------------------------------------------------------------
+        # 自己回帰での予想処理
+        #--------------------------------------------------------------
+        self.model_forecast( cell, 'RNN-LSTM' )
+
         return self._y_out_op
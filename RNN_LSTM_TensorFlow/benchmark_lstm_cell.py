@@ -0,0 +1,123 @@
+# -*- coding:utf-8 -*-
+# Anaconda 5.0.1 環境 (TensorFlow インストール済み)
+
+"""
+    更新情報
+    [26/10/19] : 新規作成
+    [xx/xx/xx] :
+               :
+"""
+
+import time
+
+import numpy as np
+
+# TensorFlow ライブラリ
+import tensorflow as tf
+from tensorflow.python.framework import ops
+
+# 自作クラス
+from NNLoss import SigmoidCrossEntropy
+from NNOptimizer import Adam
+
+from Many2OneMultiRNNLSTM import Many2OneMultiRNNLSTM
+
+
+def benchmark( b_fused_cell, X_train, y_train, n_vocab, n_warmup = 5, n_iters = 50 ):
+    """
+    Many2OneMultiRNNLSTM の１ミニバッチ分のトレーニング処理の平均処理時間を計測する。
+    cell の種類毎に別の計算グラフ、Session で構築する。
+
+    [Input]
+        b_fused_cell : bool
+            融合されたブロック LSTM（LSTMBlockCell）を使用するか否か
+        X_train : ndarray
+            １ミニバッチ分の入力データ [ batch_size, sequence_length ]
+        y_train : ndarray
+            １ミニバッチ分の教師データ [ batch_size ]
+        n_vocab : int
+            単語数（埋め込み行列の行数）
+        n_warmup : int
+            計測前に捨てるトレーニング処理の回数
+        n_iters : int
+            計測するトレーニング処理の回数
+
+    [Output]
+        elapsed : float
+            １ミニバッチ分のトレーニング処理の平均処理時間 [s]
+        var_shapes : list <tuple>
+            学習可能な Variable の名前と shape のリスト（チェックポイントの互換性の確認用）
+    """
+    graph = tf.Graph()
+    with graph.as_default():
+        rnn = Many2OneMultiRNNLSTM(
+                  session = tf.Session( graph = graph ),
+                  n_hiddenLayer = 128,
+                  n_MultiRNN = 1,
+                  n_in_sequence_encoder = X_train.shape[1],
+                  n_vocab = n_vocab,
+                  batch_size = X_train.shape[0],
+                  b_fused_cell = b_fused_cell
+              )
+
+        rnn.model()
+        rnn.loss( SigmoidCrossEntropy() )
+        rnn.optimizer( Adam( learning_rate = 0.001, beta1 = 0.9, beta2 = 0.999 ) )
+
+        var_shapes = [ ( var.name, tuple( var.shape.as_list() ) ) for var in tf.trainable_variables() ]
+
+        rnn._session.run( tf.global_variables_initializer() )
+
+        feed_dict = {
+            rnn._encoder_input_holder: X_train,
+            rnn._t_holder: y_train,
+            rnn._dropout_holder: 0.5
+        }
+
+        for i in range( n_warmup ):
+            rnn._session.run( rnn._train_step, feed_dict = feed_dict )
+
+        start_time = time.time()
+        for i in range( n_iters ):
+            rnn._session.run( rnn._train_step, feed_dict = feed_dict )
+
+        elapsed = ( time.time() - start_time ) / n_iters
+
+        rnn._session.close()
+
+    return ( elapsed, var_shapes )
+
+
+def main():
+    """
+    映画レビューの評判分析（main3.py）と同じ規模の Many-to-one な RNN で、
+    BasicLSTMCell と融合されたブロック LSTM（LSTMBlockCell）のトレーニング処理時間を比較する。
+    データセットのダウンロードを不要とするため、同じ shape のランダムな数値インデックスのデータを使用する。
+    """
+    print("Enter main()")
+
+    np.random.seed( 12 )
+
+    n_vocab = 20000
+    sequence_length = 200
+    batch_size = 100
+
+    X_train = np.random.randint( 1, n_vocab, size = ( batch_size, sequence_length ) )
+    y_train = np.random.randint( 0, 2, size = batch_size ).astype( np.float32 )
+
+    elapsed_basic, var_shapes_basic = benchmark( False, X_train, y_train, n_vocab )
+    elapsed_fused, var_shapes_fused = benchmark( True, X_train, y_train, n_vocab )
+
+    print( "BasicLSTMCell : %.4f [s / minibatch]" % elapsed_basic )
+    print( "LSTMBlockCell : %.4f [s / minibatch]" % elapsed_fused )
+    print( "speed up : x%.2f" % ( elapsed_basic / elapsed_fused ) )
+
+    # Variable の名前と shape が一致していれば、チェックポイントを相互に読み込み可能
+    print( "checkpoint compatible :", var_shapes_basic == var_shapes_fused )
+
+    print("Finish main()")
+    return
+
+
+if __name__ == '__main__':
+     main()
@@ -19,6 +19,7 @@ from tensorflow.python.framework import ops
 
 # 自作クラス
 from MLPreProcess import MLPreProcess
+from MLTextPreProcess import MLTextPreProcess
 from MLPlot import MLPlot
 
 import NNActivation                                     # ニューラルネットワークの活性化関数を表すクラス
@@ -54,29 +55,15 @@ from Many2OneMultiRNNLSTM import Many2OneMultiRNNLSTM
 def SaveCsvFileFromIMDbDataset( basepath ):
     #import pypind
     import pandas as pd
-    import os
 
-    labels = { "pos":1, "neg":0 }   # 肯定的、否定的の評価ラベル
-    
     #---------------------------------------------
-    # ファイルを読み込み pandas DataFrame に格納
+    # ファイルを並列に読み込み pandas DataFrame に格納
     #---------------------------------------------
-    df = pd.DataFrame()
-
-    for str1 in ( "test", "train" ):
-        for str2 in ( "pos", "neg" ):
-            path = os.path.join( basepath, str1, str2 )
-            
-            # listdir関数でディレクトリとファイルの一覧を取得する
-            files = os.listdir( path )
-
-            for file in files:
-                with open( os.path.join(path,file), "r", encoding = "utf-8" ) as infile:
-                    txt = infile.read()
-                
-                df = df.append( [ [txt,labels[str2]] ], ignore_index=True )
+    paths, sentiments = MLTextPreProcess.list_imdb_files( basepath )
+    reviews = MLTextPreProcess.read_text_files( paths )
 
-    df.columns = [ "review", "sentiment" ]
+    # DataFrame は全データを読み込んだ後に一度だけ作成する
+    df = pd.DataFrame( { "review" : reviews, "sentiment" : sentiments }, columns = [ "review", "sentiment" ] )
 
     #---------------------------------------------
     # csv ファイルに書き込み
@@ -105,36 +92,6 @@ def main():
     # Import or generate data.
     #======================================================================
     #SaveCsvFileFromIMDbDataset( "C:\Data\MachineLearning_DataSet\\aclImdb" )
-    dfIMb = pd.read_csv( "movie_data.csv", encoding="utf-8" )
-    
-    counts = Counter()
-
-    #-------------------------------------------------
-    # クリーニング & 出現単語カウント処理
-    #-------------------------------------------------
-    for (i,review) in enumerate( dfIMb["review"] ):
-        # string.punctuation : 文字と文字の間の句読点、括弧などをまとめたもの
-        # 置換表現で「!"#$%&'()*+,-./:;<=>?@[\]^_`{|}~」等
-        punctuation = string.punctuation
-
-        # sep.join(seq) : sepを区切り文字として、seqを連結してひとつの文字列にする。
-        # "".join(...) : list<str> → １つの str に変換
-        # " " + str + " " : 空白スペースで分割
-        text = "".join( [str if str not in punctuation else " "+str+" " for str in review ] )
-
-        # リスト中の大文字→小文字に変換
-        text = text.lower()
-
-        # loc() : 行ラベル、 列ラベルで pandas DataFrame のデータを参照
-        dfIMb.loc[i, "review"] = text
-
-        # Counter.update() : 辞書オブジェクトに辞書オブジェクトを後ろから連結。
-        # string.split(“ 区切り文字 ”) : 区切り文字で区切られたリストを得る
-        counts.update( text.split() )
-
-    # counts Counter({'the': 667950, '.': 650520, ',': 544818, 'and': 324383, 'a': 322941, 'of': 289412, ...
-    # 'japanes': 1, 'germinates': 1, 'aspidistra': 1, 'bonhomie': 1, 'horlicks': 1})
-    #print( "counts", counts)
 
     #======================================================================
     # データを変換、正規化
@@ -142,42 +99,31 @@ def main():
     # ex) data = tf.nn.batch_norm_with_global_normalization(...)
     #======================================================================
     #-------------------------------------------------
+    # クリーニング & 出現単語カウント処理
     # 読み込みデータの単語 → 整数型へのマッピング処理
-    #-------------------------------------------------
-    # key = counts.get（単語の出現回数）に従ってソート
-    word_counts = sorted( counts, key=counts.get, reverse=True)
-    print( "word_counts", word_counts[:5] )         # ['the', '.', ',', 'and', 'a']
-
-    dict_word2int = { word: ii for (ii,word) in enumerate(word_counts,1) }
-
-    mapped_reviews =[]  # レビュー文を（出現単語回数の）数値インデックス情報に変換したデータ
-    for review in dfIMb["review"]:
-        mapped_reviews.append( [ dict_word2int[word] for word in review.split() ] )
-
-    print( "mapped_review", mapped_reviews[:10] )   # mapped_review [[15, 5646, 3, 1, 2160, 3977, 26959 ...
-    
-    #-------------------------------------------------
     # Zero padding
     #-------------------------------------------------
+    # 前処理済みのデータは imdb_cache ディレクトリにキャッシュされ、２回目以降は前処理を省略する
     sequence_length = 200   # シーケンス長（RNN の T に対応）
-    sequences = np.zeros( 
-                    shape=( len(mapped_reviews), sequence_length ), 
-                    dtype=int 
-                )
-    
-    for (i,row) in enumerate( mapped_reviews ):
-        review_arr = np.array( row )
-        sequences[i, -len(row):] = review_arr[-sequence_length:]     # 配列の右側から詰めていく
+    sequences, sequences_len, sentiments, dict_word2int = MLTextPreProcess.load_imdb_dataset(
+                                                              "movie_data.csv",
+                                                              sequence_length = sequence_length,
+                                                              cache_dir = "imdb_cache"
+                                                          )
+
+    print( "sequences", sequences[:10] )   # [[15, 5646, 3, 1, 2160, 3977, 26959 ...
     
 
     #======================================================================
     # データセットをトレーニングデータ、テストデータ、検証データセットに分割
     #======================================================================
     X_train = sequences[:25000, :]
-    y_train = dfIMb.loc[:25000, "sentiment"].values
+    y_train = sentiments[:25000]
+    X_train_len = sequences_len[:25000]
 
     X_test = sequences[25000:, :]
-    y_test = dfIMb.loc[25000:, "sentiment"].values
+    y_test = sentiments[25000:]
+    X_test_len = sequences_len[25000:]
 
     #print( "n_samples [total] :", sequences.shape[0] )
     print( "n_samples [train] :", X_train.shape[0] )
@@ -258,7 +204,7 @@ def main():
     #rnn.write_tensorboard_graph()
 
     rnn.print( "before fitting" )
-    rnn.fit( X_train, y_train )
+    rnn.fit( X_train, y_train, X_train_len )
 
     #======================================================================
     # モデルの評価
@@ -291,8 +237,8 @@ def main():
     #pred = rnn.predict( X_test )
     #print( "pred :", pred )
 
-    accuracy_train = rnn.accuracy( X_train, y_train )
-    accuracy_test = rnn.accuracy( X_test, y_test )
+    accuracy_train = rnn.accuracy( X_train, y_train, X_train_len )
+    accuracy_test = rnn.accuracy( X_test, y_test, X_test_len )
 
     print( "accuracy [train] :", accuracy_train )
     print( "accuracy [test] :", accuracy_test )
@@ -4,6 +4,7 @@
 """
     更新情報
     [17/12/02] : 新規作成
+    [26/10/19] : 連続したテキストを各バッチレーンに分割し、RNN の状態を引き継いで全時刻の損失で学習する stateful モード（Truncated BPTT）を追加
     [xx/xx/xx] : 
 
 """
@@ -75,6 +76,15 @@ class RecurrectNNLanguageModel( NeuralNetworkBase ):
             これを次の時間の隠れ層に順々に渡していくことで、時間軸の逆伝搬を実現する。
         _rnn_states : list<Tensor>
             cell の状態
+            _rnn_states[0] は初期状態の placeholder（供給しない場合はゼロの状態）、_rnn_states[-1] は最終状態
+
+        _b_stateful : bool
+            stateful な言語モデルの学習を行うか否か（Truncated BPTT）
+            True の場合、連続したテキストを _batch_size 個のレーンに分割し、_n_in_sequence 個の単語毎の窓で、
+            直前の窓の RNN の最終状態を次の窓の初期状態として引き継ぎ、全ての時刻で次の単語を予想する損失で学習する。
+        _y_in_op : Operator
+            出力層への入力（logits）のオペレーター
+            stateful モードの場合は、全時刻の logits [ batch_size, n_in_sequence, n_outputLayer ]
             
         _weights : list <Variable>
             モデルの各層の重みの Variable からなる list
@@ -95,6 +105,7 @@ class RecurrectNNLanguageModel( NeuralNetworkBase ):
             入力層にデータを供給するための placeholder
         _t_holder : placeholder
             出力層に教師データを供給するための placeholder
+            stateful モードの場合は、各時刻の次の単語 [ batch_size, n_in_sequence ]
         _keep_prob_holder : placeholder
             ドロップアウトしない確率 (1-p) にデータを供給するための placeholder
         
@@ -115,7 +126,8 @@ class RecurrectNNLanguageModel( NeuralNetworkBase ):
             n_in_embedding_vec = 50,
             epochs = 1000,
             batch_size = 10,
-            eval_step = 1
+            eval_step = 1,
+            b_stateful = False
         ):
         """
         コンストラクタ（厳密にはイニシャライザ）
@@ -145,6 +157,9 @@ class RecurrectNNLanguageModel( NeuralNetworkBase ):
         self._batch_size = batch_size
         self._eval_step = eval_step        
 
+        self._b_stateful = b_stateful
+        self._y_in_op = None
+
         # evaluate 関連の初期化
         self._losses_train = []
 
@@ -157,9 +172,15 @@ class RecurrectNNLanguageModel( NeuralNetworkBase ):
                              name = "X_holder"
                          )
 
+        # stateful モードの場合は、各時刻の次の単語を教師データとする
+        if ( self._b_stateful == True ):
+            t_shape = [ None, self._n_in_sequence ]
+        else:
+            t_shape = [ None ]
+
         self._t_holder = tf.placeholder( 
                              tf.int32, 
-                             shape = [ None ],
+                             shape = t_shape,
                              name = "t_holder"
                          )
 
@@ -192,6 +213,7 @@ class RecurrectNNLanguageModel( NeuralNetworkBase ):
         print( "_epoches : ", self._epochs )
         print( "_batch_size : ", self._batch_size )
         print( "_eval_step : ", self._eval_step )
+        print( "_b_stateful : ", self._b_stateful )
 
         print( "_X_holder : ", self._X_holder )
         print( "_t_holder : ", self._t_holder )
@@ -308,8 +330,13 @@ class RecurrectNNLanguageModel( NeuralNetworkBase ):
         with tf.variable_scope('RNNLM'):
             # 最初の時間 t0 では、過去の隠れ層がないので、
             # cell.zero_state(...) でゼロの状態を初期設定する。
-            #initial_state_tsr = cell.zero_state( self._batch_size_holder, tf.float32 )
-            #self._rnn_states.append( initial_state_tsr )
+            # stateful モードでは、直前の窓の最終状態をこの placeholder に供給して引き継ぐ
+            initial_state_tsr = tf.placeholder_with_default(
+                                    cell.zero_state( tf.shape( self._X_holder )[0], tf.float32 ),
+                                    shape = [ None, self._n_hiddenLayer ],
+                                    name = "initial_state_holder"
+                                )
+            self._rnn_states.append( initial_state_tsr )
 
             # 動的に動作する RNN シーケンス を作成
             # outputs_tsr: The RNN output Tensor
@@ -317,7 +344,7 @@ class RecurrectNNLanguageModel( NeuralNetworkBase ):
             outputs_tsr, state_tsr = tf.nn.dynamic_rnn(  
                                     cell, 
                                     self._embedding_lookup_op, 
-                                    dtype=tf.float32 
+                                    initial_state = initial_state_tsr
                                 )
         
             self._rnn_states.append( state_tsr )
@@ -328,14 +355,20 @@ class RecurrectNNLanguageModel( NeuralNetworkBase ):
             output = tf.nn.dropout( outputs_tsr, self._keep_prob_holder )
             print( "output :", output )             # output : Tensor("dropout/mul:0", shape=(?, 25, 10), dtype=float32)
 
-            # 予想値を取得するため、RNN を並び替えて、最後の出力を取り出す
-            output = tf.transpose( output, [1, 0, 2] )
-            print( "output :", output )             # output : Tensor("transpose_1:0", shape=(25, ?, 10), dtype=float32)
-
-            # 最終的な隠れ層の出力
-            # tf.gather(...) : axis で指定した階でスライスして，indeices で指定したインデックスのテンソルだけ取り出す。
-            h_out_op = tf.gather( output, int(output.get_shape()[0]) - 1 )
-            print( "h_out_op :", h_out_op )         # h_out_op : Tensor("Gather:0", shape=(?, 10), dtype=float32)
+            if ( self._b_stateful == True ):
+                # stateful モードでは、全ての時刻の隠れ層の出力から次の単語を予想する
+                # [ batch_size, n_in_sequence, n_hiddenLayer ] → [ batch_size * n_in_sequence, n_hiddenLayer ]
+                h_out_op = tf.reshape( output, [ -1, self._n_hiddenLayer ] )
+                print( "h_out_op :", h_out_op )     # h_out_op : Tensor("Reshape:0", shape=(?, 10), dtype=float32)
+            else:
+                # 予想値を取得するため、RNN を並び替えて、最後の出力を取り出す
+                output = tf.transpose( output, [1, 0, 2] )
+                print( "output :", output )             # output : Tensor("transpose_1:0", shape=(25, ?, 10), dtype=float32)
+
+                # 最終的な隠れ層の出力
+                # tf.gather(...) : axis で指定した階でスライスして，indeices で指定したインデックスのテンソルだけ取り出す。
+                h_out_op = tf.gather( output, int(output.get_shape()[0]) - 1 )
+                print( "h_out_op :", h_out_op )         # h_out_op : Tensor("Gather:0", shape=(?, 10), dtype=float32)
 
         # 隠れ層 ~ 出力層
         self._weights.append( self.init_weight_variable( input_shape = [self._n_hiddenLayer, self._n_outputLayer] ) )
@@ -346,6 +379,12 @@ class RecurrectNNLanguageModel( NeuralNetworkBase ):
         #--------------------------------------------------------------
         y_in_op = tf.matmul( h_out_op, self._weights[-1] ) + self._biases[-1]
 
+        if ( self._b_stateful == True ):
+            # [ batch_size * n_in_sequence, n_outputLayer ] → [ batch_size, n_in_sequence, n_outputLayer ]
+            y_in_op = tf.reshape( y_in_op, [ -1, self._n_in_sequence, self._n_outputLayer ] )
+
+        self._y_in_op = y_in_op
+
         #--------------------------------------------------------------
         # モデルの出力
         #--------------------------------------------------------------
@@ -365,8 +404,12 @@ class RecurrectNNLanguageModel( NeuralNetworkBase ):
         [Output]
             self._loss_op : Operator
                 損失関数を表すオペレーター
+                stateful モードの場合は、全時刻の logits と次の単語から算出する（SparseSoftmaxCrossEntropy を想定）
         """
-        self._loss_op = nnLoss.loss( t_holder = self._t_holder, y_out_op = self._y_out_op )
+        if ( self._b_stateful == True ):
+            self._loss_op = nnLoss.loss( t_holder = self._t_holder, y_out_op = self._y_in_op )
+        else:
+            self._loss_op = nnLoss.loss( t_holder = self._t_holder, y_out_op = self._y_out_op )
         
         return self._loss_op
 
@@ -387,20 +430,25 @@ class RecurrectNNLanguageModel( NeuralNetworkBase ):
         return self._train_step
 
 
-    def fit( self, X_train, y_train ):
+    def fit( self, X_train, y_train = None ):
         """
         指定されたトレーニングデータで、モデルの fitting 処理を行う。
 
         [Input]
             X_train : numpy.ndarray ( shape = [n_samples, n_features] )
                 トレーニングデータ（特徴行列）
+                stateful モードの場合は、連続したテキストの数値インデックスの配列 ( shape = [n_words] )
             
             y_train : numpy.ndarray ( shape = [n_samples] )
                 トレーニングデータ用のクラスラベル（教師データ）のリスト
+                stateful モードの場合は使用しない（X_train を１単語ずらしたものを教師データとする）
 
         [Output]
             self : 自身のオブジェクト
         """
+        if ( self._b_stateful == True ):
+            return self.fit_stateful( X_train )
+
         #----------------------------
         # 学習開始処理
         #----------------------------
@@ -453,6 +501,98 @@ class RecurrectNNLanguageModel( NeuralNetworkBase ):
         return self._y_out_op
 
 
+    def generate_stateful_minibatch( self, text_data_idx ):
+        """
+        連続したテキストを _batch_size 個のレーンに分割し、各レーンの先頭から順に _n_in_sequence 個の単語毎の窓を返すジェネレータ
+        各レーンの i 番目の窓は、i-1 番目の窓の直後に続くので、RNN の最終状態を次の窓の初期状態として引き継ぐことが出来る。
+
+        [Input]
+            text_data_idx : numpy.ndarray ( shape = [n_words] )
+                連続したテキストの数値インデックスの配列
+
+        [Output]
+            batch_x : numpy.ndarray ( shape = [batch_size, n_in_sequence] )
+                各レーンの窓
+            batch_t : numpy.ndarray ( shape = [batch_size, n_in_sequence] )
+                batch_x を１単語ずらした次の単語（教師データ）
+        """
+        n_steps = self._n_in_sequence
+
+        # 各レーンの単語数（教師データの分、１単語少なくする）
+        n_lane = ( len( text_data_idx ) - 1 ) // self._batch_size
+        n_windows = n_lane // n_steps
+
+        # [ n_words ] → [ batch_size, n_lane ]
+        x_lanes = text_data_idx[ 0 : self._batch_size * n_lane ].reshape( self._batch_size, n_lane )
+        t_lanes = text_data_idx[ 1 : self._batch_size * n_lane + 1 ].reshape( self._batch_size, n_lane )
+
+        for i in range( n_windows ):
+            yield x_lanes[ :, i*n_steps : (i+1)*n_steps ], t_lanes[ :, i*n_steps : (i+1)*n_steps ]
+
+
+    def fit_stateful( self, text_data_idx ):
+        """
+        連続したテキストで、stateful な言語モデルの fitting 処理（Truncated BPTT）を行う。
+        各エポックでテキスト全体を１回走査し、窓の間で RNN の状態を引き継ぐ。
+        損失関数の値は、各エポックでの全ての窓の学習時の損失の平均値とする。
+
+        [Input]
+            text_data_idx : numpy.ndarray ( shape = [n_words] )
+                連続したテキストの数値インデックスの配列
+                少なくとも１つの窓を構成できる batch_size * n_in_sequence + 1 単語以上が必要
+
+        [Output]
+            self._y_out_op : Operator
+        """
+        # 窓を１つも構成できない場合は、学習処理が行われずに損失関数の値が nan となるのでエラーとする
+        n_min_words = self._batch_size * self._n_in_sequence + 1
+        if ( len( text_data_idx ) < n_min_words ):
+            raise ValueError( 
+                "text_data_idx is too short for stateful training : %d words < batch_size * n_in_sequence + 1 = %d words" 
+                % ( len( text_data_idx ), n_min_words ) 
+            )
+
+        #----------------------------
+        # 学習開始処理
+        #----------------------------
+        # Variable の初期化オペレーター
+        self._init_var_op = tf.global_variables_initializer()
+
+        # Session の run（初期化オペレーター）
+        self._session.run( self._init_var_op )
+
+        #-------------------
+        # 学習処理
+        #-------------------
+        for epoch in range( self._epochs ):
+            # 各エポックの最初に、RNN Cell の状態をゼロの初期状態にリセット
+            rnn_state = numpy.zeros( ( self._batch_size, self._n_hiddenLayer ), dtype = numpy.float32 )
+            losses = []
+
+            for batch_x, batch_t in self.generate_stateful_minibatch( text_data_idx ):
+                # 直前の窓の最終状態を初期状態として供給し、この窓の最終状態を取得する
+                # 勾配は窓の内部でのみ伝搬する（Truncated BPTT）
+                _, loss, rnn_state = self._session.run(
+                                         [ self._train_step, self._loss_op, self._rnn_states[-1] ],
+                                         feed_dict = {
+                                             self._X_holder: batch_x,
+                                             self._t_holder: batch_t,
+                                             self._rnn_states[0]: rnn_state,
+                                             self._keep_prob_holder: 0.5
+                                         }
+                                     )
+                losses.append( loss )
+
+            # 評価処理を行う loop か否か
+            # % : 割り算の余りが 0 で判断
+            if ( ( (epoch+1) % self._eval_step ) == 0 ):
+                loss = numpy.mean( losses )
+                self._losses_train.append( loss )
+                print( "epoch %d / loss = %f" % ( epoch, loss ) )
+
+        return self._y_out_op
+
+
     def predict( self, X_test ):
         """
         fitting 処理したモデルで、推定を行い、時系列データの予想値を返す。
@@ -467,6 +607,7 @@ class RecurrectNNLanguageModel( NeuralNetworkBase ):
         [Output]
             predicts : numpy.ndarry ( shape = [n_samples] )
                 予想結果（分類モデルの場合は、クラスラベル）
+                stateful モードの場合は、各時刻の次の単語の予想 ( shape = [n_samples, n_in_sequence] )
         """
         prob = self._session.run(
                    self._y_out_op,
@@ -477,8 +618,8 @@ class RecurrectNNLanguageModel( NeuralNetworkBase ):
                )
         
         # numpy.argmax(...) : 多次元配列の中の最大値の要素を持つインデックスを返す
-        # axis : 最大値を読み取る軸の方向 (1 : 行方向)
-        predicts = numpy.argmax( prob, axis = 1 )
+        # axis : 最大値を読み取る軸の方向 (-1 : 出力層のノードの方向)
+        predicts = numpy.argmax( prob, axis = -1 )
 
         return predicts
 
@@ -515,8 +656,8 @@ class RecurrectNNLanguageModel( NeuralNetworkBase ):
         #print( "numpy.equal( predict, y_test ) :", numpy.equal( predict, y_test ) )
         #print( "n_correct :", n_correct )
 
-        # 正解率 = 正解数 / データ数
-        accuracy = n_correct / X_test.shape[0]
+        # 正解率 = 正解数 / データ数（stateful モードの場合は単語数）
+        accuracy = n_correct / predicts.size
 
         return accuracy
 
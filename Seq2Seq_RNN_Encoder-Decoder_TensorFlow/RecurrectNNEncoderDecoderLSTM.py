@@ -4,6 +4,12 @@
 """
     更新情報
     [17/12/12] : 新規作成
+    [26/10/19] : tf.nn.dynamic_rnn(...), tf.nn.raw_rnn(...) で Encoder, Decoder を処理する動的な RNN のモード b_dynamic_rnn を追加
+               : placeholder _bTraining_holder と Python の比較によるルート分岐（常に推論用のルートとなる）を廃止し、
+                 教師強制によるトレーニング用の計算グラフと、greedy な推論用の計算グラフを、Variable を共有して別々に構築するように変更
+               : バッチ処理でのビームサーチによる推論用の計算グラフ model_beam_search(...) を追加
+               : one-hot encoding せずに数値インデックスのシーケンスデータを入力するモード b_index_input を追加
+               : LSTM の cell を NNCell.LSTMCellFactory で生成し、融合されたブロック LSTM を選択できるように変更
     [xx/xx/xx] : 
 
 """
@@ -30,6 +36,10 @@ import NNLoss                                       # ニューラルネット
 
 import NNOptimizer                                  # ニューラルネットワークの最適化アルゴリズム Optimizer を表すクラス
 
+from NNBeamSearch import BeamSearchDecoder          # ビームサーチによる Decoder の復号化を表すクラス
+
+from NNCell import LSTMCellFactory                  # LSTM の cell を生成するクラス
+
 
 class RecurrectNNEncoderDecoderLSTM( NeuralNetworkBase ):
     """
@@ -86,8 +96,37 @@ class RecurrectNNEncoderDecoderLSTM( NeuralNetworkBase ):
         _batch_size_holder : placeholder
             バッチサイズ _batch_size にデータを供給するための placeholder
             cell.zero_state(...) でバッチサイズを指定する必要があり、可変長に対応するために必要
-        _bTraining_holder : placeholder
-            トレーニング処理中か否かを表す placeholder
+        _y_out_train_op : Operator
+            トレーニング用の計算グラフ（教師強制）でのモデルの出力のオペレーター
+            損失関数はこの出力で定義する。
+            self._y_out_op は推論用の計算グラフ（greedy）でのモデルの出力
+        _cell_decoder : LSTMCell
+            Decoder の cell（推論用の計算グラフで Variable を共有するために保持）
+        _beam_search : BeamSearchDecoder
+            ビームサーチによる推論用の計算グラフ（model_beam_search(...) で構築）
+
+        _b_index_input : bool
+            入力データ、教師データを one-hot encoding せずに、数値インデックスで供給するか否か
+            True の場合、_X_holder, _t_holder は shape = [ None, シーケンス長 ] の int32 となり、
+            計算グラフ内で tf.one_hot(...) する。損失関数には出力層への入力 _y_in_train_op（logits）と
+            数値インデックスの教師データを与えるので、SparseSoftmaxCrossEntropy を使用する。
+        _y_in_train_op : Operator
+            トレーニング用の計算グラフでの出力層への入力（logits）のオペレーター
+
+        _b_fused_cell : bool
+            Encoder, Decoder の LSTMCell の代わりに、融合されたブロック LSTM（LSTMBlockCell）を使用するか否か
+            Variable の名前と shape は LSTMCell と同じなので、チェックポイントは相互に読み込み可能
+
+        _b_dynamic_rnn : bool
+            Encoder, Decoder を Python の for ループで展開せずに、
+            tf.nn.dynamic_rnn(...), tf.nn.raw_rnn(...) の計算グラフ内のループで処理するか否か
+            True の場合、シーケンス長は構築時に固定されず、データ毎に可変長となる
+        _X_seq_len_holder : placeholder
+            Encoder に入力する各データのシーケンス長にデータを供給するための placeholder（b_dynamic_rnn = True の場合のみ）
+            供給しない場合は、入力データのシーケンス長
+        _n_decoder_len_holder : placeholder
+            Decoder の出力のシーケンス長にデータを供給するための placeholder（b_dynamic_rnn = True の場合のみ）
+            供給しない場合は、n_in_sequence_decoder
 
     [protedted] protedted な使用法を想定 
 
@@ -102,7 +141,10 @@ class RecurrectNNEncoderDecoderLSTM( NeuralNetworkBase ):
             n_in_sequence_decoder = 25,
             epochs = 1000,
             batch_size = 10,
-            eval_step = 1
+            eval_step = 1,
+            b_dynamic_rnn = False,
+            b_index_input = False,
+            b_fused_cell = False
         ):
         """
         コンストラクタ（厳密にはイニシャライザ）
@@ -131,27 +173,63 @@ class RecurrectNNEncoderDecoderLSTM( NeuralNetworkBase ):
         self._batch_size = batch_size
         self._eval_step = eval_step        
 
+        self._b_dynamic_rnn = b_dynamic_rnn
+        self._b_index_input = b_index_input
+        self._b_fused_cell = b_fused_cell
+
         # evaluate 関連の初期化
         self._losses_train = []
 
         # placeholder の初期化
         # shape の列（横方向）は、各層の次元（ユニット数）に対応させる。
         # shape の行は、None にして汎用性を確保
-        self._X_holder = tf.placeholder( 
-                             tf.float32, 
-                             shape = [ None, self._n_in_sequence_encoder, self._n_inputLayer ],
-                             name = "X_holder"
-                         )
-
-        self._t_holder = tf.placeholder( 
-                             tf.float32, 
-                             shape = [ None, self._n_in_sequence_decoder, self._n_outputLayer ],
-                             name = "t_holder"
-                         )
+        # 動的な RNN のモードでは、シーケンス長の次元も None にして可変長とする
+        if ( self._b_dynamic_rnn == True ):
+            n_in_sequence_encoder = None
+            n_in_sequence_decoder = None
+        else:
+            n_in_sequence_encoder = self._n_in_sequence_encoder
+            n_in_sequence_decoder = self._n_in_sequence_decoder
+
+        # 数値インデックスで供給するモードでは、one-hot encoding の次元を持たない
+        if ( self._b_index_input == True ):
+            self._X_holder = tf.placeholder( tf.int32, shape = [ None, n_in_sequence_encoder ], name = "X_holder" )
+            self._t_holder = tf.placeholder( tf.int32, shape = [ None, n_in_sequence_decoder ], name = "t_holder" )
+        else:
+            self._X_holder = tf.placeholder( 
+                                 tf.float32, 
+                                 shape = [ None, n_in_sequence_encoder, self._n_inputLayer ],
+                                 name = "X_holder"
+                             )
+
+            self._t_holder = tf.placeholder( 
+                                 tf.float32, 
+                                 shape = [ None, n_in_sequence_decoder, self._n_outputLayer ],
+                                 name = "t_holder"
+                             )
 
         self._dropout_holder = tf.placeholder( tf.float32, name = "dropout_holder" )
         self._batch_size_holder = tf.placeholder( tf.int32, shape=[], name = "batch_size_holder" )
-        self._bTraining_holder = tf.placeholder( tf.bool, name = "bTraining_holder" )
+
+        self._y_out_train_op = None
+        self._y_in_train_op = None
+        self._cell_decoder = None
+        self._beam_search = None
+
+        self._X_seq_len_holder = None
+        self._n_decoder_len_holder = None
+        if ( self._b_dynamic_rnn == True ):
+            # tf.placeholder_with_default(...) : データを供給しない場合は、指定したデフォルト値となる placeholder
+            self._X_seq_len_holder = tf.placeholder_with_default(
+                                         tf.fill( [ tf.shape( self._X_holder )[0] ], tf.shape( self._X_holder )[1] ),
+                                         shape = [ None ],
+                                         name = "X_seq_len_holder"
+                                     )
+            self._n_decoder_len_holder = tf.placeholder_with_default(
+                                             self._n_in_sequence_decoder,
+                                             shape = [],
+                                             name = "n_decoder_len_holder"
+                                         )
 
         return
 
@@ -183,7 +261,16 @@ class RecurrectNNEncoderDecoderLSTM( NeuralNetworkBase ):
         print( "_t_holder :", self._t_holder )
         print( "_dropout_holder :", self._dropout_holder )
         print( "_batch_size_holder :", self._batch_size_holder )
-        print( "_bTraing_holder :", self._bTraining_holder )
+        print( "_y_out_train_op :", self._y_out_train_op )
+        print( "_y_in_train_op :", self._y_in_train_op )
+        print( "_b_index_input :", self._b_index_input )
+        print( "_b_fused_cell :", self._b_fused_cell )
+        print( "_cell_decoder :", self._cell_decoder )
+        print( "_beam_search :", self._beam_search )
+
+        print( "_b_dynamic_rnn :", self._b_dynamic_rnn )
+        print( "_X_seq_len_holder :", self._X_seq_len_holder )
+        print( "_n_decoder_len_holder :", self._n_decoder_len_holder )
 
         print( "_rnn_cells_encoder : \n", self._rnn_cells_encoder )
         print( "_rnn_states_encoder : \n", self._rnn_states_encoder )
@@ -250,6 +337,25 @@ class RecurrectNNEncoderDecoderLSTM( NeuralNetworkBase ):
         return bias_var
 
 
+    def model_inputs( self ):
+        """
+        Encoder, Decoder に入力する one-hot encoding されたシーケンスデータの Tensor を返す。
+        数値インデックスで供給するモードでは、計算グラフ内で tf.one_hot(...) する。
+
+        [Output]
+            X_input_tsr : Tensor ( shape = [ batch_size, シーケンス長, n_inputLayer ] )
+            t_input_tsr : Tensor ( shape = [ batch_size, シーケンス長, n_outputLayer ] )
+        """
+        if ( self._b_index_input == True ):
+            X_input_tsr = tf.one_hot( self._X_holder, depth = self._n_inputLayer )
+            t_input_tsr = tf.one_hot( self._t_holder, depth = self._n_outputLayer )
+        else:
+            X_input_tsr = self._X_holder
+            t_input_tsr = self._t_holder
+
+        return ( X_input_tsr, t_input_tsr )
+
+
     def model( self ):
         """
         モデルの定義（計算グラフの構築）を行い、
@@ -259,6 +365,12 @@ class RecurrectNNEncoderDecoderLSTM( NeuralNetworkBase ):
             self._y_out_op : Operator
                 モデルの出力のオペレーター
         """
+        # 動的な RNN のモード
+        if ( self._b_dynamic_rnn == True ):
+            return self.model_dynamic()
+
+        X_input_tsr, t_input_tsr = self.model_inputs()
+
         #--------------------------------------------------------------
         # 入力層 ~ 隠れ層
         #--------------------------------------------------------------
@@ -268,7 +380,8 @@ class RecurrectNNEncoderDecoderLSTM( NeuralNetworkBase ):
         # tf.contrib.rnn.LSTMCell(...) : 時系列に沿った RNN 構造を提供するクラス `LSTMCell` のオブジェクト cell を返す。
         # この cell は、内部（プロパティ）で state（隠れ層の状態）を保持しており、
         # これを次の時間の隠れ層に順々に渡していくことで、時間軸の逆伝搬を実現する。
-        cell_encoder = tf.contrib.rnn.LSTMCell( 
+        # _b_fused_cell = True の場合は、融合されたブロック LSTM（LSTMBlockCell）を使用
+        cell_encoder = LSTMCellFactory( cell_type = "lstm", b_fused = self._b_fused_cell ).create( 
                            num_units = self._n_hiddenLayer,     # int, The number of units in the RNN cell.
                            forget_bias = 1.0                    # 忘却ゲートのバイアス項 / Default : 1.0  in order to reduce the scale of forgetting at the beginning of the training.
                        )
@@ -289,7 +402,7 @@ class RecurrectNNEncoderDecoderLSTM( NeuralNetworkBase ):
 
                 # LSTMCellクラスの `__call__(...)` を順次呼び出し、
                 # 各時刻 t における出力 cell_output, 及び状態 state を算出
-                cell_encoder_output, state_encoder_tsr = cell_encoder( inputs = self._X_holder[:, t, :], state = self._rnn_states_encoder[-1] )
+                cell_encoder_output, state_encoder_tsr = cell_encoder( inputs = X_input_tsr[:, t, :], state = self._rnn_states_encoder[-1] )
 
                 # 過去の隠れ層の出力をリストに追加
                 self._rnn_cells_encoder.append( cell_encoder_output )
@@ -301,10 +414,11 @@ class RecurrectNNEncoderDecoderLSTM( NeuralNetworkBase ):
         #--------------------------------------------------------------
         # Decoder
         #--------------------------------------------------------------
-        cell_decoder = tf.contrib.rnn.LSTMCell( 
+        cell_decoder = LSTMCellFactory( cell_type = "lstm", b_fused = self._b_fused_cell ).create( 
                            num_units = self._n_hiddenLayer,     # int, The number of units in the RNN cell.
                            forget_bias = 1.0                    # 忘却ゲートのバイアス項 / Default : 1.0  in order to reduce the scale of forgetting at the beginning of the training.
                        )
+        self._cell_decoder = cell_decoder
 
         # Decoder の初期状態は Encoder の最終出力
         self._rnn_cells_decoder.append( self._rnn_cells_encoder[-1] )
@@ -317,10 +431,10 @@ class RecurrectNNEncoderDecoderLSTM( NeuralNetworkBase ):
         self._weights.append( self.init_weight_variable( input_shape = [self._n_hiddenLayer, self._n_outputLayer] ) )
         self._biases.append( self.init_bias_variable( input_shape = [self._n_outputLayer] ) )
 
-        # ?
-        eval_outputs = []
-
-        # Decoder の過去の隠れ層の再帰処理
+        #--------------------------------------------------------------
+        # トレーニング用の計算グラフ（教師強制 [teacher forcing]）
+        # 各時刻 t の Decoder の入力に、１つ前の時刻の正解データ self._t_holder[:, t-1, :] を使用する
+        #--------------------------------------------------------------
         with tf.variable_scope('Decoder'):
             # t = 1 ~ self._n_in_sequence_decoder 間のループ処理 (t != 0)
             # t = 0 を含まないのは、Decoder の t = 0 の初期状態は、Encoder の最終出力で処理済みのため
@@ -330,93 +444,218 @@ class RecurrectNNEncoderDecoderLSTM( NeuralNetworkBase ):
                     # reuse_variables() : reuse フラグを True にすることで、再利用できるようになる。
                     tf.get_variable_scope().reuse_variables()
 
-                # トレーニング処理中の場合のルート
-                if ( self._bTraining_holder == True ):
-                    with tf.name_scope( "Traning_root" ):
-                        # LSTMCellクラスの `__call__(...)` を順次呼び出し、
-                        # 各時刻 t における出力 cell_output, 及び状態 state を算出
-                        cell_decoder_output, state_decoder_tsr = cell_decoder( inputs = self._t_holder[:, t-1, :], state = self._rnn_states_decoder[-1] )
-                
-                # loss 値などの評価用の値の計算時のルート
-                # デコーダーの次の step における出力計算時、self._t_holder[:, t-1, :] という正解データ（教師データ）を使用しないようにルート分岐させる。
-                else:
-                    with tf.name_scope( "Eval_root" ):
-                        # matmul 計算時、直前の出力 self._rnn_cells_decoder[-1] を入力に用いる
-                        cell_decoder_output = tf.matmul( self._rnn_cells_decoder[-1], self._weights[-1] ) + self._biases[-1]
-                        cell_decoder_output = tf.nn.softmax( cell_decoder_output )
-
-                        # eval 時の出力リストに追加
-                        eval_outputs.append( cell_decoder_output )
-
-                        # ?
-                        cell_decoder_output = tf.one_hot( tf.argmax(cell_decoder_output, -1), depth = self._n_in_sequence_decoder)
-                    
-                        # 後述の　過去の隠れ層の出力をリストに追加　のための処理
-                        cell_decoder_output, state_decoder_tsr = cell_decoder( cell_decoder_output, self._rnn_states_decoder[-1] )
+                # LSTMCellクラスの `__call__(...)` を順次呼び出し、
+                # 各時刻 t における出力 cell_output, 及び状態 state を算出
+                cell_decoder_output, state_decoder_tsr = cell_decoder( inputs = t_input_tsr[:, t-1, :], state = self._rnn_states_decoder[-1] )
 
                 # 過去の隠れ層の出力をリストに追加
                 self._rnn_cells_decoder.append( cell_decoder_output )
                 self._rnn_states_decoder.append( state_decoder_tsr )
 
-        # トレーニング処理中の場合のルート
-        if ( self._bTraining_holder == True ):
-            with tf.name_scope( "Traning_root" ):
-                #--------------------------------------------------------------
-                # 出力層への入力
-                #--------------------------------------------------------------
-                # まず、Decoder の出力を `tf.concat(...)` で結合し、`tf.reshape(...)` で適切な形状に reshape する。
-                # self._rnn_cells_decoder の形状を shape = ( データ数, デコーダーのシーケンス長, 隠れ層のノード数 ) に reshape 
-                # tf.concat(...) : Tensorを結合する。引数 axis で結合する dimension を決定
-                output = tf.reshape( 
-                             tf.concat( self._rnn_cells_decoder, axis = 1 ),
-                             shape = [ -1, self._n_in_sequence_decoder, self._n_hiddenLayer ]
-                        )
-
-                # そして、reshape した Tensor に対し、`tf.einsum(...)` or `tf.matmul(...)` を用いてテンソル積 or 行列積をとる。
-                # 3 階の Tensorとの積を取る（２階なら行列なので matmul でよかった）
-                # Σ_{ijk} の j 成分を残して、matmul する
-                # tf.einsum(...) : Tensor の積の アインシュタインの縮約表現
-                # equation : the equation is obtained from the more familiar element-wise （要素毎の）equation by
-                # 1. removing variable names, brackets, and commas, 
-                # 2. replacing "*" with ",", 
-                # 3. dropping summation signs, 
-                # and 4. moving the output to the right, and replacing "=" with "->".
-                y_in_op = tf.einsum( "ijk,kl->ijl", output, self._weights[-1] ) + self._biases[-1]
-        
-                #--------------------------------------------------------------
-                # モデルの出力
-                #--------------------------------------------------------------
-                # softmax
-                self._y_out_op = tf.nn.softmax( y_in_op )
+        # まず、Decoder の出力を `tf.concat(...)` で結合し、`tf.reshape(...)` で適切な形状に reshape する。
+        # self._rnn_cells_decoder の形状を shape = ( データ数, デコーダーのシーケンス長, 隠れ層のノード数 ) に reshape 
+        # tf.concat(...) : Tensorを結合する。引数 axis で結合する dimension を決定
+        output = tf.reshape( 
+                     tf.concat( self._rnn_cells_decoder, axis = 1 ),
+                     shape = [ -1, self._n_in_sequence_decoder, self._n_hiddenLayer ]
+                )
 
-        # loss 値などの評価用の値の計算時のルート
-        else:
-            with tf.name_scope( "Eval_root" ):
-                #--------------------------------------------------------------
-                # 出力層への入力
-                #--------------------------------------------------------------
-                y_in_op = tf.matmul( self._rnn_cells_decoder[-1], self._weights[-1] ) + self._biases[-1]
-
-                #--------------------------------------------------------------
-                # モデルの出力
-                #--------------------------------------------------------------
-                # softmax
-                self._y_out_op = tf.nn.softmax( y_in_op )
-
-                # モデルの最終的な出力を含める
-                eval_outputs.append( self._y_out_op )
-
-                # Decoder の出力、及び モデルの最終的な出力を `tf.concat(...)` で結合し、`tf.reshape(...)` で適切な形状に reshape する。
-                # self._y_out_op の形状を shape = ( データ数, デコーダーのシーケンス長, 出力層ののノード数 ) に reshape 
-                # tf.concat(...) : Tensorを結合する。引数 axis で結合する dimension を決定
-                self._y_out_op = tf.reshape(
-                                     tf.concat( eval_outputs, axis = 1 ),
-                                     [-1, self._n_in_sequence_decoder, self._n_outputLayer ]
-                                 )
+        # そして、reshape した Tensor に対し、`tf.einsum(...)` を用いてテンソル積をとり、全時刻の出力を一度に算出する。
+        # tf.einsum(...) : Tensor の積の アインシュタインの縮約表現
+        self._y_in_train_op = tf.einsum( "ijk,kl->ijl", output, self._weights[-1] ) + self._biases[-1]
+        self._y_out_train_op = tf.nn.softmax( self._y_in_train_op )
+
+        #--------------------------------------------------------------
+        # 推論用の計算グラフ（greedy）
+        # 各時刻 t の Decoder の入力に、１つ前の時刻の出力を argmax して one-hot encoding したものを使用する
+        # Variable はトレーニング用の計算グラフと共有する
+        #--------------------------------------------------------------
+        eval_outputs = [ tf.nn.softmax( tf.matmul( self._rnn_cells_encoder[-1], self._weights[-1] ) + self._biases[-1] ) ]
+        eval_state_tsr = self._rnn_states_encoder[-1]
+
+        with tf.variable_scope( 'Decoder', reuse = True ):
+            for t in range( 1, self._n_in_sequence_decoder ):
+                eval_input = tf.one_hot( tf.argmax( eval_outputs[-1], -1 ), depth = self._n_outputLayer )
+                eval_cell_output, eval_state_tsr = cell_decoder( inputs = eval_input, state = eval_state_tsr )
+
+                eval_outputs.append( tf.nn.softmax( tf.matmul( eval_cell_output, self._weights[-1] ) + self._biases[-1] ) )
+
+        # shape = ( データ数, デコーダーのシーケンス長, 出力層ののノード数 )
+        self._y_out_op = tf.stack( eval_outputs, axis = 1 )
+
+        return self._y_out_op
+
+
+    def model_dynamic( self ):
+        """
+        Encoder, Decoder を Python の for ループで時間方向に展開せずに、
+        tf.nn.dynamic_rnn(...), tf.nn.raw_rnn(...) の計算グラフ内のループで処理するモデルの定義を行い、
+        最終的なモデルの出力のオペレーターを設定する。
+        計算グラフのサイズ、構築時間はシーケンス長に依存せず、
+        Encoder のシーケンス長はデータ毎に _X_seq_len_holder で指定できる。
+
+        [Output]
+            self._y_out_op : Operator
+                モデルの出力のオペレーター
+                shape = [ batch_size, _n_decoder_len_holder, n_outputLayer ]
+        """
+        X_input_tsr, t_input_tsr = self.model_inputs()
+
+        #--------------------------------------------------------------
+        # Encoder
+        #--------------------------------------------------------------
+        cell_encoder = LSTMCellFactory( cell_type = "lstm", b_fused = self._b_fused_cell ).create( 
+                           num_units = self._n_hiddenLayer,     # int, The number of units in the RNN cell.
+                           forget_bias = 1.0                    # 忘却ゲートのバイアス項 / Default : 1.0  in order to reduce the scale of forgetting at the beginning of the training.
+                       )
+
+        initial_state_encoder_tsr = cell_encoder.zero_state( self._batch_size_holder, tf.float32 )
+        self._rnn_states_encoder.append( initial_state_encoder_tsr )
+
+        # tf.nn.dynamic_rnn(...) : 計算グラフ内のループで RNN の再帰処理を行う。
+        # sequence_length を超える時刻では状態が更新されないので、
+        # 最終的な状態 state_encoder_tsr は、各データのシーケンス長での状態となる
+        with tf.variable_scope('Encoder'):
+            outputs_encoder_tsr, state_encoder_tsr = tf.nn.dynamic_rnn(
+                                                         cell_encoder,
+                                                         inputs = X_input_tsr,
+                                                         sequence_length = self._X_seq_len_holder,
+                                                         initial_state = initial_state_encoder_tsr
+                                                     )
+
+        # LSTM の状態の h 成分が、各データのシーケンス長での Encoder の出力
+        self._rnn_cells_encoder.append( state_encoder_tsr.h )
+        self._rnn_states_encoder.append( state_encoder_tsr )
+
+        #--------------------------------------------------------------
+        # Decoder
+        #--------------------------------------------------------------
+        cell_decoder = LSTMCellFactory( cell_type = "lstm", b_fused = self._b_fused_cell ).create( 
+                           num_units = self._n_hiddenLayer,     # int, The number of units in the RNN cell.
+                           forget_bias = 1.0                    # 忘却ゲートのバイアス項 / Default : 1.0  in order to reduce the scale of forgetting at the beginning of the training.
+                       )
+        self._cell_decoder = cell_decoder
+
+        # 隠れ層 ~ 出力層の重みを事前に設定
+        self._weights.append( self.init_weight_variable( input_shape = [self._n_hiddenLayer, self._n_outputLayer] ) )
+        self._biases.append( self.init_bias_variable( input_shape = [self._n_outputLayer] ) )
+
+        # Decoder の最初の出力は Encoder の最終出力
+        y_in_first_op = tf.matmul( state_encoder_tsr.h, self._weights[-1] ) + self._biases[-1]
+        y_first_op = tf.nn.softmax( y_in_first_op )
+
+        #--------------------------------------------------------------
+        # トレーニング用の計算グラフ（教師強制 [teacher forcing]）
+        # Decoder の入力は１つ前の時刻の正解データなので、全時刻の入力が既知であり、
+        # tf.nn.dynamic_rnn(...) で出力側の argmax に依存せずに処理できる
+        #--------------------------------------------------------------
+        with tf.variable_scope('Decoder'):
+            outputs_decoder_tsr, state_decoder_tsr = tf.nn.dynamic_rnn(
+                                                         cell_decoder,
+                                                         inputs = t_input_tsr[:, :-1, :],
+                                                         initial_state = state_encoder_tsr
+                                                     )
+
+        self._rnn_cells_decoder.append( outputs_decoder_tsr )
+        self._rnn_states_decoder.append( state_decoder_tsr )
+
+        # 全時刻の出力層を tf.einsum(...) で一度に算出
+        y_in_op = tf.einsum( "ijk,kl->ijl", outputs_decoder_tsr, self._weights[-1] ) + self._biases[-1]
+        self._y_in_train_op = tf.concat( [ tf.expand_dims( y_in_first_op, 1 ), y_in_op ], axis = 1 )
+        self._y_out_train_op = tf.nn.softmax( self._y_in_train_op )
+
+        #--------------------------------------------------------------
+        # 推論用の計算グラフ（greedy）
+        # Variable はトレーニング用の計算グラフと共有する
+        #--------------------------------------------------------------
+        # tf.nn.raw_rnn(...) の各時刻で呼び出され、次の時刻の入力、状態を返す関数
+        # 直前の出力を argmax して one-hot encoding したものを、次の時刻の入力とする
+        def loop_fn( time, cell_output, cell_state, loop_state ):
+            if ( cell_output is None ):
+                # time = 0 : Decoder の初期状態は Encoder の最終状態
+                prev_output = state_encoder_tsr.h
+                next_state = state_encoder_tsr
+            else:
+                prev_output = cell_output
+                next_state = cell_state
+
+            prev_y = tf.matmul( prev_output, self._weights[-1] ) + self._biases[-1]
+            next_input = tf.one_hot( tf.argmax( prev_y, -1 ), depth = self._n_outputLayer )
+
+            # 最初の出力は Encoder の最終出力なので、Decoder の cell の処理は _n_decoder_len_holder - 1 回
+            finished = tf.greater_equal(
+                           tf.fill( [ self._batch_size_holder ], time ),
+                           self._n_decoder_len_holder - 1
+                       )
+
+            return ( finished, next_input, next_state, cell_output, loop_state )
+
+        with tf.variable_scope( 'Decoder', reuse = True ):
+            outputs_eval_ta, _, _ = tf.nn.raw_rnn( cell_decoder, loop_fn )
+
+        # [time, batch_size, n_hiddenLayer] → [batch_size, time, n_hiddenLayer]
+        outputs_eval_tsr = tf.transpose( outputs_eval_ta.stack(), perm = [1, 0, 2] )
+
+        #--------------------------------------------------------------
+        # 出力層
+        #--------------------------------------------------------------
+        y_in_op = tf.einsum( "ijk,kl->ijl", outputs_eval_tsr, self._weights[-1] ) + self._biases[-1]
+
+        # Encoder の最終出力による最初の出力と、Decoder の出力を結合
+        self._y_out_op = tf.concat( [ tf.expand_dims( y_first_op, 1 ), tf.nn.softmax( y_in_op ) ], axis = 1 )
 
         return self._y_out_op
 
 
+    def model_beam_search( self, beam_width = 5 ):
+        """
+        model() で構築した Encoder, Decoder の Variable を共有して、
+        ビームサーチで復号化する推論用の計算グラフを構築する。model() の後に呼び出す。
+        Encoder はバッチ内の各データで１回のみ処理し、その最終状態を全ビームで共有する。
+
+        [Input]
+            beam_width : int
+                ビーム幅
+
+        [Output]
+            self._beam_search : BeamSearchDecoder
+                ビームサーチによる推論用の計算グラフ
+                _ids_op : shape = [ batch_size, beam_width, Decoder のシーケンス長 ]
+        """
+        # model() で Decoder の cell の Variable を作成した名前空間
+        if ( self._b_dynamic_rnn == True ):
+            scope_name = 'Decoder/rnn'
+            n_steps = self._n_decoder_len_holder
+        else:
+            scope_name = 'Decoder'
+            n_steps = self._n_in_sequence_decoder
+
+        # 直前の時刻のシンボルを one-hot encoding して入力し、次の時刻のシンボルの対数確率を返す関数
+        def step_fn( ids, state_tsr ):
+            with tf.variable_scope( scope_name, reuse = True ):
+                cell_output, state_tsr = self._cell_decoder( 
+                                             inputs = tf.one_hot( ids, depth = self._n_outputLayer ),
+                                             state = state_tsr
+                                         )
+
+            log_probs = tf.nn.log_softmax( tf.matmul( cell_output, self._weights[-1] ) + self._biases[-1] )
+
+            return ( log_probs, state_tsr )
+
+        # Decoder の最初の出力は Encoder の最終出力
+        initial_log_probs = tf.nn.log_softmax( tf.matmul( self._rnn_cells_encoder[-1], self._weights[-1] ) + self._biases[-1] )
+
+        self._beam_search = BeamSearchDecoder( beam_width = beam_width )
+        self._beam_search.decode( 
+            step_fn = step_fn,
+            initial_state = self._rnn_states_encoder[-1],
+            initial_log_probs = initial_log_probs,
+            n_steps = n_steps
+        )
+
+        return self._beam_search
+
+
     def loss( self, nnLoss ):
         """
         損失関数の定義を行う。
@@ -428,7 +667,12 @@ class RecurrectNNEncoderDecoderLSTM( NeuralNetworkBase ):
             self._loss_op : Operator
                 損失関数を表すオペレーター
         """
-        self._loss_op = nnLoss.loss( t_holder = self._t_holder, y_out_op = self._y_out_op )
+        # 損失関数は、トレーニング用の計算グラフ（教師強制）の出力で定義する
+        # 数値インデックスで供給するモードでは、logits と数値インデックスの教師データで定義する（SparseSoftmaxCrossEntropy）
+        if ( self._b_index_input == True ):
+            self._loss_op = nnLoss.loss( t_holder = self._t_holder, y_out_op = self._y_in_train_op )
+        else:
+            self._loss_op = nnLoss.loss( t_holder = self._t_holder, y_out_op = self._y_out_train_op )
         
         return self._loss_op
 
@@ -488,8 +732,7 @@ class RecurrectNNEncoderDecoderLSTM( NeuralNetworkBase ):
                 feed_dict = {
                     self._X_holder: X_train_shuffled,
                     self._t_holder: y_train_shuffled,
-                    self._batch_size_holder: self._batch_size,
-                    self._bTraining_holder: True
+                    self._batch_size_holder: self._batch_size
                 }
             )
             
@@ -502,8 +745,7 @@ class RecurrectNNEncoderDecoderLSTM( NeuralNetworkBase ):
                        feed_dict = {
                            self._X_holder: X_train_shuffled,
                            self._t_holder: y_train_shuffled,
-                           self._batch_size_holder: self._batch_size,
-                           self._bTraining_holder: False
+                           self._batch_size_holder: self._batch_size
                        }
                    )
 
@@ -513,7 +755,7 @@ class RecurrectNNEncoderDecoderLSTM( NeuralNetworkBase ):
         return self._y_out_op
 
 
-    def predict( self, X_test ):
+    def predict( self, X_test, X_seq_len = None ):
         """
         fitting 処理したモデルで、推定を行い、
         Encoder に入力するシーケンスデータに対する Decoder の予想値（応答値）を 
@@ -525,19 +767,23 @@ class RecurrectNNEncoderDecoderLSTM( NeuralNetworkBase ):
                 n_samples : シーケンスデータのサンプル数
                 n_in_sequence_encoder : Encoder に入力するシーケンスのサイズ
                 one-hot vector size : 各単語の one-hot encoding 後のサイズ
+            X_seq_len : numpy.ndarry / shape = [n_samples]
+                各シーケンスデータのシーケンス長（b_dynamic_rnn = True の場合のみ）
+                None の場合は、X_test のシーケンス長
 
         [Output]
             predicts : numpy.ndarry ( shape = [n_samples, n_in_sequence_encoder] )
                 予想結果（分類モデルの場合は、クラスラベル）
         """
-        prob = self._session.run(
-                   self._y_out_op,
-                   feed_dict = { 
-                       self._X_holder: X_test,
-                       self._batch_size_holder: len( X_test[:,0,0] ),
-                       self._bTraining_holder: False
-                   }
-               )
+        feed_dict = { 
+            self._X_holder: X_test,
+            self._batch_size_holder: len( X_test )
+        }
+
+        if ( X_seq_len is not None ):
+            feed_dict[ self._X_seq_len_holder ] = X_seq_len
+
+        prob = self._session.run( self._y_out_op, feed_dict = feed_dict )
         #print( "prob :", prob )
 
         # one-hot encoding 要素方向で argmax して、文字の数値インデックス取得
@@ -568,8 +814,7 @@ class RecurrectNNEncoderDecoderLSTM( NeuralNetworkBase ):
                    session = self._session,
                    feed_dict = {
                        self._X_holder: X_test,
-                       self._batch_size_holder: len( X_test[:,0,0] ),
-                       self._bTraining_holder: False
+                       self._batch_size_holder: len( X_test )
                    }
                )
         
@@ -600,14 +845,18 @@ class RecurrectNNEncoderDecoderLSTM( NeuralNetworkBase ):
         predicts = self.predict( X_test )
 
         # y_test の one-hot encode された箇所を argmax し、文字に対応した数値インデックスに変換
-        y_labels = numpy.argmax( y_test, axis = -1 )
+        # 数値インデックスで供給するモードでは、y_test がそのまま数値インデックス
+        if ( self._b_index_input == True ):
+            y_labels = y_test
+        else:
+            y_labels = numpy.argmax( y_test, axis = -1 )
         #print( "y_labels :", y_labels )
 
         # 正解数
         n_corrects = 0
         resluts = numpy.equal( predicts, y_labels )     # shape = (n_sample, n_in_sequence_decoder )
         
-        for i in range( len(X_test[:,0,0]) ):
+        for i in range( len(X_test) ):
             # 各サンプルのシーケンス内で全てで True : [True, True, True, True] なら 正解数を +1 カウント
             if ( all( resluts[i] ) == True ):
                 n_corrects = n_corrects + 1
@@ -615,11 +864,72 @@ class RecurrectNNEncoderDecoderLSTM( NeuralNetworkBase ):
         print( "n_corrects : {}".format (n_corrects) )
  
         # 正解率
-        accuracy = n_corrects / len( X_test[:,0,0] )
+        accuracy = n_corrects / len( X_test )
 
         return accuracy
 
 
+    def predict_beam( self, X_test, X_seq_len = None ):
+        """
+        fitting 処理したモデルで、ビームサーチによる推定を行い、
+        Encoder に入力するシーケンスデータに対する Decoder の予想値（応答値）の候補を返す。
+        model_beam_search(...) で計算グラフを構築しておく必要がある。
+
+        [Input]
+            X_test : numpy.ndarry / shape = [n_samples, n_in_sequence_encoder, one-hot vector size]
+                予想したいシーケンスデータ
+            X_seq_len : numpy.ndarry / shape = [n_samples]
+                各シーケンスデータのシーケンス長（b_dynamic_rnn = True の場合のみ）
+
+        [Output]
+            predicts : numpy.ndarry ( shape = [n_samples, beam_width, n_in_sequence_decoder] )
+                各データの予想値の候補（スコアの降順）
+            scores : numpy.ndarry ( shape = [n_samples, beam_width] )
+                各候補のスコア（対数尤度の和）
+        """
+        feed_dict = { 
+            self._X_holder: X_test,
+            self._batch_size_holder: len( X_test )
+        }
+
+        if ( X_seq_len is not None ):
+            feed_dict[ self._X_seq_len_holder ] = X_seq_len
+
+        predicts, scores = self._session.run(
+                               [ self._beam_search._ids_op, self._beam_search._scores_op ],
+                               feed_dict = feed_dict
+                           )
+
+        return ( predicts, scores )
+
+
+    def question_answer_responce_beam( self, questions, dict_idx_to_str ):
+        """
+        学習済みモデルで、指定された複数の質問文に対する応答文を、ビームサーチでまとめて返す。
+        model_beam_search(...) で計算グラフを構築しておく必要がある。
+
+        [Input]
+            questions : naddary / shape = [n_questions, n_in_sequence_encoder, one-hot vector size]
+                数値インデックス（one-hot encoded）に変換された質問文
+            dict_idx_to_str : ディクショナリ
+                one-hot encoding する際に参照した数値インデックスから文字への map
+
+        [Output]
+            answers : list <str>
+                各質問文に対する、スコアが最大の応答文（数値インデックスを文字に変換済み）
+        """
+        if ( questions.ndim == self._X_holder.shape.ndims - 1 ):
+            # バッチの次元を追加 / (7,12) → (1,7,12), 数値インデックスの場合 (7,) → (1,7)
+            questions = questions[ numpy.newaxis ]
+
+        predicts, _ = self.predict_beam( questions )
+
+        # 各質問文の先頭のビーム（スコアが最大）を、ディクショナリにもとづき文字に変換
+        answers = [ "".join( dict_idx_to_str[i] for i in predict[0] ) for predict in predicts ]
+
+        return answers
+
+
     def question_answer_responce( self, question, dict_idx_to_str ):
         """
         学習済みモデルで、指定された質問文に対する応答文を返す。
@@ -633,8 +943,8 @@ class RecurrectNNEncoderDecoderLSTM( NeuralNetworkBase ):
             answer : str
                 質問文に対する応答文（数値インデックスを文字に変換済み）
         """
-        if ( question.ndim == 2):
-            # 3 次元に reshape / (7,12) → (1,7,12)
+        if ( question.ndim == self._X_holder.shape.ndims - 1 ):
+            # バッチの次元を追加 / (7,12) → (1,7,12), 数値インデックスの場合 (7,) → (1,7)
             question = [ question ]
 
         # question に対する予想値
@@ -642,8 +952,7 @@ class RecurrectNNEncoderDecoderLSTM( NeuralNetworkBase ):
                    session = self._session,
                    feed_dict = {
                        self._X_holder: question,
-                       self._batch_size_holder: 1,
-                       self._bTraining_holder: False
+                       self._batch_size_holder: 1
                    }
                )
 
@@ -4,6 +4,11 @@
 """
     更新情報
     [18/04/24] : 新規作成
+    [26/10/19] : 複数の開始シーケンスをバッチ処理でまとめてビームサーチするサンプリング sampling_beam_search(...) を追加
+               : 学習時の損失関数に sampled softmax / NCE（NNLoss.SampledLoss）を指定できるように修正
+               : サンプリングモードでバッチサイズを可変にし、複数の生成ストリームをまとめて処理できるように修正
+               : sampling(...) の上位 n_top 個の抽出を np.argpartition(...) に変更し、単語単位での数値インデックスのずれを修正
+               : LSTM の cell を NNCell.LSTMCellFactory で生成し、融合されたブロック LSTM を選択できるように変更
     [xx/xx/xx] :
 
 """
@@ -31,6 +36,10 @@ import NNLoss                                       # ニューラルネット
 
 import NNOptimizer                                  # ニューラルネットワークの最適化アルゴリズム Optimizer を表すクラス
 
+from NNBeamSearch import BeamSearchDecoder          # ビームサーチによる Decoder の復号化を表すクラス
+
+from NNCell import LSTMCellFactory                  # LSTM の cell を生成するクラス
+
 
 class Seq2SeqMultiRNNLSTM( NeuralNetworkBase ):
     """description of class
@@ -76,6 +85,25 @@ class Seq2SeqMultiRNNLSTM( NeuralNetworkBase ):
             これを次の時間の隠れ層に順々に渡していくことで、時間軸の逆伝搬を実現する。
         _rnn_states : list<Tensor>
             cell の状態
+        _b_fused_cell : bool
+            BasicLSTMCell の代わりに、融合されたブロック LSTM（LSTMBlockCell）を使用するか否か
+            Variable の名前と shape は BasicLSTMCell と同じなので、チェックポイントは相互に読み込み可能
+
+        _cells : MultiRNNCell
+            多層 RNN の cell（ビームサーチの計算グラフで Variable を共有するために保持）
+        _dense_layer : tf.layers.Dense
+            出力層の全結合層（ビームサーチの計算グラフで Variable を共有するために保持）
+        _outputs_reshaped_op : Operator
+            出力層への入力（RNN の出力） shape = [ None, _n_hiddenLayer ]
+            sampled softmax / NCE での損失関数の計算に使用する
+        _y_in_op : Operator
+            出力層の logits shape = [ None, _n_classes ]
+        _beam_search : BeamSearchDecoder
+            ビームサーチによるサンプリングの計算グラフ（model_beam_search(...) で構築）
+        _beam_input_holder : placeholder
+            ビームサーチの開始シーケンスにデータを供給するための placeholder [ n_seqs, 開始シーケンスの最大長 ]
+        _beam_input_len_holder : placeholder
+            各開始シーケンスの長さにデータを供給するための placeholder [ n_seqs ]
 
     [protedted] protedted な使用法を想定 
 
@@ -94,7 +122,8 @@ class Seq2SeqMultiRNNLSTM( NeuralNetworkBase ):
             batch_size = 50,
             eval_step = 1,
             save_step = 100,
-            bSamplingMode = False
+            bSamplingMode = False,
+            b_fused_cell = False
         ):
 
         super().__init__( session )
@@ -113,6 +142,7 @@ class Seq2SeqMultiRNNLSTM( NeuralNetworkBase ):
         self._eval_step = eval_step
         self._save_step = save_step
         self._bSamplingMode = bSamplingMode
+        self._b_fused_cell = b_fused_cell
 
         # evaluate 関連の初期化
         self._losses_train = []
@@ -121,6 +151,16 @@ class Seq2SeqMultiRNNLSTM( NeuralNetworkBase ):
         self._rnn_cells = []
         self._rnn_states = []
 
+        self._cells = None
+        self._dense_layer = None
+        self._outputs_reshaped_op = None
+        self._y_in_op = None
+
+        # ビームサーチ関連の初期化
+        self._beam_search = None
+        self._beam_input_holder = None
+        self._beam_input_len_holder = None
+
         # サンプリングモードに応じた処理の切り替え
         if ( self._bSamplingMode == False ):
             self._batch_size = batch_size
@@ -156,6 +196,7 @@ class Seq2SeqMultiRNNLSTM( NeuralNetworkBase ):
         print( "_eval_step : ", self._eval_step )
         print( "_save_step : ", self._save_step )
         print( "_bSamplingMode : ", self._bSamplingMode )
+        print( "_b_fused_cell : ", self._b_fused_cell )
 
         print( "_input_holder : ", self._input_holder )
         print( "_t_holder : ", self._t_holder )
@@ -163,6 +204,10 @@ class Seq2SeqMultiRNNLSTM( NeuralNetworkBase ):
 
         print( "_rnn_cells : \n", self._rnn_cells )
         print( "_rnn_states : \n", self._rnn_states )
+
+        print( "_cells : ", self._cells )
+        print( "_dense_layer : ", self._dense_layer )
+        print( "_beam_search : ", self._beam_search )
         
         print( "----------------------------------" )
         return
@@ -180,16 +225,22 @@ class Seq2SeqMultiRNNLSTM( NeuralNetworkBase ):
             #--------------------------------------------------------------
             # 学習時と推定時で処理の切り替えを行う。
             #--------------------------------------------------------------
+            # サンプリングモードでは、複数の生成ストリームをまとめて処理できるように、バッチサイズを可変にする
+            if ( self._bSamplingMode == True ):
+                batch_size = None
+            else:
+                batch_size = self._batch_size
+
             # placeholder の初期化        
             self._input_holder = tf.placeholder( 
                                      tf.int32, 
-                                     shape = [ self._batch_size, self._n_steps ],
+                                     shape = [ batch_size, self._n_steps ],
                                      name = "input_holder"
                                  )
         
             self._t_holder = tf.placeholder( 
                                  tf.int32, 
-                                 shape = [ self._batch_size, self._n_steps ],
+                                 shape = [ batch_size, self._n_steps ],
                                  name = "t_holder"
                              )
 
@@ -212,10 +263,10 @@ class Seq2SeqMultiRNNLSTM( NeuralNetworkBase ):
             # 時系列に沿った RNN 構造を提供するクラス BasicLSTMCell の cell を取得する。
             # この cell は、内部（プロパティ）で state（隠れ層の状態）を保持しており、
             # これを次の時間の隠れ層に順々に渡していくことで、時間軸の逆伝搬を実現する。
-            lstm_cell = tf.nn.rnn_cell.BasicLSTMCell( 
+            # _b_fused_cell = True の場合は、融合されたブロック LSTM（LSTMBlockCell）を使用
+            lstm_cell = LSTMCellFactory( cell_type = "basic", b_fused = self._b_fused_cell ).create( 
                             self._n_hiddenLayer,    # int, The number of units in the RNN(LSTM) cell.
-                            forget_bias = 0.0,        # 忘却ゲート
-                            state_is_tuple = True 
+                            forget_bias = 0.0         # 忘却ゲート
                         )
 
             # cell に Dropout を適用する。（＝中間層に dropout 機能を追加）
@@ -223,12 +274,17 @@ class Seq2SeqMultiRNNLSTM( NeuralNetworkBase ):
 
             # 総数に対応した cell のリストを Multi RNN 化
             cells = tf.nn.rnn_cell.MultiRNNCell( [lstm_cell] * self._n_MultiRNN, state_is_tuple=True )
+            self._cells = cells
             #print( "cells : ", cells )
         
             # cell 初期状態を定義
             # 最初の時間 t0 では、過去の隠れ層がないので、
             # cell.zero_state(...) でゼロの状態を初期設定する。
-            init_state_tsr = cells.zero_state( batch_size = self._batch_size, dtype=tf.float32 )
+            # サンプリングモードでは、バッチサイズを入力データから取得（可変なバッチサイズに対応）
+            if ( self._bSamplingMode == True ):
+                init_state_tsr = cells.zero_state( batch_size = tf.shape( self._input_holder )[0], dtype=tf.float32 )
+            else:
+                init_state_tsr = cells.zero_state( batch_size = self._batch_size, dtype=tf.float32 )
             self._rnn_states.append( init_state_tsr )
             #print( "init_state_tsr :", init_state_tsr )
         
@@ -258,11 +314,17 @@ class Seq2SeqMultiRNNLSTM( NeuralNetworkBase ):
             # 出力層への入力
             # This layer implements the operation: outputs = activation(inputs.kernel + bias)
             # Where activation is the activation function passed as the activation argument (if not None)
-            y_in_op = tf.layers.dense(
-                          inputs = outputs_reshaped_tsr,    # RNN Cell の最終的な Output
-                          units = self._n_classes,          # Integer or Long, dimensionality of the output space. / one-hot なので、特徴量の数に対応させる。
-                          activation = None
-                      )
+            # ビームサーチの計算グラフで Variable を共有するために、全結合層のオブジェクトを保持
+            self._dense_layer = tf.layers.Dense(
+                                    units = self._n_classes,          # Integer or Long, dimensionality of the output space. / one-hot なので、特徴量の数に対応させる。
+                                    activation = None
+                                )
+
+            y_in_op = self._dense_layer( outputs_reshaped_tsr )       # RNN Cell の最終的な Output
+
+            # sampled softmax / NCE での損失関数の計算のために、出力層への入力と logits を保持
+            self._outputs_reshaped_op = outputs_reshaped_tsr
+            self._y_in_op = y_in_op
 
             #print( "y_in_op :", y_in_op )              #
         
@@ -275,6 +337,70 @@ class Seq2SeqMultiRNNLSTM( NeuralNetworkBase ):
         
         return self._y_out_op
 
+
+    def model_beam_search( self, beam_width = 5, output_length = 100, bWordToken = True ):
+        """
+        model() で構築した多層 RNN, 出力層の Variable を共有して、
+        複数の開始シーケンスに続くシーケンスを、バッチ処理でまとめてビームサーチする計算グラフを構築する。
+        model() の後に呼び出す。
+        各開始シーケンスは tf.nn.dynamic_rnn(...) で１回のみ処理し、その最終状態を全ビームで共有する。
+
+        [Input]
+            beam_width : int
+                ビーム幅
+            output_length : int
+                開始シーケンスに続けて生成するシーケンスの長さ
+            bWordToken : bool
+                ディクショナリが単語単位で分割されているか否か
+                True の場合、0 番目の要素 "unknown" は生成しない
+
+        [Output]
+            self._beam_search : BeamSearchDecoder
+                ビームサーチの計算グラフ
+                _ids_op : shape = [ n_seqs, beam_width, output_length ]
+        """
+        self._beam_input_holder = tf.placeholder( tf.int32, shape = [ None, None ], name = "beam_input_holder" )
+        self._beam_input_len_holder = tf.placeholder( tf.int32, shape = [ None ], name = "beam_input_len_holder" )
+
+        # 0 番目の要素 "unknown" を除外するための対数確率のマスク
+        if ( bWordToken == True ):
+            log_probs_mask = tf.one_hot( 0, depth = self._n_classes, on_value = -1e9, off_value = 0.0 )
+        else:
+            log_probs_mask = tf.zeros( [ self._n_classes ] )
+
+        with tf.variable_scope( tf.get_variable_scope(), reuse = True ):
+            # 開始シーケンスを処理し、各開始シーケンスの長さでの最終状態を取得
+            init_state_tsr = self._cells.zero_state( batch_size = tf.shape( self._beam_input_holder )[0], dtype = tf.float32 )
+
+            _, final_state_tsr = tf.nn.dynamic_rnn(
+                                     self._cells,
+                                     inputs = tf.one_hot( self._beam_input_holder, depth = self._n_classes ),
+                                     sequence_length = self._beam_input_len_holder,
+                                     initial_state = init_state_tsr
+                                 )
+
+            # 最上位の層の LSTM の状態の h 成分が、各開始シーケンスの長さでの出力
+            initial_log_probs = tf.nn.log_softmax( self._dense_layer( final_state_tsr[-1].h ) ) + log_probs_mask
+
+            # 直前の時刻のシンボルを one-hot encoding して入力し、次の時刻のシンボルの対数確率を返す関数
+            def step_fn( ids, state_tsr ):
+                with tf.variable_scope( 'rnn', reuse = True ):
+                    cell_output, state_tsr = self._cells( tf.one_hot( ids, depth = self._n_classes ), state_tsr )
+
+                log_probs = tf.nn.log_softmax( self._dense_layer( cell_output ) ) + log_probs_mask
+
+                return ( log_probs, state_tsr )
+
+            self._beam_search = BeamSearchDecoder( beam_width = beam_width )
+            self._beam_search.decode(
+                step_fn = step_fn,
+                initial_state = final_state_tsr,
+                initial_log_probs = initial_log_probs,
+                n_steps = output_length
+            )
+
+        return self._beam_search
+
     
     def loss( self, nnLoss, reuse = False ):
         """
@@ -282,12 +408,31 @@ class Seq2SeqMultiRNNLSTM( NeuralNetworkBase ):
         
         [Input]
             nnLoss : NNLoss クラスのオブジェクト
+                NNLoss.SampledLoss（SampledSoftmaxCrossEntropy, NCE）の場合は、
+                サンプリングしたクラスのみで損失関数を近似し、学習時の計算量をクラス数にほぼ依存しなくする。
+                推定時の出力 self._y_out_op は、全クラスでの softmax のまま
             
         [Output]
             self._loss_op : Operator
                 損失関数を表すオペレーター
         """
         with tf.variable_scope( tf.get_variable_scope(), reuse = reuse ):
+            if ( isinstance( nnLoss, NNLoss.SampledLoss ) == True ):
+                # 教師データは one-hot encoding せず、数値インデックスのまま shape = [None, 1] に reshape
+                t_reshaped_holder = tf.reshape( tf.cast( self._t_holder, tf.int64 ), shape = [-1, 1] )
+
+                # 全結合層の kernel は shape = [n_hidden, n_classes] なので、転置して [n_classes, n_hidden] で渡す
+                self._loss_op = nnLoss.loss(
+                                    t_holder = t_reshaped_holder,
+                                    y_out_op = self._y_in_op,
+                                    inputs = self._outputs_reshaped_op,
+                                    weights = tf.transpose( self._dense_layer.kernel ),
+                                    biases = self._dense_layer.bias,
+                                    n_classes = self._n_classes
+                                )
+
+                return self._loss_op
+
             t_onehot = tf.one_hot( self._t_holder, depth = self._n_classes )               # 出力データを one-hot encoding
             t_reshaped_holder = tf.reshape( t_onehot, shape = [-1, self._n_classes ] )     # loss 値の計算時の y_out_op との形状の整合性のため reshape
         
@@ -436,8 +581,9 @@ class Seq2SeqMultiRNNLSTM( NeuralNetworkBase ):
                 # 0 番目の要素 "unknown" を除外
                 p = p[1:]      # ディクショナリが単語単位で分割されている場合
 
-            # 上位 n_top 個にソートするために、上位以外を 0 で埋める。
-            idxs_zero = np.argsort(p)[:-n_top]
+            # 上位 n_top 個以外を 0 で埋める。
+            # np.argpartition(...) : 全体をソートせずに、上位 n_top 個とそれ以外に分割する
+            idxs_zero = np.argpartition( p, -n_top )[:-n_top]
             p[ idxs_zero ] = 0.0
 
             # 全体の確率を正規化
@@ -446,7 +592,8 @@ class Seq2SeqMultiRNNLSTM( NeuralNetworkBase ):
             # 予想確率 p に基づき、idx をランダムサンプリング
             # 単語単位の分割の場合
             if( bWordToken == True ):
-                char_idxs = np.random.choice( n_vocab - 1, 1, p = p )  # ディクショナリが単語単位で分割されている場合
+                # p[1:] のインデックスなので、+1 して元の数値インデックスに戻す
+                char_idxs = np.random.choice( n_vocab - 1, 1, p = p ) + 1  # ディクショナリが単語単位で分割されている場合
             
             # 文字単位の分割の場合
             else:
@@ -468,7 +615,8 @@ class Seq2SeqMultiRNNLSTM( NeuralNetworkBase ):
         # 引数で指定された開始シーケンス start_seq を起点にモデルを実行
         #------------------------------------------------------------
         # 学習済みモデルで RNN Cell の状態を初期状態にリセット
-        rnn_cell_state = self._session.run( self._rnn_states[0] )
+        # 初期状態のバッチサイズは入力データから取得するので、１つ分の入力データを供給する
+        rnn_cell_state = self._session.run( self._rnn_states[0], feed_dict = { self._input_holder: np.zeros( (1,1) ) } )
 
         # 単語単位の分割の場合
         if( bWordToken == True ):
@@ -536,3 +684,59 @@ class Seq2SeqMultiRNNLSTM( NeuralNetworkBase ):
 
         return pred_seq
 
+
+    def sampling_beam_search( self, start_seqs, text2int_dir, int2text_dir, bWordToken = True ):
+        """
+        学習済みモデルで、複数の開始シーケンスに続くシーケンスを、ビームサーチでまとめて生成する。
+        session.run(...) は全ての開始シーケンスに対して１回のみ。
+        model_beam_search(...) で計算グラフを構築しておく必要がある。
+
+        [Input]
+            start_seqs : list <str>
+                開始シーケンスのリスト
+            text2int_dir : dict
+                文字（単語）から数値インデックスへの map
+            int2text_dir : dict
+                数値インデックスから文字（単語）への map
+            bWordToken : bool
+                ディクショナリが単語単位で分割されているか否か
+
+        [Output]
+            pred_seqs : list <list<str>>
+                各開始シーケンスに対して、スコアが最大のビームを続けた予想シーケンス
+        """
+        # 学習済みモデルを読み込み
+        self.load_model()
+
+        # 開始シーケンスを数値インデックスに変換
+        # 長さの異なる開始シーケンスは 0 で padding し、各々の長さを sequence_length として与える
+        if( bWordToken == True ):
+            # 大文字 → 小文字に変換（ディクショナリが小文字単語単位で分割されている場合）
+            start_seqs = [ [ str.lower() for str in start_seq.split() ] for start_seq in start_seqs ]
+        else:
+            start_seqs = [ list( start_seq ) for start_seq in start_seqs ]
+
+        seq_lens = np.array( [ len( start_seq ) for start_seq in start_seqs ], dtype = np.int32 )
+        x = np.zeros( ( len( start_seqs ), seq_lens.max() ), dtype = np.int32 )
+        for ( i, start_seq ) in enumerate( start_seqs ):
+            x[ i, :seq_lens[i] ] = [ text2int_dir[str] for str in start_seq ]
+
+        ids = self._session.run(
+                  self._beam_search._ids_op,
+                  feed_dict = {
+                      self._beam_input_holder: x,
+                      self._beam_input_len_holder: seq_lens,
+                      self._dropout_holder: 1.0
+                  }
+              )
+
+        # 各開始シーケンスの先頭のビーム（スコアが最大）を文字（単語）に変換
+        pred_seqs = [ start_seq + [ int2text_dir[idx] for idx in beams[0] ] for ( start_seq, beams ) in zip( start_seqs, ids ) ]
+
+        for pred_seq in pred_seqs:
+            if( bWordToken == True ):
+                print( "sampling text :\n", " ".join( pred_seq ) )
+            else:
+                print( "sampling text :\n", "".join( pred_seq ) )
+
+        return pred_seqs
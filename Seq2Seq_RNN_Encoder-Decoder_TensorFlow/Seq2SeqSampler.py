@@ -0,0 +1,310 @@
+# -*- coding:utf-8 -*-
+# Anaconda 5.0.1 環境 (TensorFlow インストール済み)
+
+"""
+    更新情報
+    [26/10/19] : 新規作成
+    [xx/xx/xx] :
+               :
+"""
+
+import time
+import threading
+import queue
+from concurrent.futures import Future
+
+import numpy as np
+
+# TensorFlow ライブラリ
+import tensorflow as tf
+from tensorflow.python.framework import ops
+
+
+class Seq2SeqSampler( object ):
+    """
+    学習済みの Seq2SeqMultiRNNLSTM で、複数の開始シーケンスに続くシーケンスをまとめて生成する常駐型のサンプラー
+    学習済みモデルの読み込みはコンストラクタで１回のみ行う。
+    各開始シーケンスを独立した生成ストリームとし、ストリーム毎の RNN の状態をバッチとして保持することで、
+    全ストリームの１時刻分を、１回の session.run(...) でまとめて処理する。
+    start() でワーカースレッドを起動すると、submit(...) で投入されたリクエストを、
+    キュー上でマイクロバッチにまとめて処理する。
+    ------------------------------------------------------------------------------------------------
+    [public] public アクセス可能なインスタスンス変数には, 便宜上変数名の最後にアンダースコア _ を付ける.
+        _rnn : Seq2SeqMultiRNNLSTM
+            サンプリングモード（bSamplingMode = True）で model() 済みのモデル
+        _text2int_dir : dict
+            文字（単語）から数値インデックスへの map
+        _int2text_dir : dict
+            数値インデックスから文字（単語）への map
+        _bWordToken : bool
+            ディクショナリが単語単位で分割されているか否か
+            True の場合、0 番目の要素 "unknown" は生成しない
+        _n_top : int
+            サンプリング対象とする確率の上位の数
+        _temperature : float
+            サンプリング時の温度（1.0 より小さいほど確率の高いシンボルに偏る）
+
+        _max_batch_size : int
+            マイクロバッチにまとめるリクエストの最大数
+        _max_wait : float
+            マイクロバッチの最初のリクエストから、後続のリクエストを待つ最大の秒数
+
+        _request_queue : queue.Queue
+            submit(...) で投入されたリクエストのキュー
+        _worker : threading.Thread
+            リクエストを処理するワーカースレッド
+
+    [protedted] protedted な使用法を想定
+
+    [private] 変数名の前にダブルアンダースコア __ を付ける（Pythonルール）
+
+    """
+    def __init__(
+            self,
+            rnn,
+            text2int_dir,
+            int2text_dir,
+            bWordToken = True,
+            n_top = 5,
+            temperature = 1.0,
+            max_batch_size = 32,
+            max_wait = 0.01,
+            model_dir = "./model_session",
+            model_file_name = "model_variables"
+        ):
+        self._rnn = rnn
+        self._text2int_dir = text2int_dir
+        self._int2text_dir = int2text_dir
+        self._bWordToken = bWordToken
+        self._n_top = n_top
+        self._temperature = temperature
+
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait
+
+        self._request_queue = queue.Queue()
+        self._worker = None
+
+        # 学習済みモデルの読み込みは１回のみ
+        self._rnn.load_model( dir = model_dir, file_name = model_file_name )
+
+        return
+
+    def print( self, str ):
+        print( "----------------------------------" )
+        print( self )
+        print( str )
+
+        print( "_rnn : ", self._rnn )
+        print( "_bWordToken : ", self._bWordToken )
+        print( "_n_top : ", self._n_top )
+        print( "_temperature : ", self._temperature )
+        print( "_max_batch_size : ", self._max_batch_size )
+        print( "_max_wait : ", self._max_wait )
+        print( "_worker : ", self._worker )
+
+        print( "----------------------------------" )
+
+        return
+
+
+    def sampling_from_probs( self, probs ):
+        """
+        バッチ内の各ストリームの予測確率から、次のシンボルをまとめてサンプリングする。
+        温度で調整した確率の上位 _n_top 個のみを、np.argpartition(...) で全体をソートせずに抽出する。
+
+        [Input]
+            probs : ndarray
+                各ストリームの予測確率 [ n_streams, n_classes ]
+
+        [Output]
+            ids : ndarray
+                各ストリームでサンプリングしたシンボルの数値インデックス [ n_streams ]
+        """
+        probs = np.array( probs, dtype = np.float64 )
+
+        # 単語単位の分割の場合、0 番目の要素 "unknown" を除外
+        if ( self._bWordToken == True ):
+            probs[ :, 0 ] = 0.0
+
+        # 温度による確率の調整
+        if ( self._temperature != 1.0 ):
+            probs = np.power( probs, 1.0 / self._temperature )
+
+        # 上位 n_top 個の数値インデックスと確率 [ n_streams, n_top ]
+        n_top = min( self._n_top, probs.shape[1] )
+        top_idxs = np.argpartition( probs, -n_top, axis = 1 )[ :, -n_top: ]
+        top_probs = np.take_along_axis( probs, top_idxs, axis = 1 )
+        top_probs = top_probs / np.sum( top_probs, axis = 1, keepdims = True )
+
+        # 累積確率と一様乱数から、各ストリームの上位 n_top 個の中の位置をサンプリング
+        cum_probs = np.cumsum( top_probs, axis = 1 )
+        rand = np.random.rand( len( probs ), 1 )
+        choices = np.minimum( np.sum( cum_probs < rand, axis = 1 ), n_top - 1 )
+
+        return top_idxs[ np.arange( len( probs ) ), choices ]
+
+
+    def sampling_batch( self, start_seqs, output_lengths ):
+        """
+        複数の開始シーケンスに続くシーケンスを、バッチでまとめて生成する。
+        各時刻では、開始シーケンスの途中のストリームには開始シーケンスのシンボルを、
+        それ以外のストリームには直前にサンプリングしたシンボルを入力する。
+        生成を終えたストリームは、バッチ及び RNN の状態から取り除く。
+
+        [Input]
+            start_seqs : list <str>
+                開始シーケンスのリスト
+            output_lengths : int or list <int>
+                各開始シーケンスに続けて生成するシーケンスの長さ
+
+        [Output]
+            pred_seqs : list <list<str>>
+                各開始シーケンスに、生成したシーケンスを続けた予想シーケンス
+        """
+        nest = tf.contrib.framework.nest
+
+        if ( isinstance( output_lengths, int ) == True ):
+            output_lengths = [ output_lengths ] * len( start_seqs )
+
+        # 開始シーケンスを数値インデックスに変換
+        if ( self._bWordToken == True ):
+            # 大文字 → 小文字に変換（ディクショナリが小文字単語単位で分割されている場合）
+            start_seqs = [ [ str.lower() for str in start_seq.split() ] for start_seq in start_seqs ]
+        else:
+            start_seqs = [ list( start_seq ) for start_seq in start_seqs ]
+
+        # ディクショナリにないシンボルは、0 番目の要素 "unknown" とする
+        start_ids = [ [ self._text2int_dir.get( str, 0 ) for str in start_seq ] for start_seq in start_seqs ]
+        pred_ids = [ [] for _ in start_seqs ]
+
+        # 処理中のストリームの番号と、各ストリームの時刻
+        active = np.array( [ i for i in range( len( start_seqs ) ) if output_lengths[i] > 0 ], dtype = np.int64 )
+        steps = np.zeros( len( start_seqs ), dtype = np.int64 )
+
+        # 全ストリームの RNN の状態を初期状態にリセット
+        x = np.zeros( ( len( active ), 1 ), dtype = np.int32 )
+        rnn_cell_state = self._rnn._session.run( self._rnn._rnn_states[0], feed_dict = { self._rnn._input_holder: x } )
+
+        while ( len( active ) > 0 ):
+            # 各ストリームの入力シンボル
+            for ( row, i ) in enumerate( active ):
+                if ( steps[i] < len( start_ids[i] ) ):
+                    x[ row, 0 ] = start_ids[i][ steps[i] ]
+                elif ( len( pred_ids[i] ) > 0 ):
+                    x[ row, 0 ] = pred_ids[i][-1]
+                else:
+                    x[ row, 0 ] = 0     # 空の開始シーケンスは 0 番目の要素から開始
+
+            probs, rnn_cell_state = self._rnn._session.run(
+                                        [ self._rnn._y_out_op, self._rnn._rnn_states[-1] ],
+                                        feed_dict = {
+                                            self._rnn._input_holder: x,
+                                            self._rnn._dropout_holder: 1.0,
+                                            self._rnn._rnn_states[0]: rnn_cell_state
+                                        }
+                                    )
+
+            ids = self.sampling_from_probs( probs )
+            steps[ active ] += 1
+
+            # 開始シーケンスを全て入力し終えたストリームのみ、サンプリングしたシンボルを採用
+            for ( row, i ) in enumerate( active ):
+                if ( steps[i] >= len( start_ids[i] ) ):
+                    pred_ids[i].append( ids[row] )
+
+            # 生成を終えたストリームを、バッチと RNN の状態から取り除く
+            b_keep = np.array( [ len( pred_ids[i] ) < output_lengths[i] for i in active ], dtype = bool )
+            if ( np.all( b_keep ) == False ):
+                active = active[ b_keep ]
+                x = x[ b_keep ]
+                rnn_cell_state = nest.map_structure( lambda state : state[ b_keep ], rnn_cell_state )
+
+        pred_seqs = [ start_seq + [ self._int2text_dir[idx] for idx in ids ] for ( start_seq, ids ) in zip( start_seqs, pred_ids ) ]
+
+        return pred_seqs
+
+
+    def submit( self, start_seq, output_length ):
+        """
+        開始シーケンスの生成リクエストをキューに投入する。
+        start() でワーカースレッドを起動しておく必要がある。
+
+        [Input]
+            start_seq : str
+                開始シーケンス
+            output_length : int
+                開始シーケンスに続けて生成するシーケンスの長さ
+
+        [Output]
+            future : concurrent.futures.Future
+                予想シーケンス list <str> を結果とする Future
+        """
+        future = Future()
+        self._request_queue.put( ( start_seq, output_length, future ) )
+
+        return future
+
+
+    def start( self ):
+        """
+        キューのリクエストを処理するワーカースレッドを起動する。
+        """
+        if ( self._worker is None ):
+            self._worker = threading.Thread( target = self.serve, daemon = True )
+            self._worker.start()
+
+        return
+
+
+    def stop( self ):
+        """
+        キューに投入済みのリクエストを処理した後に、ワーカースレッドを終了する。
+        """
+        if ( self._worker is not None ):
+            self._request_queue.put( None )
+            self._worker.join()
+            self._worker = None
+
+        return
+
+
+    def serve( self ):
+        """
+        ワーカースレッドの処理
+        最初のリクエストから最大 _max_wait 秒、最大 _max_batch_size 個までのリクエストを
+        マイクロバッチにまとめて sampling_batch(...) で処理する。
+        session.run(...) は、このスレッドからのみ呼び出す。
+        """
+        b_stop = False
+        while ( b_stop == False ):
+            requests = [ self._request_queue.get() ]
+            if ( requests[0] is None ):
+                break
+
+            deadline = time.time() + self._max_wait
+            while ( len( requests ) < self._max_batch_size ):
+                try:
+                    request = self._request_queue.get( timeout = max( deadline - time.time(), 0.0 ) )
+                except queue.Empty:
+                    break
+
+                if ( request is None ):
+                    b_stop = True
+                    break
+
+                requests.append( request )
+
+            try:
+                pred_seqs = self.sampling_batch(
+                                start_seqs = [ start_seq for ( start_seq, _, _ ) in requests ],
+                                output_lengths = [ output_length for ( _, output_length, _ ) in requests ]
+                            )
+                for ( ( _, _, future ), pred_seq ) in zip( requests, pred_seqs ):
+                    future.set_result( pred_seq )
+
+            except Exception as e:
+                for ( _, _, future ) in requests:
+                    future.set_exception( e )
+
+        return
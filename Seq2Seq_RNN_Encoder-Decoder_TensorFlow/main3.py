@@ -31,6 +31,8 @@ from NNLoss import BinaryCrossEntropy
 from NNLoss import CrossEntropy
 from NNLoss import SoftmaxCrossEntropy
 from NNLoss import SparseSoftmaxCrossEntropy
+from NNLoss import SampledSoftmaxCrossEntropy
+from NNLoss import NCE
 
 import NNOptimizer                                      # ニューラルネットワークの最適化アルゴリズム Optimizer を表すクラス
 from NNOptimizer import GradientDecent
@@ -43,6 +45,7 @@ from NNOptimizer import Adam
 
 from NeuralNetworkBase import NeuralNetworkBase
 from Seq2SeqMultiRNNLSTM import Seq2SeqMultiRNNLSTM
+from Seq2SeqSampler import Seq2SeqSampler
 
 
 def main():
@@ -212,6 +215,8 @@ def main():
     # Declare the loss functions.
     #======================================================================
     rnn.loss( SoftmaxCrossEntropy(), reuse = False )
+    # 語彙数が大きい場合は、学習時のみ sampled softmax で近似する（推定時は全クラスでの softmax）
+    #rnn.loss( SampledSoftmaxCrossEntropy( n_sampled = 64 ), reuse = False )
     test_rnn.loss( SoftmaxCrossEntropy(), reuse = True )
 
     #======================================================================
@@ -282,6 +287,28 @@ def main():
         start_seq = "The " ,
         bWordToken = bWordToken
     )
+
+    # 複数の開始シーケンスを、常駐型のサンプラーでまとめて生成
+    # 学習済みモデルの読み込みは１回のみで、submit(...) されたリクエストはマイクロバッチにまとめて処理される
+    sampler = Seq2SeqSampler(
+                  rnn = test_rnn,
+                  text2int_dir = dict_vcab_to_idx,
+                  int2text_dir = dict_idx_to_vocab,
+                  bWordToken = bWordToken,
+                  n_top = 5,
+                  temperature = 1.0
+              )
+
+    sampler.start()
+    futures = [ sampler.submit( start_seq, output_length = 100 ) for start_seq in [ "The ", "to be ", "thou art ", "my lord " ] ]
+    for future in futures:
+        pred_seq = future.result()
+        if( bWordToken == True ):
+            print( "sampling text :\n", " ".join( pred_seq ) )
+        else:
+            print( "sampling text :\n", "".join( pred_seq ) )
+
+    sampler.stop()
     
     
     #---------------------------------------------------------